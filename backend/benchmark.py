@@ -0,0 +1,220 @@
+"""
+lambda_handler 오프라인 벤치마크
+
+fake_aws의 대역 클라이언트로 실제 AWS 없이 합성 대화 워크로드를 lambda_handler에 재생하고,
+액션별 처리량 / p50·p95·p99 지연시간 / 메모리 피크를 출력한다.
+
+사용법:
+    python benchmark.py                          # 전체 워크로드, 기본 지연시간
+    python benchmark.py --workload sessions      # 특정 워크로드만
+    python benchmark.py --latency-scale 0        # AWS 지연 없이 순수 핸들러 CPU 비용만
+    python benchmark.py --concurrency 8 --json bench.json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_aws import FakeAWS  # noqa: E402
+
+USER_LINES = [
+    "I work as a software engineer at a startup in Seoul.",
+    "Um, I usually go to the gym after work, like three times a week.",
+    "Yesterday I have a meeting with my manager about the new project.",
+    "I think the most difficult part is, you know, communicating with other teams.",
+    "Actually I want to travel to Canada next year with my family.",
+    "My hobby is cooking, basically I try a new recipe every weekend.",
+]
+
+
+def load_lambda(aws):
+    """lambda_function을 불러오고 AWS 클라이언트를 대역으로 교체"""
+    import lambda_function
+    aws.install(lambda_function)
+    lambda_function.emit_metrics = lambda *args, **kwargs: None  # 벤치마크 중 EMF 로그 출력 끔
+    return lambda_function
+
+
+def invoke(lf, payload):
+    """API Gateway 이벤트로 감싸 lambda_handler 호출 후 (지연 ms, 상태 코드) 반환"""
+    started = time.perf_counter()
+    response = lf.lambda_handler({'httpMethod': 'POST', 'body': json.dumps(payload)}, None)
+    return (time.perf_counter() - started) * 1000, response['statusCode']
+
+
+def conversation(turns):
+    messages = []
+    for i in range(turns):
+        messages.append({'role': 'user', 'content': USER_LINES[i % len(USER_LINES)]})
+        messages.append({'role': 'assistant', 'content': "That sounds interesting! What made you choose that?"})
+    return messages
+
+
+def seed_device(lf, device_id, sessions, messages_per_session):
+    """기기 하나에 세션/메시지를 직접 채워 넣기 (지연시간 없이)"""
+    for s in range(sessions):
+        session_id = f'bench-{uuid.uuid4().hex[:12]}'
+        invoke(lf, {'action': 'start_session', 'deviceId': device_id, 'sessionId': session_id,
+                    'settings': {'topic': 'business', 'accent': 'us', 'level': 'intermediate'}})
+        messages = [{'role': role, 'content': USER_LINES[turn % len(USER_LINES)], 'turnNumber': turn + 1}
+                    for turn in range(messages_per_session // 2) for role in ('user', 'assistant')]
+        for start in range(0, len(messages), lf.MAX_SAVE_BATCH):
+            invoke(lf, {'action': 'save_messages', 'deviceId': device_id, 'sessionId': session_id,
+                        'messages': messages[start:start + lf.MAX_SAVE_BATCH], 'updateStats': True})
+        invoke(lf, {'action': 'end_session', 'deviceId': device_id, 'sessionId': session_id, 'duration': 600})
+
+
+# ============================================
+# 워크로드: 각 함수는 payload 리스트를 반환
+# ============================================
+
+def workload_chat(lf, aws, iterations):
+    """대화 턴: 메시지 히스토리가 점점 길어지는 chat 호출"""
+    settings = {'accent': 'us', 'level': 'intermediate', 'topic': 'business'}
+    return [{'action': 'chat', 'messages': conversation(i % 20)[:-1] or [], 'settings': settings} for i in range(iterations)]
+
+
+def workload_tts(lf, aws, iterations):
+    """TTS: 자주 반복되는 튜터 문장 (캐시 적중률 확인용)"""
+    phrases = ["Oh nice! Do you do that often?", "I see. What do you enjoy most about it?",
+               "That sounds interesting! What made you choose that career?"]
+    return [{'action': 'tts', 'text': random.choice(phrases) if i % 4 else f'Unique sentence number {i}.',
+             'settings': {'accent': 'us', 'gender': 'female'}} for i in range(iterations)]
+
+
+def workload_save(lf, aws, iterations):
+    """save_message 폭주: 한 세션에 메시지를 연속 저장"""
+    device_id, session_id = f'bench-device-{uuid.uuid4().hex[:8]}', f'bench-session-{uuid.uuid4().hex[:8]}'
+    invoke(lf, {'action': 'start_session', 'deviceId': device_id, 'sessionId': session_id, 'settings': {}})
+    return [{'action': 'save_message', 'deviceId': device_id, 'sessionId': session_id,
+             'message': {'role': 'user' if i % 2 == 0 else 'assistant', 'content': USER_LINES[i % len(USER_LINES)], 'turnNumber': i // 2 + 1}}
+            for i in range(iterations)]
+
+
+def workload_sessions(lf, aws, iterations, sessions=20, messages_per_session=200):
+    """get_sessions: 메시지가 수천 개 쌓인 기기에서 세션 목록 조회"""
+    device_id = f'bench-device-{uuid.uuid4().hex[:8]}'
+    scale, aws.scale = aws.scale, 0
+    seed_device(lf, device_id, sessions, messages_per_session)
+    aws.scale = scale
+    return [{'action': 'get_sessions', 'deviceId': device_id, 'limit': 10} for _ in range(iterations)]
+
+
+def workload_detail(lf, aws, iterations, messages=600):
+    """get_session_detail: 긴 통화 한 건의 상세 조회"""
+    device_id = f'bench-device-{uuid.uuid4().hex[:8]}'
+    scale, aws.scale = aws.scale, 0
+    seed_device(lf, device_id, 1, messages)
+    aws.scale = scale
+    table = aws.dynamodb.Table(lf.DYNAMODB_TABLE)
+    session_id = next(item['sessionId'] for item in table.items.values()
+                      if item.get('deviceId') == device_id and item.get('type') == 'SESSION_META')
+    return [{'action': 'get_session_detail', 'deviceId': device_id, 'sessionId': session_id} for _ in range(iterations)]
+
+
+def workload_analyze(lf, aws, iterations, turns=60):
+    """analyze: 긴 대화 기록 분석"""
+    return [{'action': 'analyze', 'messages': conversation(turns)} for _ in range(iterations)]
+
+
+WORKLOADS = {
+    'chat': workload_chat,
+    'tts': workload_tts,
+    'save': workload_save,
+    'sessions': workload_sessions,
+    'detail': workload_detail,
+    'analyze': workload_analyze,
+}
+
+
+# ============================================
+# 실행 / 리포트
+# ============================================
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def run_workload(lf, aws, name, iterations, concurrency, measure_memory):
+    payloads = WORKLOADS[name](lf, aws, iterations)
+    if measure_memory:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda p: invoke(lf, p), payloads))
+    else:
+        results = [invoke(lf, p) for p in payloads]
+    elapsed = time.perf_counter() - started
+
+    peak_kb = None
+    if measure_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_kb = round(peak / 1024, 1)
+
+    latencies = [ms for ms, _ in results]
+    return {
+        'workload': name,
+        'action': payloads[0]['action'] if payloads else None,
+        'requests': len(results),
+        'errors': sum(1 for _, status in results if status >= 400),
+        'throughput': round(len(results) / elapsed, 1) if elapsed else 0.0,
+        'mean': round(statistics.mean(latencies), 2) if latencies else 0.0,
+        'p50': round(percentile(latencies, 50), 2),
+        'p95': round(percentile(latencies, 95), 2),
+        'p99': round(percentile(latencies, 99), 2),
+        'peakMemoryKB': peak_kb,
+    }
+
+
+def print_report(results):
+    header = f"{'workload':<10} {'action':<20} {'reqs':>6} {'err':>4} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KB':>10}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        memory = f"{r['peakMemoryKB']:.1f}" if r['peakMemoryKB'] is not None else '-'
+        print(f"{r['workload']:<10} {r['action'] or '-':<20} {r['requests']:>6} {r['errors']:>4} {r['throughput']:>9.1f} "
+              f"{r['p50']:>9.2f} {r['p95']:>9.2f} {r['p99']:>9.2f} {memory:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmark for lambda_function.lambda_handler')
+    parser.add_argument('--workload', choices=['all', *WORKLOADS], default='all')
+    parser.add_argument('--iterations', type=int, default=50, help='requests per workload')
+    parser.add_argument('--concurrency', type=int, default=1, help='parallel invocations (threads)')
+    parser.add_argument('--latency-scale', type=float, default=1.0, help='multiplier for injected AWS latencies (0 = none)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc peak measurement')
+    parser.add_argument('--json', metavar='PATH', help='write results as JSON')
+    args = parser.parse_args(argv)
+
+    aws = FakeAWS(scale=args.latency_scale, seed=args.seed)
+    lf = load_lambda(aws)
+
+    names = list(WORKLOADS) if args.workload == 'all' else [args.workload]
+    results = [run_workload(lf, aws, name, args.iterations, args.concurrency, not args.no_memory) for name in names]
+    print_report(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'latencyScale': args.latency_scale, 'concurrency': args.concurrency, 'results': results}, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1006 @@
+"""
+로컬 실행용 AWS 대역 (in-process stand-ins)
+
+lambda_function.py를 실제 AWS 없이 돌리기 위한 Bedrock / Polly / Transcribe /
+Translate / S3 / DynamoDB 대역. 벤치마크(benchmark.py)에서 사용한다.
+
+- 서비스별 지연시간을 로그정규 분포(중앙값, p99)로 주입 (scale=0이면 지연 없음)
+- botocore와 같은 before-call / after-call 이벤트를 발생시켜 Server-Timing span이 그대로 기록됨
+- DynamoDB는 리소스 API(Table) 중 이 프로젝트가 쓰는 부분만 구현:
+  키/필터/조건/업데이트 표현식, GSI(희소 인덱스 포함), Limit·1MB 페이지, ExclusiveStartKey
+"""
+
+import io
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from decimal import Decimal
+from types import SimpleNamespace
+
+from botocore.exceptions import ClientError
+from botocore.hooks import HierarchicalEmitter
+
+
+# ============================================
+# 지연시간 모델
+# ============================================
+
+class Latency:
+    """로그정규 지연시간 (ms). 중앙값과 p99로 지정"""
+
+    def __init__(self, median_ms, p99_ms=None):
+        self.median_ms = median_ms
+        self.sigma = math.log((p99_ms or median_ms) / median_ms) / 2.326 if median_ms else 0.0
+
+    def sample(self, scale=1.0):
+        if not self.median_ms or not scale:
+            return 0.0
+        return self.median_ms * math.exp(random.gauss(0, self.sigma)) * scale
+
+
+DEFAULT_LATENCIES = {
+    'bedrock-runtime': Latency(900, 2500),
+    'polly': Latency(400, 1200),
+    'transcribe': Latency(40, 150),
+    'translate': Latency(120, 400),
+    's3': Latency(25, 100),
+    'dynamodb': Latency(6, 25),
+    'lambda': Latency(30, 100),
+}
+
+# Transcribe 배치 작업이 COMPLETED가 되기까지 걸리는 시간
+TRANSCRIBE_JOB_LATENCY = Latency(2000, 4000)
+
+
+class FakeAWS:
+    """대역 클라이언트 묶음. scale로 모든 지연시간을 배율 조정 (0 = 지연 없음)"""
+
+    def __init__(self, scale=1.0, latencies=None, seed=None):
+        self.scale = scale
+        self.latencies = {**DEFAULT_LATENCIES, **(latencies or {})}
+        if seed is not None:
+            random.seed(seed)
+
+        self.bedrock = FakeBedrock(self)
+        self.polly = FakePolly(self)
+        self.transcribe = FakeTranscribe(self)
+        self.translate = FakeTranslate(self)
+        self.s3 = FakeS3(self)
+        self.dynamodb = FakeDynamoDBResource(self)
+        self.lambda_client = FakeLambda(self)
+        self.http = FakeHTTPPool(self)
+
+    def clients(self):
+        """lambda_function.CLIENT_SPECS 이름 → 대역 객체"""
+        return {
+            'bedrock': self.bedrock,
+            'bedrock_chat': self.bedrock,
+            'polly': self.polly,
+            'transcribe': self.transcribe,
+            'translate': self.translate,
+            's3': self.s3,
+            'dynamodb': self.dynamodb,
+            'lambda': self.lambda_client,
+        }
+
+    def install(self, module):
+        """lambda_function 모듈의 AWS 클라이언트를 대역으로 교체"""
+        for name, client in self.clients().items():
+            module.set_client(name, client)
+        module._http_pool = self.http
+        return self
+
+
+class _ServiceModel:
+    def __init__(self, service_name):
+        self.service_model = SimpleNamespace(service_name=service_name)
+
+
+class FakeClient:
+    """botocore 클라이언트처럼 호출 전후 이벤트를 발생시키는 대역 기반 클래스"""
+
+    service_name = None
+
+    def __init__(self, aws):
+        self.aws = aws
+        self.meta = SimpleNamespace(events=HierarchicalEmitter(), region_name='us-east-1')
+        self._model = _ServiceModel(self.service_name)
+        self.calls = 0
+
+    def _sleep(self, latency=None):
+        delay = (latency or self.aws.latencies[self.service_name]).sample(self.aws.scale)
+        if delay:
+            time.sleep(delay / 1000)
+
+    def _call(self, operation, fn, latency=None):
+        context = {}
+        events = self.meta.events
+        events.emit(f'before-call.{self.service_name}.{operation}', model=self._model, params={}, request_signer=None, context=context)
+        try:
+            self.calls += 1
+            self._sleep(latency)
+            result = fn()
+        except Exception as e:
+            events.emit(f'after-call-error.{self.service_name}.{operation}', exception=e, context=context)
+            raise
+        events.emit(f'after-call.{self.service_name}.{operation}', http_response=None, parsed=result, model=self._model, context=context)
+        return result
+
+
+def client_error(code, message='', operation='Operation', status=400):
+    return ClientError({'Error': {'Code': code, 'Message': message}, 'ResponseMetadata': {'HTTPStatusCode': status}}, operation)
+
+
+# ============================================
+# Bedrock
+# ============================================
+
+TUTOR_REPLIES = [
+    "That sounds interesting! What made you choose that career?",
+    "Oh nice! Do you do that often?",
+    "I see. What do you enjoy most about it?",
+    "That's a great point. How did your team react to that?",
+    "Really? Tell me more about what happened next.",
+]
+
+FAKE_ANALYSIS = {
+    'accuracy': 74,
+    'pronunciation': 77,
+    'grammar_corrections': [
+        {'original': 'I go to office yesterday.', 'corrected': 'I went to the office yesterday.', 'explanation': '과거 시제와 관사를 사용하세요.'}
+    ],
+    'suggested_words': ['collaborate', 'prioritize', 'facilitate'],
+    'overall_feedback': '자연스럽게 대화를 이어가셨어요. 시제에 조금 더 신경 쓰면 좋겠습니다.',
+    'improvement_tips': ['과거 시제를 연습해보세요', '관사 사용에 주의하세요', '연결어를 다양하게 써보세요'],
+}
+
+
+class FakeStreamingBody:
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def read(self, amt=None):
+        return self._stream.read(amt)
+
+
+class FakeBedrock(FakeClient):
+    service_name = 'bedrock-runtime'
+
+    def _reply(self, body):
+        request = json.loads(body)
+        prompt = json.dumps(request.get('messages', []))
+        if 'JSON' in prompt:
+            return json.dumps(FAKE_ANALYSIS, ensure_ascii=False)
+        if 'Summarize' in prompt or 'summar' in request.get('system', '').lower():
+            return 'The student talked about their job and weekend plans.'
+        return random.choice(TUTOR_REPLIES)
+
+    def invoke_model(self, modelId, body, **kwargs):
+        def run():
+            text = self._reply(body)
+            payload = {'content': [{'type': 'text', 'text': text}], 'stop_reason': 'end_turn',
+                       'usage': {'input_tokens': len(body) // 4, 'output_tokens': len(text) // 4}}
+            return {'body': FakeStreamingBody(json.dumps(payload).encode('utf-8')), 'contentType': 'application/json'}
+        return self._call('InvokeModel', run)
+
+    def invoke_model_with_response_stream(self, modelId, body, **kwargs):
+        text = self._reply(body)
+        total_delay = self.aws.latencies[self.service_name].sample(self.aws.scale) / 1000
+        pieces = [text[i:i + 12] for i in range(0, len(text), 12)]
+
+        def events():
+            # 첫 토큰까지 40%, 나머지를 조각마다 나눠서 지연
+            yield {'chunk': {'bytes': json.dumps({'type': 'message_start'}).encode()}}
+            for piece in pieces:
+                time.sleep(total_delay * 0.6 / len(pieces))
+                yield {'chunk': {'bytes': json.dumps({'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': piece}}).encode()}}
+            yield {'chunk': {'bytes': json.dumps({'type': 'message_stop'}).encode()}}
+
+        def run():
+            time.sleep(total_delay * 0.4)
+            return {'body': events(), 'contentType': 'application/json'}
+        return self._call('InvokeModelWithResponseStream', run, latency=Latency(0))
+
+
+# ============================================
+# Polly / Translate / Transcribe / S3 / Lambda
+# ============================================
+
+MP3_FRAME_HEADER = b'\xff\xfb\x90\x64'
+
+
+class FakePolly(FakeClient):
+    service_name = 'polly'
+
+    def synthesize_speech(self, Text, OutputFormat='mp3', VoiceId='Joanna', Engine='neural', **kwargs):
+        if len(Text) > 3000:
+            raise client_error('TextLengthExceededException', 'Maximum text length has been exceeded', 'SynthesizeSpeech')
+
+        def run():
+            # 대략 글자당 1 프레임 분량의 가짜 MP3 프레임
+            frame = MP3_FRAME_HEADER + Text.encode('utf-8')[:60].ljust(60, b'\x00')
+            audio = frame * max(1, len(Text) // 4)
+            return {'AudioStream': FakeStreamingBody(audio), 'ContentType': 'audio/mpeg', 'RequestCharacters': len(Text)}
+        return self._call('SynthesizeSpeech', run)
+
+
+class FakeTranslate(FakeClient):
+    service_name = 'translate'
+
+    def translate_text(self, Text, SourceLanguageCode, TargetLanguageCode, **kwargs):
+        return self._call('TranslateText', lambda: {
+            'TranslatedText': f'[{TargetLanguageCode}] {Text}',
+            'SourceLanguageCode': SourceLanguageCode,
+            'TargetLanguageCode': TargetLanguageCode,
+        })
+
+
+class FakeTranscribe(FakeClient):
+    service_name = 'transcribe'
+
+    def __init__(self, aws):
+        super().__init__(aws)
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def start_transcription_job(self, TranscriptionJobName, Media, **kwargs):
+        def run():
+            ready_at = time.monotonic() + TRANSCRIBE_JOB_LATENCY.sample(self.aws.scale) / 1000
+            with self.lock:
+                self.jobs[TranscriptionJobName] = ready_at
+            return {'TranscriptionJob': {'TranscriptionJobName': TranscriptionJobName, 'TranscriptionJobStatus': 'IN_PROGRESS'}}
+        return self._call('StartTranscriptionJob', run)
+
+    def get_transcription_job(self, TranscriptionJobName):
+        def run():
+            with self.lock:
+                ready_at = self.jobs.get(TranscriptionJobName)
+            if ready_at is None:
+                raise client_error('BadRequestException', "The requested job couldn't be found.", 'GetTranscriptionJob')
+            job = {'TranscriptionJobName': TranscriptionJobName,
+                   'TranscriptionJobStatus': 'COMPLETED' if time.monotonic() >= ready_at else 'IN_PROGRESS'}
+            if job['TranscriptionJobStatus'] == 'COMPLETED':
+                job['Transcript'] = {'TranscriptFileUri': f'fake://transcripts/{TranscriptionJobName}.json'}
+            return {'TranscriptionJob': job}
+        return self._call('GetTranscriptionJob', run)
+
+    def delete_transcription_job(self, TranscriptionJobName):
+        def run():
+            with self.lock:
+                if self.jobs.pop(TranscriptionJobName, None) is None:
+                    raise client_error('BadRequestException', "The requested job couldn't be found.", 'DeleteTranscriptionJob')
+            return {}
+        return self._call('DeleteTranscriptionJob', run)
+
+
+class FakeHTTPResponse:
+    def __init__(self, status, data):
+        self.status = status
+        self.data = data
+
+
+class FakeHTTPPool:
+    """transcript 파일 다운로드용 urllib3.PoolManager 대역"""
+
+    def __init__(self, aws):
+        self.aws = aws
+
+    def request(self, method, url, **kwargs):
+        time.sleep(self.aws.latencies['s3'].sample(self.aws.scale) / 1000)
+        if url.startswith('fake://transcripts/'):
+            payload = {'results': {'transcripts': [{'transcript': 'I went to the office yesterday and um had a meeting.'}]}}
+            return FakeHTTPResponse(200, json.dumps(payload).encode('utf-8'))
+        return FakeHTTPResponse(404, b'')
+
+
+class FakeS3(FakeClient):
+    service_name = 's3'
+
+    def __init__(self, aws):
+        super().__init__(aws)
+        self.objects = {}
+        self.lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body=b'', **kwargs):
+        def run():
+            with self.lock:
+                self.objects[(Bucket, Key)] = (Body if isinstance(Body, bytes) else Body.encode('utf-8'), kwargs.get('ContentType'))
+            return {'ETag': f'"{uuid.uuid4().hex}"'}
+        return self._call('PutObject', run)
+
+    def get_object(self, Bucket, Key, **kwargs):
+        def run():
+            with self.lock:
+                found = self.objects.get((Bucket, Key))
+            if found is None:
+                raise client_error('NoSuchKey', 'The specified key does not exist.', 'GetObject', 404)
+            return {'Body': FakeStreamingBody(found[0]), 'ContentType': found[1], 'ContentLength': len(found[0])}
+        return self._call('GetObject', run)
+
+    def head_object(self, Bucket, Key, **kwargs):
+        def run():
+            with self.lock:
+                found = self.objects.get((Bucket, Key))
+            if found is None:
+                raise client_error('404', 'Not Found', 'HeadObject', 404)
+            return {'ContentType': found[1], 'ContentLength': len(found[0])}
+        return self._call('HeadObject', run)
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        def run():
+            with self.lock:
+                self.objects.pop((Bucket, Key), None)
+            return {}
+        return self._call('DeleteObject', run)
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, **kwargs):
+        params = Params or {}
+        return f"https://{params.get('Bucket')}.s3.amazonaws.com/{params.get('Key')}?X-Amz-Expires={ExpiresIn}&X-Amz-Signature=fake"
+
+
+class FakeLambda(FakeClient):
+    """비동기 Invoke(Event)를 로컬 스레드로 실행하는 Lambda 대역. handler를 지정해야 동작"""
+
+    service_name = 'lambda'
+
+    def __init__(self, aws):
+        super().__init__(aws)
+        self.handler = None
+
+    def invoke(self, FunctionName, Payload=b'{}', InvocationType='RequestResponse', **kwargs):
+        event = json.loads(Payload)
+
+        def run():
+            if self.handler is None:
+                raise client_error('ResourceNotFoundException', f'Function not found: {FunctionName}', 'Invoke', 404)
+            if InvocationType == 'Event':
+                threading.Thread(target=self.handler, args=(event, None), daemon=True).start()
+                return {'StatusCode': 202}
+            result = self.handler(event, None)
+            return {'StatusCode': 200, 'Payload': FakeStreamingBody(json.dumps(result).encode('utf-8'))}
+        return self._call('Invoke', run)
+
+
+# ============================================
+# DynamoDB: 표현식 파서
+# ============================================
+
+_MISSING = object()
+_TOKEN = re.compile(r'\s*(<>|<=|>=|=|<|>|\(|\)|,|\.|\+|-|:[A-Za-z0-9_]+|#[A-Za-z0-9_]+|[A-Za-z_][A-Za-z0-9_]*)')
+
+
+def _tokenize(expression):
+    tokens, pos = [], 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN.match(expression, pos)
+        if not match:
+            raise client_error('ValidationException', f'Invalid expression near: {expression[pos:]}')
+        tokens.append(match.group(1))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """DynamoDB 조건/업데이트 표현식을 item → 값 함수로 컴파일"""
+
+    def __init__(self, expression, names=None, values=None):
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def keyword(self, word):
+        token = self.peek()
+        if token is not None and token.upper() == word:
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, token):
+        if self.peek() is None or self.peek().upper() != token.upper():
+            raise client_error('ValidationException', f'Expected {token}, got {self.peek()}')
+        self.pos += 1
+
+    # --- 경로 / 피연산자 ---
+    def path(self):
+        parts = [self._name(self.tokens[self.pos])]
+        self.pos += 1
+        while self.peek() == '.':
+            self.pos += 1
+            parts.append(self._name(self.tokens[self.pos]))
+            self.pos += 1
+        return parts
+
+    def _name(self, token):
+        if token.startswith('#'):
+            if token not in self.names:
+                raise client_error('ValidationException', f'Undefined attribute name: {token}')
+            return self.names[token]
+        return token
+
+    def operand(self):
+        token = self.peek()
+        if token.startswith(':'):
+            self.pos += 1
+            if token not in self.values:
+                raise client_error('ValidationException', f'Undefined attribute value: {token}')
+            value = self.values[token]
+            return lambda item: value
+        if token.lower() == 'size' and self.peek(1) == '(':
+            self.pos += 2
+            path = self.path()
+            self.expect(')')
+            return lambda item: _size(get_path(item, path))
+        path = self.path()
+        return lambda item: get_path(item, path)
+
+    # --- 조건식 ---
+    def condition(self):
+        left = self.and_condition()
+        while self.keyword('OR'):
+            right = self.and_condition()
+            left = (lambda a, b: lambda item: a(item) or b(item))(left, right)
+        return left
+
+    def and_condition(self):
+        left = self.not_condition()
+        while self.keyword('AND'):
+            right = self.not_condition()
+            left = (lambda a, b: lambda item: a(item) and b(item))(left, right)
+        return left
+
+    def not_condition(self):
+        if self.keyword('NOT'):
+            inner = self.not_condition()
+            return lambda item: not inner(item)
+        return self.primary()
+
+    def primary(self):
+        token = self.peek()
+        if token == '(':
+            self.pos += 1
+            inner = self.condition()
+            self.expect(')')
+            return inner
+
+        function = token.lower()
+        if function in ('begins_with', 'attribute_exists', 'attribute_not_exists', 'contains') and self.peek(1) == '(':
+            self.pos += 2
+            path = self.path()
+            argument = None
+            if self.peek() == ',':
+                self.pos += 1
+                argument = self.operand()
+            self.expect(')')
+            if function == 'attribute_exists':
+                return lambda item: get_path(item, path) is not _MISSING
+            if function == 'attribute_not_exists':
+                return lambda item: get_path(item, path) is _MISSING
+            if function == 'begins_with':
+                return lambda item: isinstance(get_path(item, path), str) and get_path(item, path).startswith(argument(item))
+            return lambda item: _contains(get_path(item, path), argument(item))
+
+        left = self.operand()
+        if self.keyword('BETWEEN'):
+            low = self.operand()
+            self.expect('AND')
+            high = self.operand()
+            return lambda item: _compare(left(item), '>=', low(item)) and _compare(left(item), '<=', high(item))
+        if self.keyword('IN'):
+            self.expect('(')
+            options = [self.operand()]
+            while self.peek() == ',':
+                self.pos += 1
+                options.append(self.operand())
+            self.expect(')')
+            return lambda item: any(_compare(left(item), '=', option(item)) for option in options)
+
+        operator = self.peek()
+        if operator not in ('=', '<>', '<', '<=', '>', '>='):
+            raise client_error('ValidationException', f'Invalid operator: {operator}')
+        self.pos += 1
+        right = self.operand()
+        return lambda item: _compare(left(item), operator, right(item))
+
+    # --- 업데이트식 ---
+    def update(self):
+        actions = []
+        while self.peek() is not None:
+            clause = self.tokens[self.pos].upper()
+            self.pos += 1
+            while True:
+                if clause == 'SET':
+                    path = self.path()
+                    self.expect('=')
+                    actions.append(('SET', path, self.set_value()))
+                elif clause == 'REMOVE':
+                    actions.append(('REMOVE', self.path(), None))
+                elif clause == 'ADD':
+                    path = self.path()
+                    actions.append(('ADD', path, self.operand()))
+                elif clause == 'DELETE':
+                    path = self.path()
+                    actions.append(('DELETE', path, self.operand()))
+                else:
+                    raise client_error('ValidationException', f'Invalid update clause: {clause}')
+                if self.peek() != ',':
+                    break
+                self.pos += 1
+        return actions
+
+    def set_value(self):
+        left = self.set_term()
+        if self.peek() in ('+', '-'):
+            operator = self.tokens[self.pos]
+            self.pos += 1
+            right = self.set_term()
+            if operator == '+':
+                return lambda item: left(item) + right(item)
+            return lambda item: left(item) - right(item)
+        return left
+
+    def set_term(self):
+        token = self.peek().lower()
+        if token == 'if_not_exists' and self.peek(1) == '(':
+            self.pos += 2
+            path = self.path()
+            self.expect(',')
+            default = self.operand()
+            self.expect(')')
+            return lambda item: default(item) if get_path(item, path) is _MISSING else get_path(item, path)
+        if token == 'list_append' and self.peek(1) == '(':
+            self.pos += 2
+            first = self.set_term()
+            self.expect(',')
+            second = self.set_term()
+            self.expect(')')
+            return lambda item: list(first(item)) + list(second(item))
+        return self.operand()
+
+
+def get_path(item, path):
+    value = item
+    for part in path:
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set_path(item, path, value):
+    for part in path[:-1]:
+        item = item.setdefault(part, {})
+    item[path[-1]] = value
+
+
+def _remove_path(item, path):
+    for part in path[:-1]:
+        item = item.get(part, {})
+    item.pop(path[-1], None)
+
+
+def _size(value):
+    if value is _MISSING:
+        return _MISSING
+    if isinstance(value, (str, bytes, list, dict, set)):
+        return Decimal(len(value))
+    return _MISSING
+
+
+def _contains(value, argument):
+    if isinstance(value, (str, list, set)):
+        return argument in value
+    return False
+
+
+def _compare(left, operator, right):
+    if left is _MISSING or right is _MISSING:
+        return operator == '<>' and left is not right
+    try:
+        if operator == '=':
+            return left == right
+        if operator == '<>':
+            return left != right
+        if operator == '<':
+            return left < right
+        if operator == '<=':
+            return left <= right
+        if operator == '>':
+            return left > right
+        return left >= right
+    except TypeError:
+        return False
+
+
+def compile_condition(expression, names=None, values=None):
+    parser = _Parser(expression, names, values)
+    condition = parser.condition()
+    if parser.peek() is not None:
+        raise client_error('ValidationException', f'Unexpected token: {parser.peek()}')
+    return condition
+
+
+def project(item, expression, names=None):
+    """ProjectionExpression 적용 (최상위 / 점 경로)"""
+    if not expression:
+        return item
+    result = {}
+    for raw in expression.split(','):
+        parts = [(names or {}).get(p.strip(), p.strip()) for p in raw.split('.')]
+        value = get_path(item, parts)
+        if value is not _MISSING:
+            _set_path(result, parts, value)
+    return result
+
+
+def to_dynamo(value):
+    """boto3 리소스 API처럼 float은 거부하고 int는 Decimal로 저장"""
+    if isinstance(value, bool) or value is None or isinstance(value, (str, bytes, Decimal)):
+        return value
+    if isinstance(value, float):
+        raise TypeError('Float types are not supported. Use Decimal types instead.')
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, dict):
+        return {k: to_dynamo(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_dynamo(v) for v in value]
+    if isinstance(value, set):
+        return {to_dynamo(v) for v in value}
+    raise TypeError(f'Unsupported type: {type(value)}')
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def _item_size(item):
+    return len(json.dumps(item, default=str))
+
+
+# ============================================
+# DynamoDB: 테이블
+# ============================================
+
+PAGE_BYTES = 1024 * 1024
+
+DEFAULT_INDEXES = {
+    'GSI1': ('GSI1PK', 'GSI1SK'),
+    'GSI2': ('GSI2PK', 'GSI2SK'),
+}
+
+
+class _Partition:
+    """파티션 내 아이템을 정렬 키 순으로 유지"""
+
+    def __init__(self):
+        self.order = []
+        self.members = set()
+
+    def add(self, sort_tuple):
+        if sort_tuple not in self.members:
+            insort(self.order, sort_tuple)
+            self.members.add(sort_tuple)
+
+    def remove(self, sort_tuple):
+        if sort_tuple in self.members:
+            self.members.discard(sort_tuple)
+            del self.order[bisect_left(self.order, sort_tuple)]
+
+
+class FakeTable:
+    def __init__(self, client, name, hash_key='PK', range_key='SK', indexes=None):
+        self.client = client
+        self.name = name
+        self.table_name = name
+        self.hash_key, self.range_key = hash_key, range_key
+        self.indexes = {None: (hash_key, range_key), **(indexes if indexes is not None else DEFAULT_INDEXES)}
+        self.items = {}
+        self.sizes = {}
+        self.partitions = {index: {} for index in self.indexes}
+        self.lock = threading.RLock()
+        self.meta = SimpleNamespace(client=client)
+
+    # --- 내부 저장소 ---
+    def _key(self, item):
+        return (item[self.hash_key], item[self.range_key])
+
+    def _sort_tuple(self, index, item):
+        _, range_attr = self.indexes[index]
+        return (item[range_attr], item[self.hash_key], item[self.range_key])
+
+    def _index(self, item):
+        for index, (hash_attr, range_attr) in self.indexes.items():
+            if hash_attr in item and range_attr in item:
+                self.partitions[index].setdefault(item[hash_attr], _Partition()).add(self._sort_tuple(index, item))
+
+    def _unindex(self, item):
+        for index, (hash_attr, range_attr) in self.indexes.items():
+            if hash_attr in item and range_attr in item:
+                partition = self.partitions[index].get(item[hash_attr])
+                if partition:
+                    partition.remove(self._sort_tuple(index, item))
+
+    def _store(self, item):
+        key = self._key(item)
+        with self.lock:
+            old = self.items.get(key)
+            if old is not None:
+                self._unindex(old)
+            self.items[key] = item
+            self.sizes[key] = _item_size(item)
+            self._index(item)
+        return old
+
+    def _remove(self, key):
+        with self.lock:
+            old = self.items.pop(key, None)
+            if old is not None:
+                self._unindex(old)
+                self.sizes.pop(key, None)
+        return old
+
+    def _check_condition(self, existing, expression, names, values, operation):
+        if expression and not compile_condition(expression, names, values)(existing or {}):
+            raise client_error('ConditionalCheckFailedException', 'The conditional request failed', operation)
+
+    # --- 단건 ---
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None, ExpressionAttributeValues=None, **kwargs):
+        item = to_dynamo(Item)
+        values = to_dynamo(ExpressionAttributeValues or {})
+
+        def run():
+            with self.lock:
+                self._check_condition(self.items.get(self._key(item)), ConditionExpression, ExpressionAttributeNames, values, 'PutItem')
+                self._store(_copy(item))
+            return {}
+        return self.client._call('PutItem', run)
+
+    def get_item(self, Key, ProjectionExpression=None, ExpressionAttributeNames=None, **kwargs):
+        def run():
+            with self.lock:
+                item = self.items.get((Key[self.hash_key], Key[self.range_key]))
+                return {'Item': project(_copy(item), ProjectionExpression, ExpressionAttributeNames)} if item else {}
+        return self.client._call('GetItem', run)
+
+    def delete_item(self, Key, ConditionExpression=None, ExpressionAttributeNames=None, ExpressionAttributeValues=None, **kwargs):
+        key = (Key[self.hash_key], Key[self.range_key])
+        values = to_dynamo(ExpressionAttributeValues or {})
+
+        def run():
+            with self.lock:
+                self._check_condition(self.items.get(key), ConditionExpression, ExpressionAttributeNames, values, 'DeleteItem')
+                self._remove(key)
+            return {}
+        return self.client._call('DeleteItem', run)
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+                    ConditionExpression=None, ReturnValues='NONE', **kwargs):
+        key = (Key[self.hash_key], Key[self.range_key])
+        values = to_dynamo(ExpressionAttributeValues or {})
+
+        def run():
+            with self.lock:
+                existing = self.items.get(key)
+                self._check_condition(existing, ConditionExpression, ExpressionAttributeNames, values, 'UpdateItem')
+                item = _copy(existing) if existing else {self.hash_key: key[0], self.range_key: key[1]}
+                for action, path, value in _Parser(UpdateExpression, ExpressionAttributeNames, values).update():
+                    if action == 'SET':
+                        _set_path(item, path, value(item))
+                    elif action == 'REMOVE':
+                        _remove_path(item, path)
+                    elif action == 'ADD':
+                        current = get_path(item, path)
+                        increment = value(item)
+                        if isinstance(increment, set):
+                            _set_path(item, path, (set() if current is _MISSING else current) | increment)
+                        else:
+                            _set_path(item, path, (Decimal(0) if current is _MISSING else current) + increment)
+                    elif action == 'DELETE':
+                        current = get_path(item, path)
+                        if current is not _MISSING:
+                            _set_path(item, path, current - value(item))
+                self._store(item)
+                if ReturnValues in ('ALL_NEW', 'UPDATED_NEW'):
+                    return {'Attributes': _copy(item)}
+                if ReturnValues == 'ALL_OLD' and existing:
+                    return {'Attributes': _copy(existing)}
+                return {}
+        return self.client._call('UpdateItem', run)
+
+    # --- 조회 ---
+    def query(self, KeyConditionExpression, ExpressionAttributeValues=None, ExpressionAttributeNames=None,
+              IndexName=None, FilterExpression=None, ProjectionExpression=None, Limit=None,
+              ScanIndexForward=True, ExclusiveStartKey=None, Select=None, **kwargs):
+        if IndexName not in self.indexes:
+            raise client_error('ValidationException', f'The table does not have the specified index: {IndexName}', 'Query')
+        hash_attr, _ = self.indexes[IndexName]
+        values = ExpressionAttributeValues or {}
+        names = ExpressionAttributeNames or {}
+
+        # 파티션 키 값 찾기: "<hash> = :v"
+        resolved = re.sub(r'#[A-Za-z0-9_]+', lambda m: names.get(m.group(0), m.group(0)), KeyConditionExpression)
+        match = re.search(rf'(?<![A-Za-z0-9_]){hash_attr}\s*=\s*(:[A-Za-z0-9_]+)', resolved)
+        if not match:
+            raise client_error('ValidationException', 'Query condition missed key schema element', 'Query')
+        partition_value = values[match.group(1)]
+
+        key_condition = compile_condition(KeyConditionExpression, names, values)
+        item_filter = compile_condition(FilterExpression, names, values) if FilterExpression else None
+
+        def run():
+            with self.lock:
+                partition = self.partitions[IndexName].get(partition_value)
+                order = list(partition.order) if partition else []
+                if not ScanIndexForward:
+                    order.reverse()
+                if ExclusiveStartKey:
+                    start = self._sort_tuple(IndexName, ExclusiveStartKey)
+                    if ScanIndexForward:
+                        order = order[bisect_right(order, start):]
+                    else:
+                        order = [t for t in order if t < start]
+
+                items, evaluated, scanned_bytes, last_key = [], 0, 0, None
+                for position, sort_tuple in enumerate(order):
+                    key = (sort_tuple[1], sort_tuple[2])
+                    item = self.items[key]
+                    if not key_condition(item):
+                        continue
+                    evaluated += 1
+                    scanned_bytes += self.sizes[key]
+                    if item_filter is None or item_filter(item):
+                        items.append(project(_copy(item), ProjectionExpression, names))
+                    limit_reached = (Limit and evaluated >= Limit) or scanned_bytes >= PAGE_BYTES
+                    if limit_reached and position + 1 < len(order):
+                        last_key = {self.hash_key: key[0], self.range_key: key[1]}
+                        if IndexName:
+                            index_hash, index_range = self.indexes[IndexName]
+                            last_key.update({index_hash: item[index_hash], index_range: item[index_range]})
+                        break
+
+            result = {'Count': len(items), 'ScannedCount': evaluated}
+            if Select != 'COUNT':
+                result['Items'] = items
+            if last_key:
+                result['LastEvaluatedKey'] = last_key
+            return result
+        return self.client._call('Query', run)
+
+    def scan(self, FilterExpression=None, ExpressionAttributeValues=None, ExpressionAttributeNames=None,
+             ProjectionExpression=None, Limit=None, ExclusiveStartKey=None, **kwargs):
+        item_filter = compile_condition(FilterExpression, ExpressionAttributeNames, ExpressionAttributeValues) if FilterExpression else None
+
+        def run():
+            with self.lock:
+                keys = sorted(self.items)
+                if ExclusiveStartKey:
+                    keys = keys[bisect_right(keys, (ExclusiveStartKey[self.hash_key], ExclusiveStartKey[self.range_key])):]
+                items, last_key = [], None
+                for position, key in enumerate(keys):
+                    item = self.items[key]
+                    if item_filter is None or item_filter(item):
+                        items.append(project(_copy(item), ProjectionExpression, ExpressionAttributeNames))
+                    if Limit and position + 1 >= Limit and position + 1 < len(keys):
+                        last_key = {self.hash_key: key[0], self.range_key: key[1]}
+                        break
+            result = {'Items': items, 'Count': len(items)}
+            if last_key:
+                result['LastEvaluatedKey'] = last_key
+            return result
+        return self.client._call('Scan', run)
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return FakeBatchWriter(self)
+
+
+class FakeBatchWriter:
+    """boto3 BatchWriter 대역: 25개씩 모아 BatchWriteItem 한 번으로 기록"""
+
+    def __init__(self, table):
+        self.table = table
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def put_item(self, Item):
+        self.pending.append({'PutRequest': {'Item': Item}})
+        if len(self.pending) >= 25:
+            self.flush()
+
+    def delete_item(self, Key):
+        self.pending.append({'DeleteRequest': {'Key': Key}})
+        if len(self.pending) >= 25:
+            self.flush()
+
+    def flush(self):
+        while self.pending:
+            batch, self.pending = self.pending[:25], self.pending[25:]
+            response = self.table.client.batch_write_item(RequestItems={self.table.name: batch})
+            self.pending.extend(response.get('UnprocessedItems', {}).get(self.table.name, []))
+
+
+class FakeDynamoDBClient(FakeClient):
+    """리소스의 meta.client 대역 (batch_write_item, 이벤트 훅)"""
+
+    service_name = 'dynamodb'
+
+    def __init__(self, aws, resource):
+        super().__init__(aws)
+        self.resource = resource
+        # 0보다 크면 BatchWriteItem 요청 중 이 비율만큼 UnprocessedItems로 돌려줌 (스로틀링 흉내)
+        self.unprocessed_rate = 0.0
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        def run():
+            unprocessed = {}
+            for table_name, requests in RequestItems.items():
+                if len(requests) > 25:
+                    raise client_error('ValidationException', 'Too many items requested for the BatchWriteItem call', 'BatchWriteItem')
+                table = self.resource.Table(table_name)
+                for request in requests:
+                    if self.unprocessed_rate and random.random() < self.unprocessed_rate:
+                        unprocessed.setdefault(table_name, []).append(request)
+                    elif 'PutRequest' in request:
+                        table._store(_copy(to_dynamo(request['PutRequest']['Item'])))
+                    else:
+                        key = request['DeleteRequest']['Key']
+                        table._remove((key[table.hash_key], key[table.range_key]))
+            return {'UnprocessedItems': unprocessed}
+        return self._call('BatchWriteItem', run)
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        return self.resource.batch_get_item(RequestItems=RequestItems)
+
+
+class FakeDynamoDBResource:
+    def __init__(self, aws, indexes=None):
+        self.aws = aws
+        self.indexes = indexes
+        self.client = FakeDynamoDBClient(aws, self)
+        self.meta = SimpleNamespace(client=self.client)
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def Table(self, name):
+        with self.lock:
+            if name not in self.tables:
+                self.tables[name] = FakeTable(self.client, name, indexes=self.indexes)
+            return self.tables[name]
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        if sum(len(spec['Keys']) for spec in RequestItems.values()) > 100:
+            raise client_error('ValidationException', 'Too many items requested for the BatchGetItem call', 'BatchGetItem')
+
+        def run():
+            responses = {}
+            for table_name, spec in RequestItems.items():
+                table = self.Table(table_name)
+                found = responses.setdefault(table_name, [])
+                with table.lock:
+                    for key in spec['Keys']:
+                        item = table.items.get((key[table.hash_key], key[table.range_key]))
+                        if item:
+                            found.append(project(_copy(item), spec.get('ProjectionExpression'), spec.get('ExpressionAttributeNames')))
+            return {'Responses': responses, 'UnprocessedKeys': {}}
+        return self.client._call('BatchGetItem', run)
@@ -1,34 +1,299 @@
 import json
+import os
 import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 import re
 import base64
 import time
-import urllib.request
+import urllib3
+import uuid
 import hashlib
-import hmac
+import threading
+import random
+import contextvars
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, timezone
-from urllib.parse import quote
 
-# AWS 클라이언트
-bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
-polly = boto3.client('polly', region_name='us-east-1')
-transcribe = boto3.client('transcribe', region_name='us-east-1')
-translate_client = boto3.client('translate', region_name='us-east-1')
-s3 = boto3.client('s3', region_name='us-east-1')
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+import serialization
+import sigv4
+import text_analytics
+
+# AWS 클라이언트 (첫 사용 시 생성 - get_client 참고)
+AWS_REGION = 'us-east-1'
+
+# 공통 botocore 설정: 커넥션 풀(스레드 풀 동시 호출 대비), keep-alive, 타임아웃, 재시도
+BOTO_CONFIG = Config(
+    region_name=AWS_REGION,
+    max_pool_connections=16,
+    tcp_keepalive=True,
+    connect_timeout=2,
+    read_timeout=10,
+    retries={'max_attempts': 3, 'mode': 'standard'}
+)
+
+# chat 턴 마감 시간 (헤지 호출과 chat 전용 Bedrock 클라이언트의 타임아웃이 함께 사용)
+CHAT_DEADLINE_MS = float(os.environ.get('CHAT_DEADLINE_MS', '6000'))
+
+# 이름 → (종류, 서비스, 서비스별 설정 오버라이드)
+CLIENT_SPECS = {
+    'bedrock': ('client', 'bedrock-runtime', Config(read_timeout=60, retries={'max_attempts': 2, 'mode': 'standard'})),
+    # 헤지 호출용: 재시도는 헤지가 대신하고, 마감 시간을 넘긴 호출이 chat 풀 워커를 붙잡지 않도록 짧은 타임아웃
+    'bedrock_chat': ('client', 'bedrock-runtime', Config(connect_timeout=1, read_timeout=CHAT_DEADLINE_MS / 1000,
+                                                         retries={'max_attempts': 1, 'mode': 'standard'})),
+    'polly': ('client', 'polly', None),
+    'transcribe': ('client', 'transcribe', None),
+    'translate': ('client', 'translate', None),
+    's3': ('client', 's3', None),
+    'dynamodb': ('resource', 'dynamodb', Config(connect_timeout=1, read_timeout=5)),
+    'lambda': ('client', 'lambda', Config(retries={'max_attempts': 2, 'mode': 'standard'})),
+}
+
+# 액션별로 필요한 클라이언트 (warmup 액션에서 사용)
+ACTION_CLIENTS = {
+    'chat': ('bedrock_chat', 'bedrock', 'dynamodb'),       # 서버 측 기록 / 요약, 첫 인사 singleflight
+    'chat_stream': ('bedrock', 'polly', 's3', 'dynamodb'),
+    'turn': ('bedrock_chat', 'bedrock', 'polly', 's3', 'translate', 'dynamodb'),
+    'tts': ('polly', 's3', 'dynamodb'),                     # S3 캐시, 공유 문장 singleflight
+    'stt': ('s3', 'transcribe'),
+    'translate': ('translate', 'dynamodb'),
+    'analyze': ('bedrock', 'dynamodb'),                     # 턴 분석 / 저장된 분석 조회
+    'analyze_async': ('dynamodb', 'lambda'),
+    'get_transcribe_url': (),
+    'cache_stats': (),
+    'warmup': (),
+}
 
 # 상수
 S3_BUCKET = 'eng-learning-audio'
 DYNAMODB_TABLE = 'eng-learning-conversations'
 TTL_DAYS = 90
 
+# TTS 오디오 캐시 (컨테이너 메모리 LRU + S3 영구 계층)
+TTS_CACHE_MAX_BYTES = 32 * 1024 * 1024
+TTS_CACHE_PREFIX = 'tts-cache/'
+TTS_S3_KNOWN_MAX_ITEMS = 10000
+
+# TTS 오디오 전달 방식: base64(JSON, 기본) | url(S3 presigned GET) | binary(원본 바이트 응답)
+TTS_DELIVERY_MODES = ('base64', 'url', 'binary')
+TTS_URL_EXPIRES = 300
+TTS_BINARY_MAX_BYTES = 1024 * 1024  # 넘으면 url로 전달 (Lambda 응답 6MB 제한, base64 인코딩 후 크기 고려)
+
+# 긴 텍스트 TTS: 문장 경계로 청크를 나눠 병렬 합성 (Polly 요청당 3000자 제한, 길수록 느려짐)
+TTS_CHUNK_MAX_CHARS = 800
+TTS_CHUNK_WORKERS = 4
+TTS_MAX_TEXT_CHARS = 20000
+
+# 번역 캐시 (컨테이너 메모리 LRU + DynamoDB TTL 계층)
+TRANSLATION_CACHE_MAX_ITEMS = 5000
+TRANSLATION_TTL_DAYS = 30
+TRANSLATE_WORKERS = 8
+MAX_TRANSLATE_BATCH = 200
+TRANSLATION_STORE_MAX_RETRIES = 3  # UnprocessedKeys 재시도 (지수 백오프), 그래도 남으면 캐시 미스로 처리
+
+# 대량 삭제 (BatchWriteItem 25개 단위, 병렬 워커, UnprocessedItems 백오프)
+DELETE_WORKERS = 4
+DELETE_BATCH_SIZE = 25
+DELETE_MAX_RETRIES = 6
+DEVICE_DELETE_MAX_SECONDS = 20
+
+# 사용자 설정 캐시 (컨테이너 메모리, 다른 컨테이너의 저장은 TTL 안에 반영)
+SETTINGS_CACHE_MAX_ITEMS = 2000
+SETTINGS_CACHE_TTL_SECONDS = 60
+
+# 메시지 일괄 저장
+MAX_SAVE_BATCH = 100
+
+# 배치 STT 작업 폴링 (적응형 백오프)
+STT_TIMEOUT_SECONDS = 30
+STT_POLL_INITIAL_SECONDS = 0.15
+STT_POLL_MAX_SECONDS = 1.0
+STT_POLL_BACKOFF = 1.5
+STT_CLEANUP_MAX_ATTEMPTS = 3
+
+# Transcribe Streaming presigned URL (서비스 최대 유효기간 300초, 재연결용 일괄 발급 상한)
+TRANSCRIBE_STREAMING_ENDPOINT = f'transcribestreaming.{AWS_REGION}.amazonaws.com:8443'
+TRANSCRIBE_URL_EXPIRES = 300
+TRANSCRIBE_MAX_URLS = 5
+
 # CORS 헤더 (전역)
 CORS_HEADERS = {
     'Access-Control-Allow-Origin': '*',
     'Access-Control-Allow-Headers': 'Content-Type',
-    'Access-Control-Allow-Methods': 'POST, OPTIONS'
+    'Access-Control-Allow-Methods': 'POST, OPTIONS',
+    'Access-Control-Expose-Headers': 'Server-Timing, ETag, X-Tts-Voice, X-Tts-Engine, X-Tts-Cache',
+    'Timing-Allow-Origin': '*'
 }
 
+# 응답 압축: 이 크기 이상인 본문만 Accept-Encoding에 맞춰 gzip / br 압축
+COMPRESSION_MIN_BYTES = 1400
+
+# 지연시간 메트릭 (CloudWatch Embedded Metric Format)
+METRICS_NAMESPACE = 'EngLearning/Api'
+
+# botocore 서비스명 → span 이름
+SERVICE_SPAN_NAMES = {'bedrock-runtime': 'bedrock', 'polly': 'polly', 'translate': 'translate',
+                      'transcribe': 'transcribe', 's3': 's3', 'dynamodb': 'dynamodb'}
+
+
+# ============================================
+# 지연시간 측정 (span / Server-Timing)
+# ============================================
+
+class RequestMetrics:
+    """요청 1건의 단계별 소요시간 수집기 (스레드 안전)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = OrderedDict()
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, duration_ms):
+        with self.lock:
+            total, count = self.spans.get(name, (0.0, 0))
+            self.spans[name] = (total + duration_ms, count + 1)
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        """Server-Timing 헤더 값 (같은 이름은 합산, 여러 번이면 호출 수 표기)"""
+        with self.lock:
+            parts = [f'{name};dur={total:.1f}' + (f';desc="{count} calls"' if count > 1 else '')
+                     for name, (total, count) in self.spans.items()]
+        parts.append(f'total;dur={self.elapsed_ms():.1f}')
+        return ', '.join(parts)
+
+
+current_metrics = contextvars.ContextVar('current_metrics', default=None)
+
+
+@contextmanager
+def span(name):
+    """현재 요청의 메트릭에 name 구간 소요시간 기록 (요청 밖이면 무시)"""
+    metrics = current_metrics.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.add(name, (time.perf_counter() - started) * 1000)
+
+
+def count_metric(name, value=1):
+    """현재 요청의 카운터 메트릭 증가 (요청 밖이면 무시)"""
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.increment(name, value)
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """작업 스레드에 호출 시점의 contextvars를 전달하는 스레드 풀 (요청 span 유지)"""
+
+    def submit(self, fn, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def _before_aws_call(model, context, **kwargs):
+    service = model.service_model.service_name
+    context['span_name'] = SERVICE_SPAN_NAMES.get(service, service)
+    context['span_metrics'] = current_metrics.get()
+    context['span_started'] = time.perf_counter()
+
+
+def _after_aws_call(context, **kwargs):
+    metrics, started = context.pop('span_metrics', None), context.pop('span_started', None)
+    if metrics is not None and started is not None:
+        metrics.add(context['span_name'], (time.perf_counter() - started) * 1000)
+
+
+def instrument_client(client):
+    """boto3 클라이언트의 모든 API 호출을 서비스별 span으로 기록"""
+    events = client.meta.events
+    events.register_first('before-call', _before_aws_call)
+    events.register('after-call', _after_aws_call)
+    events.register('after-call-error', _after_aws_call)
+    return client
+
+
+def emit_metrics(metrics, action, status_code, context):
+    """요청 메트릭을 EMF 로그 한 줄로 출력 (CloudWatch에서 단계별 p50/p99 집계)"""
+    with metrics.lock:
+        stages = {name: round(total, 1) for name, (total, _) in metrics.spans.items()}
+        counters = dict(metrics.counters)
+    stages['total'] = round(metrics.elapsed_ms(), 1)
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['action']],
+                'Metrics': [{'Name': name, 'Unit': 'Milliseconds'} for name in stages] +
+                           [{'Name': name, 'Unit': 'Count'} for name in counters]
+            }]
+        },
+        'action': action or 'unknown',
+        'statusCode': status_code,
+        'requestId': getattr(context, 'aws_request_id', None),
+        **stages,
+        **counters
+    }))
+
+
+# ============================================
+# AWS 클라이언트 (지연 생성 + 메모이즈)
+# ============================================
+
+_boto_session = None
+_clients = {}
+_clients_lock = threading.Lock()
+_transcribe_presigner = None
+
+
+def get_boto_session():
+    """컨테이너당 하나의 boto3 세션 (자격증명 조회 캐시)"""
+    global _boto_session
+    if _boto_session is None:
+        with _clients_lock:
+            if _boto_session is None:
+                _boto_session = boto3.session.Session(region_name=AWS_REGION)
+    return _boto_session
+
+
+def get_client(name):
+    """이름(CLIENT_SPECS)으로 AWS 클라이언트 반환. 처음 요청될 때 한 번만 생성"""
+    client = _clients.get(name)
+    if client is not None:
+        return client
+
+    session = get_boto_session()
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            kind, service, override = CLIENT_SPECS[name]
+            config = BOTO_CONFIG.merge(override) if override else BOTO_CONFIG
+            if kind == 'resource':
+                client = session.resource(service, config=config)
+                instrument_client(client.meta.client)
+            else:
+                client = instrument_client(session.client(service, config=config))
+            _clients[name] = client
+    return client
+
+
+def set_client(name, client):
+    """클라이언트 교체 (로컬 서버/벤치마크의 AWS 대역 주입용)"""
+    instrument_client(client.meta.client if CLIENT_SPECS[name][0] == 'resource' else client)
+    with _clients_lock:
+        _clients[name] = client
+
 
 # ============================================
 # 공통 헬퍼 함수
@@ -36,12 +301,12 @@ CORS_HEADERS = {
 
 def get_table():
     """DynamoDB 테이블 객체 반환"""
-    return dynamodb.Table(DYNAMODB_TABLE)
+    return get_client('dynamodb').Table(DYNAMODB_TABLE)
 
 
-def get_ttl():
-    """TTL 타임스탬프 계산 (90일 후)"""
-    return int((datetime.utcnow() + timedelta(days=TTL_DAYS)).timestamp())
+def get_ttl(days=TTL_DAYS):
+    """TTL 타임스탬프 계산 (기본 90일 후)"""
+    return int((datetime.utcnow() + timedelta(days=days)).timestamp())
 
 
 def get_now():
@@ -50,12 +315,48 @@ def get_now():
     return datetime.now(KST).isoformat()
 
 
+JSON_HEADERS = {**CORS_HEADERS, 'Content-Type': 'application/json; charset=utf-8'}
+
+
 def make_response(status_code, body):
-    """표준 API 응답 생성"""
+    """표준 API 응답 생성 (Decimal 등 DynamoDB 값 변환, serialization.Fragment는 그대로 삽입)"""
+    with span('serialize'):
+        serialized = serialization.dumps(body)
     return {
         'statusCode': status_code,
-        'headers': CORS_HEADERS,
-        'body': json.dumps(body)
+        'headers': JSON_HEADERS,
+        'body': serialized
+    }
+
+
+def get_header(event, name):
+    """이벤트 요청 헤더 조회 (대소문자 무시)"""
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def compress_response(response, event):
+    """COMPRESSION_MIN_BYTES 이상인 텍스트 본문을 Accept-Encoding에 맞춰 압축 (base64 바이너리 응답으로 변환)"""
+    body = response.get('body')
+    if response.get('isBase64Encoded') or not isinstance(body, str) or len(body) < COMPRESSION_MIN_BYTES:
+        return response
+    headers = {**response.get('headers', {}), 'Vary': 'Accept-Encoding'}
+    encoding = serialization.negotiate_encoding(get_header(event, 'accept-encoding'))
+    data = body.encode('utf-8')
+    if encoding is None or len(data) < COMPRESSION_MIN_BYTES:
+        return {**response, 'headers': headers}
+
+    with span('compress'):
+        compressed = serialization.compress(data, encoding)
+    if len(compressed) >= len(data):
+        return {**response, 'headers': headers}
+    return {
+        **response,
+        'headers': {**headers, 'Content-Encoding': encoding},
+        'body': base64.b64encode(compressed).decode('ascii'),
+        'isBase64Encoded': True
     }
 
 
@@ -77,8 +378,306 @@ def validate_required(body, *fields):
     return None
 
 
+# ============================================
+# 캐시 / 백그라운드 작업 유틸
+# ============================================
+
+class LRUCache:
+    """스레드 안전 LRU 캐시 (웜 컨테이너 동안 유지)
+
+    max_items / max_bytes 중 하나라도 넘으면 가장 오래 안 쓴 항목부터 제거.
+    max_bytes를 쓰면 값의 크기는 sizeof(value)로 계산 (기본 len).
+    """
+
+    def __init__(self, max_items=None, max_bytes=None, sizeof=len):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.items = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.items:
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return self.items[key]
+
+    def set(self, key, value):
+        size = self.sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.items:
+                removed = self.items.pop(key)
+                self.total_bytes -= self.sizeof(removed) if self.max_bytes else 0
+            self.items[key] = value
+            self.total_bytes += size
+            while self.items and ((self.max_items and len(self.items) > self.max_items) or
+                                  (self.max_bytes and self.total_bytes > self.max_bytes)):
+                _, evicted = self.items.popitem(last=False)
+                self.total_bytes -= self.sizeof(evicted) if self.max_bytes else 0
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.lock:
+            if key in self.items:
+                removed = self.items.pop(key)
+                self.total_bytes -= self.sizeof(removed) if self.max_bytes else 0
+
+    def delete_where(self, predicate):
+        """predicate(key, value)가 참인 항목을 모두 제거"""
+        with self.lock:
+            for key in [k for k, v in self.items.items() if predicate(k, v)]:
+                removed = self.items.pop(key)
+                self.total_bytes -= self.sizeof(removed) if self.max_bytes else 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'items': len(self.items),
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hitRate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+class LatencyTracker:
+    """최근 N개 지연시간(ms)의 이동 창. 백분위수 조회용 (스레드 안전)"""
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def add(self, duration_ms):
+        with self.lock:
+            self.samples.append(duration_ms)
+
+    def percentile(self, pct):
+        with self.lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def __len__(self):
+        with self.lock:
+            return len(self.samples)
+
+
+_background_executor = None
+_background_lock = threading.Lock()
+
+
+def run_in_background(fn, *args, **kwargs):
+    """응답 경로 밖에서 실행할 작업 제출 (캐시 쓰기, 정리 작업 등)
+
+    Lambda는 응답 후 컨테이너를 얼리므로 남은 작업은 다음 호출 때 이어서 실행된다.
+    실패는 로그만 남기고 무시.
+    """
+    global _background_executor
+    with _background_lock:
+        if _background_executor is None:
+            _background_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='background')
+
+    def run():
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            print(f"Background task error ({getattr(fn, '__name__', fn)}): {str(e)}")
+
+    return _background_executor.submit(run)
+
+
+# 컨테이너 간 요청 합치기 (singleflight): DynamoDB 임대 아이템으로 같은 작업은 한 컨테이너만 실행
+SINGLEFLIGHT_ENABLED = True
+SINGLEFLIGHT_LEASE_SECONDS = 10        # 선행 컨테이너가 죽어도 이 시간 뒤엔 다른 컨테이너가 가져감
+SINGLEFLIGHT_WAIT_SECONDS = 4          # 대기 컨테이너가 결과를 기다리는 최대 시간 (Bedrock p99보다 길게, 넘으면 직접 실행)
+SINGLEFLIGHT_POLL_SECONDS = 0.08
+SINGLEFLIGHT_RESULT_TTL_SECONDS = 300  # 공유 결과 보관 시간
+SINGLEFLIGHT_MAX_VALUE_BYTES = 350 * 1024
+SHARED_TEXTS_MAX_ITEMS = 500  # TTS / 번역 singleflight 대상 문장 (공유된 첫 인사)
+
+_container_id = uuid.uuid4().hex
+singleflight_counts = {'leader': 0, 'shared': 0, 'timeout': 0, 'bypass': 0}
+singleflight_counts_lock = threading.Lock()
+
+
+def count_singleflight(outcome):
+    with singleflight_counts_lock:
+        singleflight_counts[outcome] += 1
+
+
+def try_acquire_lease(table, key):
+    """임대 아이템 조건부 생성. 없거나 만료된 임대(보관 시간이 지난 결과 포함)면 획득(True), 다른 컨테이너가 보유 중이면 False"""
+    now_ms = int(time.time() * 1000)
+    try:
+        table.put_item(
+            Item={
+                'PK': f'LEASE#{key}',
+                'SK': 'LEASE',
+                'type': 'LEASE',
+                'status': 'pending',
+                'owner': _container_id,
+                'leaseExpiresAt': now_ms + SINGLEFLIGHT_LEASE_SECONDS * 1000,
+                'ttl': int(time.time()) + SINGLEFLIGHT_RESULT_TTL_SECONDS
+            },
+            ConditionExpression='attribute_not_exists(PK) OR #ttl < :now_s OR (#st = :pending AND leaseExpiresAt < :now)',
+            ExpressionAttributeNames={'#st': 'status', '#ttl': 'ttl'},
+            ExpressionAttributeValues={':pending': 'pending', ':now': now_ms, ':now_s': now_ms // 1000}
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+
+def publish_lease_result(table, key, value):
+    """결과를 임대 아이템에 기록 (너무 크면 임대만 해제해 대기 컨테이너가 직접 실행하게 함)"""
+    size = len(value if isinstance(value, bytes) else value.encode('utf-8'))
+    if size > SINGLEFLIGHT_MAX_VALUE_BYTES:
+        table.delete_item(Key={'PK': f'LEASE#{key}', 'SK': 'LEASE'})
+        return
+    table.put_item(Item={
+        'PK': f'LEASE#{key}',
+        'SK': 'LEASE',
+        'type': 'LEASE',
+        'status': 'done',
+        'owner': _container_id,
+        'value': value,
+        'ttl': int(time.time()) + SINGLEFLIGHT_RESULT_TTL_SECONDS
+    })
+
+
+def singleflight(key, compute, wait_seconds=SINGLEFLIGHT_WAIT_SECONDS):
+    """같은 key의 비싼 멱등 작업을 컨테이너 간에 한 번만 실행하고 결과 공유
+
+    임대를 얻은 컨테이너가 compute()를 실행해 결과(str 또는 bytes)를 임대 아이템에 기록하고,
+    동시에 들어온 다른 컨테이너는 최대 wait_seconds 동안 그 결과를 읽으며 기다린다.
+    DynamoDB 오류나 대기 시간 초과 시에는 직접 실행 (compute() 자체의 예외는 다시 실행하지 않고 그대로 전파).
+    """
+    if not SINGLEFLIGHT_ENABLED:
+        return compute()
+
+    acquired = False
+    try:
+        table = get_table()
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            with span('singleflight'):
+                item = table.get_item(Key={'PK': f'LEASE#{key}', 'SK': 'LEASE'}, ConsistentRead=True).get('Item')
+            if item and int(item.get('ttl', 0)) < time.time():
+                item = None  # TTL 삭제는 최대 48시간 늦으므로 보관 시간이 지난 아이템은 없는 것으로 봄
+            if item and item.get('status') == 'done' and 'value' in item:
+                count_singleflight('shared')
+                value = item['value']
+                return value if isinstance(value, str) else bytes(value)
+            if not item or (item.get('status') == 'pending' and int(item.get('leaseExpiresAt', 0)) < time.time() * 1000):
+                with span('singleflight'):
+                    acquired = try_acquire_lease(table, key)
+                if acquired:
+                    break
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(SINGLEFLIGHT_POLL_SECONDS)
+    except (ClientError, BotoCoreError) as e:
+        print(f"Singleflight error ({key}): {str(e)}")
+        count_singleflight('bypass')
+        return compute()
+
+    if not acquired:
+        count_singleflight('timeout')
+        return compute()
+
+    count_singleflight('leader')
+    try:
+        value = compute()
+    except Exception:
+        run_in_background(table.delete_item, Key={'PK': f'LEASE#{key}', 'SK': 'LEASE'})
+        raise
+    try:
+        publish_lease_result(table, key, value)  # 대기 중인 컨테이너가 바로 읽도록 응답 전에 기록
+    except Exception as e:
+        print(f"Singleflight publish error ({key}): {str(e)}")
+    return value
+
+
+def get_singleflight_stats():
+    with singleflight_counts_lock:
+        return dict(singleflight_counts)
+
+
+# 여러 컨테이너가 동시에 합성/번역할 가능성이 큰 문장. 이 문장만 TTS / 번역에서 singleflight를 거친다
+# (매번 다른 튜터 응답은 임대 비용 없이 바로 처리)
+shared_texts = LRUCache(max_items=SHARED_TEXTS_MAX_ITEMS)
+
+
+def mark_shared_text(text):
+    shared_texts.set(normalize_text(text), True)
+
+
+def is_shared_text(text):
+    """준비된 대체 응답이거나 첫 인사 singleflight로 공유된 문장인지"""
+    text = normalize_text(text)
+    return text == CHAT_FALLBACK_GREETING or text in CHAT_FALLBACK_REPLIES or shared_texts.get(text) is not None
+
+
 # 모델 설정
 CLAUDE_MODEL = 'anthropic.claude-3-haiku-20240307-v1:0'
+CHAT_MAX_TOKENS = 300
+
+# 서버 측 대화 기록 (sessionId로 chat 호출 시)
+HISTORY_RECENT_TURNS = 6        # 항상 원문 그대로 넣는 최근 턴 수
+HISTORY_TOKEN_BUDGET = 1200     # 원문 메시지에 쓰는 입력 토큰 상한 (추정치)
+SUMMARY_REFRESH_TURNS = 4       # 요약 밖 턴이 이만큼 쌓이면 요약 갱신
+SUMMARY_MAX_TOKENS = 250
+
+# 튜터 설정 매핑
+ACCENT_MAP = {'us': 'American English', 'uk': 'British English', 'au': 'Australian English', 'in': 'Indian English'}
+LEVEL_MAP = {'beginner': 'Beginner (use simple words and short sentences)', 'intermediate': 'Intermediate (normal conversation level)', 'advanced': 'Advanced (use complex vocabulary and idioms)'}
+TOPIC_MAP = {'business': 'Business and workplace situations', 'daily': 'Daily life and casual conversation', 'travel': 'Travel and tourism', 'interview': 'Job interviews and professional settings'}
+
+# Polly 음성 매핑: (accent, gender) → (voice_id, engine)
+VOICE_MAP = {
+    ('us', 'female'): ('Joanna', 'neural'), ('us', 'male'): ('Matthew', 'neural'),
+    ('uk', 'female'): ('Amy', 'neural'), ('uk', 'male'): ('Brian', 'neural'),
+    ('au', 'female'): ('Nicole', 'standard'), ('au', 'male'): ('Russell', 'standard'),
+    ('in', 'female'): ('Aditi', 'standard'), ('in', 'male'): ('Aditi', 'standard'),
+}
+DEFAULT_VOICE = ('Joanna', 'neural')
+
+# 비동기 분석 작업: 워커 Lambda 이름 (없으면 Lambda 안에서는 자기 자신, 로컬에서는 스레드 실행기)
+ANALYSIS_WORKER_FUNCTION = os.environ.get('ANALYSIS_WORKER_FUNCTION') or os.environ.get('AWS_LAMBDA_FUNCTION_NAME')
+ANALYSIS_JOB_LOCAL_WORKERS = 2
+ANALYSIS_JOB_TTL_DAYS = 1
+ANALYSIS_JOB_LEASE_SECONDS = 90  # running 상태가 이보다 오래되면 워커가 죽은 것으로 보고 재시도에서 다시 가져감 (Lambda 제한 시간 60초보다 길게)
+MAX_ANALYSIS_JOB_REQUEST_BYTES = 300 * 1024  # DynamoDB 아이템 400KB 제한 이내
+
+# 증분 분석: 종료 시점에 누락된 턴을 분석하는 동시 호출 수, 최종 결과에 담는 문법 교정 수
+ANALYSIS_WORKERS = 4
+MAX_MERGED_CORRECTIONS = 10
+
+# 스트리밍 TTS 동시 합성 수
+STREAM_TTS_WORKERS = 4
+
+# chat 지연시간 예산: 첫 요청이 최근 지연시간의 p{HEDGE_PERCENTILE}을 넘기면 같은 요청을 하나 더 보내
+# 먼저 끝난 쪽을 쓰고, 턴 전체가 DEADLINE을 넘기면 준비된 후속 질문으로 대체
+CHAT_HEDGE_PERCENTILE = float(os.environ.get('CHAT_HEDGE_PERCENTILE', '95'))
+CHAT_HEDGE_DEFAULT_MS = float(os.environ.get('CHAT_HEDGE_DEFAULT_MS', '2000'))  # 표본이 모이기 전 기준
+CHAT_HEDGE_MIN_MS = 500
+CHAT_LATENCY_WINDOW = 200
+CHAT_LATENCY_MIN_SAMPLES = 20
+CHAT_WORKERS = 8
 
 # 시스템 프롬프트 (링글 스타일)
 SYSTEM_PROMPT = """You are a friendly English conversation partner on a phone call.
@@ -104,324 +703,1925 @@ Response style examples:
 Only for the VERY FIRST message: Give a brief, friendly greeting and ask ONE simple question about the topic.
 After that: NO greetings, NO introductions, just continue the conversation naturally."""
 
-# 분석용 프롬프트
-ANALYSIS_PROMPT = """Analyze the following English conversation between a student and an AI tutor.
-Provide a detailed analysis in JSON format.
+# 분석용 프롬프트 (필러/어휘/복잡도/유창성 수치는 text_analytics가 계산하므로 문법과 피드백만 요청)
+ANALYSIS_PROMPT = """Review the student's English in this conversation with an AI tutor.
 
 Conversation:
 {conversation}
 
-Analyze ONLY the student's messages (role: user) and return a JSON object with:
+Local analysis of the student's messages: {stats}
+
+Return ONLY a JSON object:
+{{
+  "accuracy": <0-100, grammatical correctness of the student's messages>,
+  "pronunciation": <0-100, estimate based on word choice indicating possible pronunciation difficulties>,
+  "grammar_corrections": [{{"original": "<sentence with error>", "corrected": "<corrected>", "explanation": "<brief, in Korean>"}}],
+  "suggested_words": [<3-5 advanced words they could have used>],
+  "overall_feedback": "<2-3 encouraging sentences in Korean>",
+  "improvement_tips": [<3 specific tips in Korean>]
+}}"""
+ANALYSIS_MAX_TOKENS = 800
+
+# 턴 단위 분석 프롬프트 (사용자 발화가 저장될 때 백그라운드로 실행)
+TURN_ANALYSIS_PROMPT = """Review one utterance from an English student on a phone call.
+
+Utterance: {utterance}
 
+Return ONLY a JSON object:
 {{
-  "cafp_scores": {{
-    "complexity": <0-100, vocabulary diversity and sentence structure complexity>,
-    "accuracy": <0-100, grammatical correctness>,
-    "fluency": <0-100, natural flow and coherence>,
-    "pronunciation": <0-100, estimate based on word choice indicating possible pronunciation difficulties>
-  }},
-  "fillers": {{
-    "count": <number of filler words used>,
-    "words": [<list of filler words found: um, uh, like, you know, basically, actually, literally, I mean, so, well, etc.>],
-    "percentage": <percentage of words that are fillers>
-  }},
-  "grammar_corrections": [
-    {{
-      "original": "<original sentence with error>",
-      "corrected": "<corrected sentence>",
-      "explanation": "<brief explanation in Korean>"
-    }}
-  ],
-  "vocabulary": {{
-    "total_words": <total words spoken by student>,
-    "unique_words": <unique words count>,
-    "advanced_words": [<list of advanced vocabulary used>],
-    "suggested_words": [<3-5 advanced words they could have used>]
-  }},
-  "overall_feedback": "<2-3 sentences of encouraging feedback in Korean>",
-  "improvement_tips": [<3 specific tips for improvement in Korean>]
-}}
-
-Return ONLY valid JSON, no other text."""
+  "accuracy": <0-100, grammatical correctness>,
+  "pronunciation": <0-100, estimate based on word choice indicating possible pronunciation difficulties>,
+  "grammar_corrections": [{{"original": "<sentence with error>", "corrected": "<corrected>", "explanation": "<brief, in Korean>"}}]
+}}"""
+TURN_ANALYSIS_MAX_TOKENS = 300
+
+# 통화 종료 시 턴 분석을 합친 뒤 최종 피드백만 생성하는 프롬프트
+SESSION_FEEDBACK_PROMPT = """An English student finished a practice call. Per-turn analysis is already done.
+
+Scores and statistics: {stats}
+Grammar corrections found: {corrections}
+Sample of the student's lines: {sample}
+
+Return ONLY a JSON object:
+{{
+  "suggested_words": [<3-5 advanced words they could have used>],
+  "overall_feedback": "<2-3 encouraging sentences in Korean>",
+  "improvement_tips": [<3 specific tips in Korean>]
+}}"""
+SESSION_FEEDBACK_MAX_TOKENS = 400
+
+# 대화 요약 프롬프트 (서버 측 대화 기록의 오래된 턴 압축용)
+SUMMARY_PROMPT = """You summarize an ongoing English practice phone call between a student and a tutor.
+Write at most 5 short sentences covering what the student talked about (facts, plans, opinions)
+and the questions the tutor already asked, so the tutor can continue without repeating itself.
+Return only the summary text."""
+
+# 이전 대화 요약을 시스템 프롬프트에 붙이는 형식
+HISTORY_CONTEXT = """
+
+Earlier in this call (older turns, condensed):
+{summary}"""
+
+START_MESSAGE = "Hello, let's start our English practice session."
+
+# Bedrock이 턴 마감 시간 안에 응답하지 못했을 때 쓰는 응답 (통화가 끊기지 않도록)
+CHAT_FALLBACK_GREETING = "Hi! Let's get started. How has your day been so far?"
+CHAT_FALLBACK_REPLIES = (
+    "Sorry, I missed that for a second. Could you tell me a little more about it?",
+    "That's interesting! Can you give me an example?",
+    "I see. How did you feel about that?",
+)
 
 
 # 액션 → 핸들러 매핑 (딕셔너리 디스패치)
 ACTION_HANDLERS = {
     'chat': 'handle_chat',
+    'chat_stream': 'handle_chat_stream',
+    'turn': 'handle_turn',
     'tts': 'handle_tts',
     'stt': 'handle_stt',
     'translate': 'handle_translate',
+    'cache_stats': 'handle_cache_stats',
+    'warmup': 'handle_warmup',
     'analyze': 'handle_analyze',
+    'get_analysis': 'handle_get_analysis',
+    'analyze_async': 'handle_analyze_async',
+    'get_analysis_job': 'handle_get_analysis_job',
     'save_settings': 'handle_save_settings',
     'get_settings': 'handle_get_settings',
     'start_session': 'handle_start_session',
     'end_session': 'handle_end_session',
     'save_message': 'handle_save_message',
+    'save_messages': 'handle_save_messages',
     'get_sessions': 'handle_get_sessions',
     'get_session_detail': 'handle_get_session_detail',
     'delete_session': 'handle_delete_session',
+    'delete_device_data': 'handle_delete_device_data',
     'get_transcribe_url': 'handle_get_transcribe_url',
 }
 
 
 def lambda_handler(event, context):
-    """Main Lambda handler - 딕셔너리 디스패치 패턴"""
+    """Main Lambda handler - 딕셔너리 디스패치 패턴 (단계별 지연시간은 Server-Timing 헤더 + EMF 로그)
+
+    큰 응답은 Accept-Encoding에 따라 압축한다 (compress_response).
+    """
     if event.get('httpMethod') == 'OPTIONS':
         return make_response(200, '')
+    if event.get('analysisJob'):
+        return handle_analysis_job_event(event, context)
+
+    metrics = RequestMetrics()
+    token = current_metrics.set(metrics)
+    action = None
+    try:
+        try:
+            with span('decode'):
+                raw_body = event.get('body') or '{}'
+                if event.get('isBase64Encoded'):
+                    raw_body = base64.b64decode(raw_body)
+                body = json.loads(raw_body)
+            action = body.get('action', 'chat')
+
+            handler_name = ACTION_HANDLERS.get(action)
+            if handler_name:
+                with span('handler'):
+                    response = globals()[handler_name](body)
+            else:
+                response = error_response('Invalid action')
+
+        except Exception as e:
+            print(f"Error: {str(e)}")
+            response = error_response(str(e), 500)
+        response = compress_response(response, event)
+    finally:
+        current_metrics.reset(token)
+
+    response['headers'] = {**response.get('headers', {}), 'Server-Timing': metrics.server_timing()}
+    emit_metrics(metrics, action, response.get('statusCode'), context)
+    return response
+
 
+# ============================================
+# 대화/분석 핸들러
+# ============================================
+
+def build_system_prompt(settings):
+    """튜터 설정으로 시스템 프롬프트 생성"""
+    return SYSTEM_PROMPT.format(
+        accent=ACCENT_MAP.get(settings.get('accent', 'us'), 'American English'),
+        level=LEVEL_MAP.get(settings.get('level', 'intermediate'), 'Intermediate'),
+        topic=TOPIC_MAP.get(settings.get('topic', 'business'), 'Business')
+    )
+
+
+def build_claude_messages(messages):
+    """클라이언트 메시지를 Claude 메시지 포맷으로 변환 (비어있으면 시작 메시지)"""
+    claude_messages = [{'role': m.get('role', 'user'), 'content': m.get('content', '')} for m in messages]
+    if not claude_messages:
+        claude_messages = [{'role': 'user', 'content': START_MESSAGE}]
+    return claude_messages
+
+
+# ============================================
+# 서버 측 대화 기록: 최근 턴은 원문, 오래된 턴은 롤링 요약
+# ============================================
+
+def estimate_tokens(text):
+    """영어 기준 대략적인 토큰 수 (4글자 ≈ 1토큰)"""
+    return len(text) // 4 + 1
+
+
+def uses_server_history(body):
+    """sessionId와 새 메시지(message)만 보내고 messages를 생략하면 서버 측 기록 사용"""
+    return bool(body.get('sessionId')) and 'messages' not in body
+
+
+def count_turns(messages):
+    return sum(1 for m in messages if m.get('role') == 'user')
+
+
+def split_recent_turns(messages, turns):
+    """(오래된 메시지, 최근 turns개 턴의 메시지)로 분할. 턴은 user 메시지에서 시작"""
+    seen = 0
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index].get('role') == 'user':
+            seen += 1
+            if seen == turns:
+                return messages[:index], messages[index:]
+    return [], messages
+
+
+def load_session_history(device_id, session_id):
+    """요약 아이템과 요약 이후의 최근 메시지를 GSI1 역순 조회 한 번으로 가져옴
+
+    GSI1SK 정렬상 SUMMARY > MSG#... > META 이므로 역순 첫 페이지에 요약과 최신 메시지가 온다.
+    (summary 아이템 또는 None, 시간순 메시지 리스트) 반환. 다른 기기의 세션이면 PermissionError.
+    """
+    fetch_limit = (HISTORY_RECENT_TURNS + SUMMARY_REFRESH_TURNS) * 2 + 4
+    response = get_table().query(
+        IndexName='GSI1',
+        KeyConditionExpression='GSI1PK = :pk',
+        ExpressionAttributeValues={':pk': f'SESSION#{session_id}'},
+        ProjectionExpression='GSI1SK, deviceId, #role, content, summary, summarizedThrough',
+        ExpressionAttributeNames={'#role': 'role'},
+        ScanIndexForward=False,
+        Limit=fetch_limit
+    )
+    items = response.get('Items', [])
+    if not is_session_owner(device_id, session_id, items):
+        raise PermissionError('Access denied')
+
+    summary = next((item for item in items if item.get('GSI1SK') == 'SUMMARY'), None)
+    through = summary.get('summarizedThrough', '') if summary else ''
+    messages = [item for item in reversed(items)
+                if item.get('GSI1SK', '').startswith('MSG#') and item['GSI1SK'] > through]
+    return summary, messages
+
+
+def build_history_window(messages, new_message=None):
+    """요약 이후 메시지를 Claude 메시지 포맷의 대화 창으로 변환. (Claude 메시지, 예산 때문에 뺀 메시지 여부) 반환
+
+    최근 HISTORY_RECENT_TURNS 턴은 토큰 예산과 무관하게 항상 원문으로 넣고, 그 이전(아직 요약되지 않은)
+    메시지는 남은 HISTORY_TOKEN_BUDGET 안에서 최신 것부터 넣는다. 뺀 메시지가 있으면 호출 측이 요약 갱신을
+    예약해 요약에 접어 넣는다. 같은 role이 연속되면 합치고, 맨 앞의 assistant 메시지는 버린다
+    (Claude 요청은 user로 시작해야 하지만 통화 중간에 시작 인사를 끼워 넣지 않음).
+    """
+    messages = [{'role': m.get('role', 'user'), 'content': m.get('content', '')} for m in messages]
+    if new_message and not (messages and messages[-1] == {'role': 'user', 'content': new_message}):
+        messages.append({'role': 'user', 'content': new_message})
+
+    older, recent = split_recent_turns(messages, HISTORY_RECENT_TURNS)
+    budget = HISTORY_TOKEN_BUDGET - sum(estimate_tokens(m['content']) for m in recent)
+    kept = 0
+    for message in reversed(older):
+        budget -= estimate_tokens(message['content'])
+        if budget < 0:
+            break
+        kept += 1
+    window = older[len(older) - kept:] + recent
+
+    claude_messages = []
+    for message in window:
+        if claude_messages and claude_messages[-1]['role'] == message['role']:
+            claude_messages[-1]['content'] += '\n' + message['content']
+        else:
+            claude_messages.append(dict(message))
+    if claude_messages and claude_messages[0]['role'] == 'assistant':
+        claude_messages.pop(0)
+    return build_claude_messages(claude_messages), kept < len(older)
+
+
+_summary_refreshing = set()
+_summary_lock = threading.Lock()
+
+
+def schedule_summary_refresh(device_id, session_id):
+    """요약 갱신을 백그라운드로 예약 (같은 세션은 컨테이너당 한 번에 하나)"""
+    with _summary_lock:
+        if session_id in _summary_refreshing:
+            return
+        _summary_refreshing.add(session_id)
+
+    def refresh():
+        try:
+            refresh_session_summary(device_id, session_id)
+        finally:
+            with _summary_lock:
+                _summary_refreshing.discard(session_id)
+
+    run_in_background(refresh)
+
+
+def refresh_session_summary(device_id, session_id):
+    """최근 HISTORY_RECENT_TURNS 턴 이전의 메시지를 기존 요약에 접어 넣어 SUMMARY 아이템 갱신"""
+    table = get_table()
+    query_params = {
+        'IndexName': 'GSI1',
+        'KeyConditionExpression': 'GSI1PK = :pk AND GSI1SK BETWEEN :start AND :end',
+        'ExpressionAttributeValues': {':pk': f'SESSION#{session_id}', ':start': 'MSG#', ':end': 'MSG$'},
+        'ProjectionExpression': 'GSI1SK, #role, content',
+        'ExpressionAttributeNames': {'#role': 'role'}
+    }
+    summary = table.get_item(Key={'PK': f'DEVICE#{device_id}', 'SK': f'SESSION#{session_id}#SUMMARY'}).get('Item')
+    through = summary.get('summarizedThrough', '') if summary else ''
+    if through:
+        query_params['ExpressionAttributeValues'][':start'] = through + '\x00'
+
+    messages = []
+    while True:
+        response = table.query(**query_params)
+        messages.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        query_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    older, _ = split_recent_turns(messages, HISTORY_RECENT_TURNS)
+    if not older:
+        return
+
+    transcript = '\n'.join(f"{'Student' if m.get('role') == 'user' else 'Tutor'}: {m.get('content', '')}" for m in older)
+    if summary:
+        transcript = f"Summary so far:\n{summary.get('summary', '')}\n\nNew turns:\n{transcript}"
+
+    response = get_client('bedrock').invoke_model(
+        modelId=CLAUDE_MODEL,
+        contentType='application/json',
+        accept='application/json',
+        body=json.dumps({
+            'anthropic_version': 'bedrock-2023-05-31',
+            'max_tokens': SUMMARY_MAX_TOKENS,
+            'system': SUMMARY_PROMPT,
+            'messages': [{'role': 'user', 'content': transcript}]
+        })
+    )
+    text = json.loads(response['body'].read())['content'][0]['text'].strip()
+
+    new_through, now = older[-1]['GSI1SK'], get_now()
+    try:
+        table.put_item(
+            Item={
+                'PK': f'DEVICE#{device_id}',
+                'SK': f'SESSION#{session_id}#SUMMARY',
+                'GSI1PK': f'SESSION#{session_id}',
+                'GSI1SK': 'SUMMARY',
+                'type': 'SESSION_SUMMARY',
+                'deviceId': device_id,
+                'sessionId': session_id,
+                'summary': text,
+                'summarizedThrough': new_through,
+                'summarizedTurns': (int(summary.get('summarizedTurns', 0)) if summary else 0) + count_turns(older),
+                'updatedAt': now,
+                'ttl': get_ttl()
+            },
+            ConditionExpression='attribute_not_exists(PK) OR summarizedThrough < :through',
+            ExpressionAttributeValues={':through': new_through}
+        )
+    except Exception as e:
+        if 'ConditionalCheckFailed' not in str(e):
+            raise
+
+
+def load_chat_context(body):
+    """서버 측 기록으로 (요약 텍스트, Claude 메시지) 구성. 필요하면 요약 갱신 예약"""
+    device_id, session_id = body.get('deviceId'), body.get('sessionId')
+    with span('history'):
+        summary, messages = load_session_history(device_id, session_id)
+
+    claude_messages, trimmed = build_history_window(messages, body.get('message'))
+    older, _ = split_recent_turns(messages, HISTORY_RECENT_TURNS)
+    if trimmed or count_turns(older) >= SUMMARY_REFRESH_TURNS:
+        schedule_summary_refresh(device_id, session_id)  # 창에서 빠진 메시지를 요약에 접어 넣음
+    return (summary or {}).get('summary'), claude_messages
+
+
+def build_chat_request(body):
+    """Bedrock 대화 요청 본문 생성 (messages 생략 시 서버 측 기록 사용)"""
+    system = build_system_prompt(body.get('settings', {}))
+    if uses_server_history(body):
+        summary, claude_messages = load_chat_context(body)
+        if summary:
+            system += HISTORY_CONTEXT.format(summary=summary)
+    else:
+        claude_messages = build_claude_messages(body.get('messages', []))
+
+    return json.dumps({
+        'anthropic_version': 'bedrock-2023-05-31',
+        'max_tokens': CHAT_MAX_TOKENS,
+        'system': system,
+        'messages': claude_messages
+    })
+
+
+def invoke_chat_model(request_body):
+    """Bedrock 대화 요청 실행 후 응답 텍스트 반환 (chat 전용 클라이언트, 재시도 없음)"""
+    response = get_client('bedrock_chat').invoke_model(
+        modelId=CLAUDE_MODEL,
+        contentType='application/json',
+        accept='application/json',
+        body=request_body
+    )
+
+    result = json.loads(response['body'].read())
+    return result['content'][0]['text']
+
+
+def is_greeting_request(request_body):
+    """대화 기록 없이 시작 메시지만 보내는 첫 인사 요청인지 (설정이 같으면 요청 본문도 같음)"""
+    return json.loads(request_body)['messages'] == [{'role': 'user', 'content': START_MESSAGE}]
+
+
+class ChatDeadlineExceeded(Exception):
+    pass
+
+
+chat_latency = LatencyTracker(CHAT_LATENCY_WINDOW)
+chat_hedge_counts = {'calls': 0, 'hedged': 0, 'hedgeWins': 0, 'deadlineFallbacks': 0}
+chat_hedge_lock = threading.Lock()
+_chat_executor = None
+
+
+def count_chat_hedge(name):
+    with chat_hedge_lock:
+        chat_hedge_counts[name] += 1
+    count_metric(f'chat_{name}')
+
+
+def get_chat_executor():
+    """chat 요청/헤지 요청용 스레드 풀 (마감 시간이 지난 요청은 기다리지 않고 버림)"""
+    global _chat_executor
+    with chat_hedge_lock:
+        if _chat_executor is None:
+            _chat_executor = ContextThreadPoolExecutor(max_workers=CHAT_WORKERS, thread_name_prefix='chat')
+    return _chat_executor
+
+
+def hedge_delay_ms():
+    """헤지 요청을 보낼 시점: 최근 지연시간의 CHAT_HEDGE_PERCENTILE 백분위 (표본 부족 시 기본값)"""
+    if len(chat_latency) < CHAT_LATENCY_MIN_SAMPLES:
+        return CHAT_HEDGE_DEFAULT_MS
+    return min(max(chat_latency.percentile(CHAT_HEDGE_PERCENTILE), CHAT_HEDGE_MIN_MS), CHAT_DEADLINE_MS * 0.6)
+
+
+def invoke_chat_model_hedged(request_body, deadline_ms=None):
+    """마감 시간 안에서 Bedrock 호출. 첫 요청이 hedge_delay_ms()를 넘기면 헤지 요청을 보내 먼저 끝난 응답 사용
+
+    두 요청이 모두 실패하면 마지막 예외를, 마감 시간까지 응답이 없으면 ChatDeadlineExceeded를 발생.
+    성공한 호출은 (진 쪽도) 각자의 소요시간을 chat_latency에 기록해 다음 헤지 기준에 반영한다.
+    """
+    def attempt():
+        started = time.perf_counter()
+        text = invoke_chat_model(request_body)
+        chat_latency.add((time.perf_counter() - started) * 1000)
+        return text
+
+    if deadline_ms is None:
+        deadline_ms = CHAT_DEADLINE_MS
+    count_chat_hedge('calls')
+    if deadline_ms <= 0:
+        count_chat_hedge('deadlineFallbacks')
+        raise ChatDeadlineExceeded('Turn deadline passed before the Bedrock call')
+    executor = get_chat_executor()
+    started = time.monotonic()
+    deadline = started + deadline_ms / 1000
+
+    primary = executor.submit(attempt)
+    pending, hedge, error = {primary}, None, None
+    try:
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            timeout = deadline - now
+            if hedge is None:
+                timeout = min(timeout, max(0.0, started + hedge_delay_ms() / 1000 - now))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        count_chat_hedge('hedgeWins')
+                    return future.result()
+                error = future.exception()
+
+            if hedge is None and (not done or not pending):
+                # 첫 요청이 헤지 기준을 넘겼거나 실패함 → 같은 요청을 한 번 더
+                hedge = executor.submit(attempt)
+                pending.add(hedge)
+                count_chat_hedge('hedged')
+
+        if error is not None and not pending:
+            raise error
+        count_chat_hedge('deadlineFallbacks')
+        raise ChatDeadlineExceeded(f'No reply within {deadline_ms:.0f} ms')
+    finally:
+        # 진 쪽 / 마감 시간을 넘긴 요청이 아직 대기열에 있으면 취소 (실행 중인 호출은 클라이언트 타임아웃으로 끝남)
+        for future in pending:
+            future.cancel()
+
+
+def get_chat_latency_stats():
+    with chat_hedge_lock:
+        counts = dict(chat_hedge_counts)
+    return {
+        **counts,
+        'samples': len(chat_latency),
+        'p50': chat_latency.percentile(50),
+        'p95': chat_latency.percentile(95),
+        'p99': chat_latency.percentile(99),
+        'hedgeDelayMs': round(hedge_delay_ms(), 1)
+    }
+
+
+def generate_chat_reply(body, info=None, deadline=None):
+    """Bedrock 호출 후 튜터 응답 텍스트 반환 (헤지 + 턴 마감 시간 적용)
+
+    첫 인사는 설정(accent/level/topic)만으로 결정되므로, 예약 통화 알림 직후처럼 동시에 몰리면
+    singleflight로 컨테이너 간에 한 번만 생성해 공유한다.
+    deadline은 턴 시작 시각 기준 마감(monotonic, 생략 시 지금부터 CHAT_DEADLINE_MS). 기록 조회와
+    인사말 대기 시간도 이 예산에서 빠진다. 넘기면 준비된 응답을 반환하고 info['fallback'] = True로 표시.
+    """
+    if deadline is None:
+        deadline = time.monotonic() + CHAT_DEADLINE_MS / 1000
+
+    def remaining_ms():
+        return (deadline - time.monotonic()) * 1000
+
+    request_body = build_chat_request(body)
+    greeting = is_greeting_request(request_body)
+    try:
+        if greeting:
+            key = hashlib.sha256(request_body.encode('utf-8')).hexdigest()
+            text = singleflight(f'greeting:{key}', lambda: invoke_chat_model_hedged(request_body, remaining_ms()),
+                                wait_seconds=min(SINGLEFLIGHT_WAIT_SECONDS, max(0.0, remaining_ms() / 1000)))
+            mark_shared_text(text)  # 같은 인사말의 tts / 번역 요청도 컨테이너 간에 합침
+            return text
+        return invoke_chat_model_hedged(request_body, remaining_ms())
+    except ChatDeadlineExceeded as e:
+        print(f"Chat deadline exceeded: {str(e)}")
+        if info is not None:
+            info['fallback'] = True
+        return CHAT_FALLBACK_GREETING if greeting else random.choice(CHAT_FALLBACK_REPLIES)
+
+
+def handle_chat(body):
+    """AI 대화 처리 (Bedrock Claude Haiku)
+
+    messages 대신 deviceId + sessionId + message(새 사용자 발화)를 보내면 저장된 메시지로
+    문맥을 재구성한다. 요청 크기와 입력 토큰이 통화 길이와 무관하게 일정.
+    """
+    deadline = time.monotonic() + CHAT_DEADLINE_MS / 1000
+    if uses_server_history(body):
+        validation_error = validate_required(body, 'deviceId', 'sessionId')
+        if validation_error:
+            return validation_error
     try:
-        body = json.loads(event.get('body', '{}'))
-        action = body.get('action', 'chat')
+        info = {}
+        result = {'message': generate_chat_reply(body, info, deadline), 'role': 'assistant'}
+        if info.get('fallback'):
+            result['fallback'] = True
+        return success_response(result)
+    except PermissionError as e:
+        return error_response(str(e), 403)
+
+
+# 문장 경계: 종결부호(+닫는 따옴표/괄호) 뒤 공백. 흔한 약어 뒤에서는 자르지 않음
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])["\')\]]*\s+')
+ABBREVIATIONS = ('mr.', 'mrs.', 'ms.', 'dr.', 'prof.', 'st.', 'vs.', 'etc.', 'e.g.', 'i.e.', 'a.m.', 'p.m.', 'u.s.')
+
+
+class SentenceSplitter:
+    """스트리밍 텍스트를 문장 단위로 잘라주는 증분 분할기"""
+
+    def __init__(self):
+        self.buffer = ''
+
+    def feed(self, text):
+        """텍스트 조각을 추가하고 완성된 문장 리스트 반환"""
+        self.buffer += text
+        sentences, start = [], 0
+        for match in SENTENCE_BOUNDARY.finditer(self.buffer):
+            candidate = self.buffer[start:match.end()].strip()
+            if candidate.rsplit(None, 1)[-1].lstrip('("\'[').lower() in ABBREVIATIONS:  # 마지막 단어 전체가 약어일 때만
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        """남은 버퍼를 마지막 문장으로 반환"""
+        rest, self.buffer = self.buffer.strip(), ''
+        return [rest] if rest else []
+
+
+def split_sentences(text):
+    """완성된 텍스트를 문장 리스트로 분할"""
+    splitter = SentenceSplitter()
+    return splitter.feed(text) + splitter.flush()
+
+
+def stream_chat_sentences(body):
+    """Bedrock 응답 스트림을 받아 문장이 완성될 때마다 yield"""
+    response = get_client('bedrock').invoke_model_with_response_stream(
+        modelId=CLAUDE_MODEL,
+        contentType='application/json',
+        accept='application/json',
+        body=build_chat_request(body)
+    )
+
+    splitter = SentenceSplitter()
+    for event in response['body']:
+        chunk = event.get('chunk')
+        if not chunk:
+            continue
+        data = json.loads(chunk['bytes'])
+        if data.get('type') == 'content_block_delta':
+            yield from splitter.feed(data.get('delta', {}).get('text', ''))
+        elif data.get('type') == 'message_stop':
+            break
+    yield from splitter.flush()
+
+
+def handle_chat_stream(body):
+    """스트리밍 AI 대화: 문장 단위로 분할하고, 첫 문장부터 바로 TTS 합성 시작
+
+    Lambda(API Gateway)는 응답을 한 번에 반환하므로, 스트림의 이점은 서버 측에서
+    LLM 생성과 문장별 TTS 합성을 겹치는 데서 얻는다. tts=false면 문장 목록만 반환.
+    delivery='url'이면 문장별 오디오를 base64 대신 S3 presigned URL(audioUrl)로 반환.
+    """
+    with_tts = body.get('tts', True)
+    delivery = 'url' if body.get('delivery') == 'url' else 'base64'
+    voice_id, engine = resolve_voice(body.get('settings', {}))
+    started = time.perf_counter()
+
+    sentences, futures = [], []
+    first_sentence_ms = None
+    with ContextThreadPoolExecutor(max_workers=STREAM_TTS_WORKERS) as executor:
+        try:
+            for sentence in stream_chat_sentences(body):
+                if first_sentence_ms is None:
+                    first_sentence_ms = round((time.perf_counter() - started) * 1000)
+                sentences.append({'index': len(sentences), 'text': sentence})
+                if with_tts:
+                    futures.append(executor.submit(synthesize_for_delivery, sentence, voice_id, engine, delivery))
+        except PermissionError as e:
+            return error_response(str(e), 403)
+
+        for sentence, future in zip(sentences, futures):
+            sentence.update(future.result())
+
+    result = {
+        'message': ' '.join(s['text'] for s in sentences),
+        'role': 'assistant',
+        'sentences': sentences,
+        'firstSentenceMs': first_sentence_ms,
+        'totalMs': round((time.perf_counter() - started) * 1000)
+    }
+    if with_tts:
+        result.update({'contentType': 'audio/mpeg', 'voice': voice_id, 'engine': engine})
+    return success_response(result)
 
-        handler_name = ACTION_HANDLERS.get(action)
-        if handler_name:
-            return globals()[handler_name](body)
 
-        return error_response('Invalid action')
+def timed(timings, stage, fn, *args):
+    """fn 실행 시간을 timings[stage]에 ms 단위로 기록"""
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        timings[stage] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def handle_turn(body):
+    """대화 한 턴을 단일 요청으로 처리: chat → (TTS, 번역, 메시지 저장) 병렬 실행
+
+    messages의 마지막 user 메시지(서버 측 기록 사용 시 message)와 튜터 응답을 함께 저장한다.
+    tts / translate / save 옵션으로 단계를 끌 수 있고, 부가 단계 실패는 errors에 담아 반환.
+    delivery='url'이면 오디오를 S3 presigned URL(audioUrl)로 반환.
+    """
+    deadline = time.monotonic() + CHAT_DEADLINE_MS / 1000
+    validation_error = validate_required(body, 'deviceId', 'sessionId')
+    if validation_error:
+        return validation_error
+
+    device_id, session_id = body.get('deviceId'), body.get('sessionId')
+    settings = body.get('settings', {})
+    turn_number = body.get('turnNumber', 0)
+    with_tts, with_translate, with_save = body.get('tts', True), body.get('translate', True), body.get('save', True)
+    delivery = 'url' if body.get('delivery') == 'url' else 'base64'
+
+    if uses_server_history(body):
+        user_message = {'role': 'user', 'content': body['message']} if body.get('message') else None
+    else:
+        messages = body.get('messages', [])
+        user_message = messages[-1] if messages and messages[-1].get('role', 'user') == 'user' else None
+
+    # 저장(쓰기)보다 먼저 소유 기기 확인: 다른 기기의 세션에 메시지가 기록되지 않도록
+    if not is_session_owner(device_id, session_id):
+        return error_response('Access denied', 403)
+
+    started = time.perf_counter()
+    timings, errors, result = {}, {}, {'role': 'assistant'}
+
+    with ContextThreadPoolExecutor(max_workers=4) as executor:
+        futures = {}
+        if with_save and user_message:
+            futures['saveUser'] = executor.submit(timed, timings, 'saveUser', put_message, device_id, session_id, {
+                'role': 'user', 'content': user_message.get('content', ''), 'turnNumber': turn_number
+            })
+
+        chat_info = {}
+        try:
+            reply = timed(timings, 'chat', generate_chat_reply, body, chat_info, deadline)
+        except PermissionError as e:
+            return error_response(str(e), 403)
+        result['message'] = reply
+        if chat_info.get('fallback'):
+            result['fallback'] = True
+
+        if with_tts:
+            voice_id, engine = resolve_voice(settings)
+            futures['tts'] = executor.submit(timed, timings, 'tts', synthesize_for_delivery, reply, voice_id, engine, delivery)
+
+        def translate_and_save():
+            translation = None
+            if with_translate:
+                try:
+                    translation = timed(timings, 'translate', translate_texts, [reply])[0][0]
+                    result['translation'] = translation
+                except Exception as e:  # 번역 실패해도 튜터 메시지는 번역 없이 저장
+                    print(f"Turn translate error: {str(e)}")
+                    errors['translate'] = str(e)
+            if with_save:
+                return timed(timings, 'saveAssistant', put_message, device_id, session_id, {
+                    'role': 'assistant', 'content': reply, 'translation': translation, 'turnNumber': turn_number
+                })
+
+        futures['saveAssistant'] = executor.submit(translate_and_save)
+
+        for stage, future in futures.items():
+            try:
+                value = future.result()
+            except Exception as e:
+                print(f"Turn {stage} error: {str(e)}")
+                errors[stage] = str(e)
+                continue
+            if stage == 'tts':
+                result.update({**value, 'contentType': 'audio/mpeg', 'voice': voice_id, 'engine': engine})
+            elif stage == 'saveUser':
+                result['userMessageId'] = value
+                if body.get('analyze'):
+                    schedule_turn_analysis(device_id, session_id, value, {**user_message, 'turnNumber': turn_number})
+            elif value:
+                result['assistantMessageId'] = value
+
+    timings['total'] = round((time.perf_counter() - started) * 1000, 1)
+    result['timings'] = timings
+    if errors:
+        result['errors'] = errors
+    return success_response(result)
+
+
+_http_pool = None
+
+
+def get_http_pool():
+    """재사용 HTTP 커넥션 풀 (transcript 파일 다운로드용)"""
+    global _http_pool
+    if _http_pool is None:
+        _http_pool = urllib3.PoolManager(num_pools=2, maxsize=4, timeout=urllib3.Timeout(connect=2.0, read=5.0),
+                                         retries=urllib3.Retry(total=2, backoff_factor=0.1))
+    return _http_pool
+
+
+def wait_for_transcription_job(job_name, timeout=STT_TIMEOUT_SECONDS):
+    """Transcribe 작업 완료까지 적응형 백오프로 폴링 (150ms부터 1.5배씩, 최대 1초 간격)"""
+    deadline = time.monotonic() + timeout
+    delay = STT_POLL_INITIAL_SECONDS
+
+    while True:
+        job = get_client('transcribe').get_transcription_job(TranscriptionJobName=job_name)['TranscriptionJob']
+        job_status = job['TranscriptionJobStatus']
+
+        if job_status == 'COMPLETED':
+            return job
+        if job_status == 'FAILED':
+            raise Exception(f"Transcription failed: {job.get('FailureReason', 'unknown')}")
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise Exception('Transcription timeout')
+        time.sleep(min(delay, remaining))
+        delay = min(delay * STT_POLL_BACKOFF, STT_POLL_MAX_SECONDS)
+
+
+def fetch_transcript(transcript_uri):
+    """transcript JSON을 재사용 커넥션으로 받아 텍스트 반환"""
+    with span('transcript_fetch'):
+        response = get_http_pool().request('GET', transcript_uri)
+    if response.status != 200:
+        raise Exception(f'Transcript fetch failed: HTTP {response.status}')
+    return json.loads(response.data.decode('utf-8'))['results']['transcripts'][0]['transcript']
+
+
+stt_cleanup_queue = deque()
+
+
+def schedule_stt_cleanup(job_name, s3_key):
+    """업로드한 오디오와 Transcribe 작업 삭제를 응답 경로 밖으로 미룸"""
+    stt_cleanup_queue.append((job_name, s3_key, 0))
+    run_in_background(sweep_stt_cleanup)
+
+
+def sweep_stt_cleanup():
+    """대기 중인 STT 정리 작업 일괄 처리 (실패 시 재시도 큐에 다시 넣음)"""
+    retry = []
+    while stt_cleanup_queue:
+        try:
+            job_name, s3_key, attempts = stt_cleanup_queue.popleft()
+        except IndexError:
+            break
+        try:
+            get_client('s3').delete_object(Bucket=S3_BUCKET, Key=s3_key)
+            get_client('transcribe').delete_transcription_job(TranscriptionJobName=job_name)
+        except Exception as e:
+            if 'NotFound' in str(e) or "couldn't be found" in str(e):
+                continue
+            print(f"STT cleanup error ({job_name}): {str(e)}")
+            if attempts + 1 < STT_CLEANUP_MAX_ATTEMPTS:
+                retry.append((job_name, s3_key, attempts + 1))
+    stt_cleanup_queue.extend(retry)
+
+
+def handle_stt(body):
+    """음성→텍스트 변환 (AWS Transcribe 배치)"""
+    audio_base64 = body.get('audio', '')
+    language = body.get('language', 'en-US')
+
+    if not audio_base64:
+        return error_response('No audio data provided')
+
+    job_name = None
+    try:
+        audio_data = base64.b64decode(audio_base64)
+        job_name = f"stt-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        s3_key = f"audio/{job_name}.webm"
+
+        get_client('s3').put_object(Bucket=S3_BUCKET, Key=s3_key, Body=audio_data, ContentType='audio/webm')
+
+        get_client('transcribe').start_transcription_job(
+            TranscriptionJobName=job_name,
+            Media={'MediaFileUri': f's3://{S3_BUCKET}/{s3_key}'},
+            MediaFormat='webm',
+            LanguageCode=language,
+            Settings={'ShowSpeakerLabels': False, 'ChannelIdentification': False}
+        )
+
+        job = wait_for_transcription_job(job_name)
+        transcript_text = fetch_transcript(job['Transcript']['TranscriptFileUri'])
+        return success_response({'transcript': transcript_text, 'success': True})
+
+    except Exception as e:
+        print(f"STT error: {str(e)}")
+        return error_response(str(e), 500)
+    finally:
+        if job_name:
+            schedule_stt_cleanup(job_name, s3_key)
+
+
+def resolve_voice(settings):
+    """튜터 설정(accent, gender)에 맞는 Polly 음성과 엔진 반환"""
+    return VOICE_MAP.get((settings.get('accent', 'us'), settings.get('gender', 'female')), DEFAULT_VOICE)
+
+
+def synthesize_speech(text, voice_id, engine):
+    """Polly로 음성 합성 후 MP3 바이트 반환"""
+    response = get_client('polly').synthesize_speech(Text=text, OutputFormat='mp3', VoiceId=voice_id, Engine=engine)
+    return response['AudioStream'].read()
+
+
+tts_memory_cache = LRUCache(max_bytes=TTS_CACHE_MAX_BYTES)
+tts_s3_known = LRUCache(max_items=TTS_S3_KNOWN_MAX_ITEMS)  # S3에 있다고 확인된 캐시 키 (url 전달 시 재업로드 방지)
+tts_cache_counts = {'memory': 0, 's3': 0, 'polly': 0}
+tts_cache_counts_lock = threading.Lock()
+
+
+def tts_cache_key(text, voice_id, engine, output_format='mp3'):
+    """(텍스트, 음성, 엔진, 포맷)의 콘텐츠 해시"""
+    return hashlib.sha256(f'{voice_id}\n{engine}\n{output_format}\n{text}'.encode('utf-8')).hexdigest()
+
+
+def tts_s3_key(cache_key, output_format='mp3'):
+    return f'{TTS_CACHE_PREFIX}{cache_key}.{output_format}'
+
+
+def read_tts_s3_cache(cache_key):
+    """S3 캐시 계층 조회. 없거나 읽기 실패 시 None"""
+    try:
+        audio = get_client('s3').get_object(Bucket=S3_BUCKET, Key=tts_s3_key(cache_key))['Body'].read()
+    except Exception as e:
+        if 'NoSuchKey' not in str(e) and '404' not in str(e):
+            print(f"TTS cache read error: {str(e)}")
+        return None
+    tts_s3_known.set(cache_key, True)
+    return audio
+
+
+def write_tts_s3_cache(cache_key, audio):
+    get_client('s3').put_object(Bucket=S3_BUCKET, Key=tts_s3_key(cache_key), Body=audio, ContentType='audio/mpeg')
+    tts_s3_known.set(cache_key, True)
+
+
+def synthesize_speech_shared(text, voice_id, engine, cache_key):
+    """컨테이너 간 한 번만 합성. 선행 컨테이너가 S3 캐시에 기록하고 임대 아이템에는 S3 키만 공유
+
+    대기한 컨테이너는 S3에서 읽는다 (오디오 바이트를 DynamoDB에 쓰지 않음). 읽지 못하면 직접 합성.
+    """
+    synthesized = []
+
+    def compute():
+        audio = synthesize_speech(text, voice_id, engine)
+        synthesized.append(audio)
+        write_tts_s3_cache(cache_key, audio)
+        return tts_s3_key(cache_key)
+
+    singleflight(f'tts:{cache_key}', compute)
+    if synthesized:
+        return synthesized[0]
+    audio = read_tts_s3_cache(cache_key)
+    return audio if audio is not None else synthesize_speech(text, voice_id, engine)
+
+
+def synthesize_speech_cached(text, voice_id, engine, persist_sync=False):
+    """캐시를 거쳐 음성 합성. (MP3 바이트, 출처) 반환. 출처: memory | s3 | polly
+
+    persist_sync=True면 새로 합성한 오디오를 응답 전에 S3에 기록한다 (presigned URL로 바로 읽을 수 있게).
+    공유 문장(is_shared_text)만 singleflight를 거친다 (매번 다른 튜터 응답은 임대 비용 없이 바로 합성).
+    """
+    cache_key = tts_cache_key(text, voice_id, engine)
+
+    audio, source = tts_memory_cache.get(cache_key), 'memory'
+    if audio is None:
+        audio, source = read_tts_s3_cache(cache_key), 's3'
+        if audio is None:
+            source = 'polly'
+            if is_shared_text(text):
+                audio = synthesize_speech_shared(text, voice_id, engine, cache_key)
+            else:
+                audio = synthesize_speech(text, voice_id, engine)
+                if persist_sync:
+                    write_tts_s3_cache(cache_key, audio)
+                else:
+                    run_in_background(write_tts_s3_cache, cache_key, audio)
+        tts_memory_cache.set(cache_key, audio)
+
+    with tts_cache_counts_lock:
+        tts_cache_counts[source] += 1
+    return audio, source
+
+
+def split_tts_chunks(text, max_chars=TTS_CHUNK_MAX_CHARS):
+    """문장 경계에서 max_chars 이하 청크로 묶음. 한 문장이 더 길면 공백에서 자름"""
+    chunks, current = [], ''
+    for sentence in split_sentences(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(' ', 0, max_chars + 1)
+            cut = cut if cut > 0 else max_chars
+            head, sentence = sentence[:cut].strip(), sentence[cut:].strip()
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(head)
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = ''
+        current = f'{current} {sentence}' if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def strip_id3(audio, head=True, tail=True):
+    """MP3 앞의 ID3v2 / 뒤의 ID3v1 태그 제거 (프레임만 이어 붙이기 위해)"""
+    if head and audio[:3] == b'ID3' and len(audio) >= 10:
+        size = (audio[6] << 21) | (audio[7] << 14) | (audio[8] << 7) | audio[9]
+        audio = audio[10 + size + (10 if audio[5] & 0x10 else 0):]
+    if tail and len(audio) >= 128 and audio[-128:-125] == b'TAG':
+        audio = audio[:-128]
+    return audio
+
+
+def join_mp3(parts):
+    """청크별 MP3를 재인코딩 없이 순서대로 연결 (첫 청크의 앞 태그, 마지막 청크의 뒤 태그만 유지)"""
+    last = len(parts) - 1
+    return b''.join(strip_id3(part, head=i > 0, tail=i < last) for i, part in enumerate(parts))
+
+
+def synthesize_speech_chunked(text, voice_id, engine, persist_sync=False, chunk_timings=None):
+    """긴 텍스트는 청크로 나눠 제한된 스레드 풀에서 동시에 합성하고 이어 붙임. (MP3 바이트, 출처) 반환
+
+    청크마다 synthesize_speech_cached를 거치므로 캐시도 청크 단위. 출처는 청크 중 가장 느린 계층
+    (polly > s3 > memory). chunk_timings 리스트를 주면 청크별 {index, chars, ms, cache}를 채운다.
+    """
+    chunks = split_tts_chunks(text)
+    if len(chunks) <= 1:
+        chunks = [text]
+
+    def run(index):
+        started = time.perf_counter()
+        audio, source = synthesize_speech_cached(chunks[index], voice_id, engine, persist_sync and len(chunks) == 1)
+        return audio, source, {'index': index, 'chars': len(chunks[index]), 'ms': round((time.perf_counter() - started) * 1000, 1),
+                               'cache': source}
+
+    if len(chunks) == 1:
+        results = [run(0)]
+    else:
+        with ContextThreadPoolExecutor(max_workers=min(TTS_CHUNK_WORKERS, len(chunks))) as executor:
+            results = list(executor.map(run, range(len(chunks))))
+
+    if chunk_timings is not None:
+        chunk_timings.extend(timing for _, _, timing in results)
+    sources = {source for _, source, _ in results}
+    source = next(s for s in ('polly', 's3', 'memory') if s in sources)
+    if len(results) == 1:
+        return results[0][0], source
+    return join_mp3([audio for audio, _, _ in results]), source
+
+
+def presign_tts_audio(text, voice_id, engine, audio):
+    """S3 캐시 객체(콘텐츠 해시 키)의 presigned GET URL. 아직 S3에 있는지 모르면 먼저 업로드"""
+    cache_key = tts_cache_key(text, voice_id, engine)
+    if tts_s3_known.get(cache_key) is None:
+        write_tts_s3_cache(cache_key, audio)
+    with span('s3.presign'):
+        return get_client('s3').generate_presigned_url(
+            'get_object', Params={'Bucket': S3_BUCKET, 'Key': tts_s3_key(cache_key)}, ExpiresIn=TTS_URL_EXPIRES)
+
+
+def synthesize_for_delivery(text, voice_id, engine, delivery='base64', chunk_timings=None):
+    """음성 합성(긴 텍스트는 청크 병렬) 후 전달 방식에 맞는 응답 필드 반환
+
+    base64: {'audio': base64 문자열}, url: {'audioUrl', 'expiresIn'} (S3 presigned GET).
+    둘 다 'cache'(출처)를 포함한다.
+    """
+    audio, source = synthesize_speech_chunked(text, voice_id, engine, persist_sync=delivery == 'url',
+                                              chunk_timings=chunk_timings)
+    if delivery == 'url':
+        return {'audioUrl': presign_tts_audio(text, voice_id, engine, audio), 'expiresIn': TTS_URL_EXPIRES, 'cache': source}
+    return {'audio': base64.b64encode(audio).decode('utf-8'), 'cache': source}
+
+
+def get_tts_cache_stats():
+    """TTS 캐시 계층별 적중 통계"""
+    with tts_cache_counts_lock:
+        counts = dict(tts_cache_counts)
+    total = sum(counts.values())
+    return {
+        'memory': tts_memory_cache.stats(),
+        'memoryHits': counts['memory'],
+        's3Hits': counts['s3'],
+        'misses': counts['polly'],
+        'hitRate': round((counts['memory'] + counts['s3']) / total, 3) if total else 0.0
+    }
+
+
+def binary_audio_response(audio, voice_id, engine, source):
+    """MP3 바이트를 그대로 보내는 응답 (API Gateway 바이너리 미디어 타입 */* 필요 - 압축 응답과 같은 설정)"""
+    return {
+        'statusCode': 200,
+        'headers': {**CORS_HEADERS, 'Content-Type': 'audio/mpeg', 'Content-Length': str(len(audio)),
+                    'X-Tts-Voice': voice_id, 'X-Tts-Engine': engine, 'X-Tts-Cache': source},
+        'body': base64.b64encode(audio).decode('ascii'),
+        'isBase64Encoded': True
+    }
+
+
+def handle_tts(body):
+    """텍스트→음성 변환 (Amazon Polly, 캐시 우선)
+
+    delivery로 전달 방식 선택: base64(기본, JSON 안에 base64) | url(S3 presigned GET URL) |
+    binary(audio/mpeg 원본 응답, TTS_BINARY_MAX_BYTES를 넘으면 url 응답으로 대체).
+
+    TTS_CHUNK_MAX_CHARS보다 긴 텍스트는 문장 단위 청크로 병렬 합성해 이어 붙이고 chunks에 청크별 소요시간을
+    담는다. firstChunk=true면 첫 청크만 합성해 바로 반환하고, 나머지 청크 텍스트(remainingChunks)는
+    클라이언트가 재생하는 동안 tts로 따로 요청한다 (청크 단위 캐시 키가 같아 전체 요청과 캐시 공유).
+    """
+    text = body.get('text', '')
+    voice_id, engine = resolve_voice(body.get('settings', {}))
+    delivery = body.get('delivery', 'base64')
+    if delivery not in TTS_DELIVERY_MODES:
+        return error_response(f'delivery must be one of {", ".join(TTS_DELIVERY_MODES)}')
+    if len(text) > TTS_MAX_TEXT_CHARS:
+        return error_response(f'text can be at most {TTS_MAX_TEXT_CHARS} characters')
+
+    try:
+        result = {'contentType': 'audio/mpeg', 'voice': voice_id, 'engine': engine}
+        chunk_timings = []
+        if body.get('firstChunk') and len(text) > TTS_CHUNK_MAX_CHARS:
+            chunks = split_tts_chunks(text)
+            text, result['remainingChunks'] = chunks[0], chunks[1:]
+
+        if delivery == 'binary':
+            audio, source = synthesize_speech_chunked(text, voice_id, engine, chunk_timings=chunk_timings)
+            if len(audio) <= TTS_BINARY_MAX_BYTES and 'remainingChunks' not in result:
+                return binary_audio_response(audio, voice_id, engine, source)
+            result.update(audioUrl=presign_tts_audio(text, voice_id, engine, audio), expiresIn=TTS_URL_EXPIRES,
+                          cache=source, delivery='url')
+        else:
+            result.update(synthesize_for_delivery(text, voice_id, engine, delivery, chunk_timings))
+        if len(chunk_timings) > 1:
+            result['chunks'] = chunk_timings
+        return success_response(result)
+    except Exception as e:
+        print(f"TTS error: {str(e)}")
+        return error_response(str(e), 500)
+
+
+def handle_warmup(body):
+    """요청한 액션들이 쓰는 AWS 클라이언트만 미리 생성 (actions 생략 시 전체)
+
+    예약 실행(EventBridge)이나 통화 시작 직전에 호출해 콜드 스타트 비용을 앞당긴다.
+    """
+    actions = body.get('actions') or list(ACTION_HANDLERS)
+    started = time.perf_counter()
+    names = sorted({name for action in actions for name in ACTION_CLIENTS.get(action, ('dynamodb',))})
+    for name in names:
+        get_client(name)
+    if 'get_transcribe_url' in actions:
+        get_boto_session().get_credentials()
+    return success_response({
+        'success': True,
+        'clients': names,
+        'durationMs': round((time.perf_counter() - started) * 1000, 1)
+    })
+
+
+def handle_cache_stats(body):
+    """컨테이너 캐시 적중률 조회"""
+    return success_response({'tts': get_tts_cache_stats(), 'translation': translation_memory_cache.stats(),
+                             'singleflight': get_singleflight_stats(), 'chat': get_chat_latency_stats(),
+                             'sigv4': _transcribe_presigner.key_cache.stats() if _transcribe_presigner else None})
+
+
+translation_memory_cache = LRUCache(max_items=TRANSLATION_CACHE_MAX_ITEMS)
+
+
+def normalize_text(text):
+    """캐시 키용 텍스트 정규화 (앞뒤 공백 제거, 연속 공백 축약)"""
+    return ' '.join(str(text).split())
+
+
+def translation_cache_key(text, source_lang, target_lang):
+    return hashlib.sha256(f'{source_lang}\n{target_lang}\n{text}'.encode('utf-8')).hexdigest()
+
+
+def read_translation_store(cache_keys):
+    """DynamoDB 번역 캐시 일괄 조회. {cache_key: translation} 반환
+
+    UnprocessedKeys는 지수 백오프(지터)로 최대 TRANSLATION_STORE_MAX_RETRIES번 재시도하고,
+    그래도 남은 키는 결과에서 빠진다 (호출 측에서 캐시 미스로 번역).
+    """
+    found = {}
+    keys = [{'PK': f'TRANSLATION#{k}', 'SK': 'TRANSLATION'} for k in cache_keys]
+    for i in range(0, len(keys), 100):
+        request = {DYNAMODB_TABLE: {'Keys': keys[i:i + 100], 'ProjectionExpression': 'PK, translation'}}
+        delay = 0.05
+        for attempt in range(TRANSLATION_STORE_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(delay * (0.5 + random.random()))
+                delay = min(delay * 2, 0.5)
+            response = get_client('dynamodb').batch_get_item(RequestItems=request)
+            for item in response.get('Responses', {}).get(DYNAMODB_TABLE, []):
+                found[item['PK'].split('#', 1)[1]] = item['translation']
+            request = response.get('UnprocessedKeys')
+            if not request:
+                break
+        else:
+            unprocessed = len(request.get(DYNAMODB_TABLE, {}).get('Keys', []))
+            print(f"Translation cache read: {unprocessed} keys unprocessed, treating as misses")
+    return found
+
+
+def write_translation_store(entries):
+    """번역 결과를 DynamoDB 캐시에 저장. entries: [(cache_key, text, translation, source_lang, target_lang)]"""
+    now, ttl = get_now(), get_ttl(TRANSLATION_TTL_DAYS)
+    with get_table().batch_writer() as batch:
+        for cache_key, text, translation, source_lang, target_lang in entries:
+            batch.put_item(Item={
+                'PK': f'TRANSLATION#{cache_key}',
+                'SK': 'TRANSLATION',
+                'type': 'TRANSLATION',
+                'sourceText': text,
+                'translation': translation,
+                'sourceLang': source_lang,
+                'targetLang': target_lang,
+                'createdAt': now,
+                'ttl': ttl
+            })
+
+
+def translate_text(text, source_lang, target_lang):
+    """Amazon Translate 단건 호출"""
+    response = get_client('translate').translate_text(Text=text, SourceLanguageCode=source_lang, TargetLanguageCode=target_lang)
+    return response['TranslatedText']
+
+
+def translate_texts(texts, source_lang='en', target_lang='ko'):
+    """캐시를 거쳐 여러 텍스트 번역. 입력 순서대로 (번역, 출처) 리스트 반환
+
+    중복 제거 → 메모리 LRU → DynamoDB 일괄 조회 → 남은 것만 동시 번역 (공유 문장만 singleflight).
+    출처: memory | dynamodb | translate (빈 텍스트는 ('', None))
+    """
+    normalized = [normalize_text(t) for t in texts]
+    cache_keys = {n: translation_cache_key(n, source_lang, target_lang) for n in set(normalized) if n}
+
+    results, missing = {}, []
+    for text, cache_key in cache_keys.items():
+        cached = translation_memory_cache.get(cache_key)
+        if cached is not None:
+            results[text] = (cached, 'memory')
+        else:
+            missing.append(text)
+
+    if missing:
+        try:
+            stored = read_translation_store([cache_keys[t] for t in missing])
+        except Exception as e:
+            print(f"Translation cache read error: {str(e)}")
+            stored = {}
+        for text in missing:
+            if cache_keys[text] in stored:
+                results[text] = (stored[cache_keys[text]], 'dynamodb')
+                translation_memory_cache.set(cache_keys[text], stored[cache_keys[text]])
+
+    def translate(text):
+        if is_shared_text(text):  # 공유 문장만 컨테이너 간에 합침
+            return singleflight(f'translate:{cache_keys[text]}', lambda: translate_text(text, source_lang, target_lang))
+        return translate_text(text, source_lang, target_lang)
+
+    to_translate = [t for t in missing if t not in results]
+    if to_translate:
+        with ContextThreadPoolExecutor(max_workers=min(TRANSLATE_WORKERS, len(to_translate))) as executor:
+            translations = list(executor.map(translate, to_translate))
+        for text, translation in zip(to_translate, translations):
+            results[text] = (translation, 'translate')
+            translation_memory_cache.set(cache_keys[text], translation)
+        run_in_background(write_translation_store, [
+            (cache_keys[t], t, tr, source_lang, target_lang) for t, tr in zip(to_translate, translations)
+        ])
+
+    return [results.get(n, ('', None)) for n in normalized]
+
+
+def handle_translate(body):
+    """영어→한국어 번역 (Amazon Translate, 캐시 우선). texts 리스트를 주면 일괄 번역"""
+    source_lang = body.get('sourceLang', 'en')
+    target_lang = body.get('targetLang', 'ko')
+    texts = body.get('texts')
+
+    if texts is not None:
+        if not isinstance(texts, list) or not texts:
+            return error_response('texts must be a non-empty list')
+        if len(texts) > MAX_TRANSLATE_BATCH:
+            return error_response(f'texts can contain at most {MAX_TRANSLATE_BATCH} items')
+    else:
+        text = body.get('text', '')
+        if not text:
+            return error_response('No text to translate')
+
+    try:
+        if texts is not None:
+            results = translate_texts(texts, source_lang, target_lang)
+            return success_response({
+                'translations': [translation for translation, _ in results],
+                'cacheHits': sum(1 for _, source in results if source in ('memory', 'dynamodb')),
+                'translated': len({normalize_text(t) for t, (_, source) in zip(texts, results) if source == 'translate'}),
+                'sourceLang': source_lang,
+                'targetLang': target_lang,
+                'success': True
+            })
+
+        translation, source = translate_texts([text], source_lang, target_lang)[0]
+        return success_response({
+            'translation': translation,
+            'sourceLang': source_lang,
+            'targetLang': target_lang,
+            'cache': source,
+            'success': True
+        })
+    except Exception as e:
+        print(f"Translate error: {str(e)}")
+        return error_response(str(e), 500)
+
+
+def user_turns(messages):
+    """분석 대상인 사용자 발화 텍스트 리스트 (speaker/en 형식도 허용)"""
+    return [m.get('content', m.get('en', '')) for m in messages if m.get('role', m.get('speaker')) == 'user']
+
+
+def merge_analysis(stats, review):
+    """text_analytics 수치와 Bedrock 문법/피드백 결과를 analyze 응답 형식으로 합침"""
+    return {
+        'cafp_scores': {
+            'complexity': stats['cafp_scores']['complexity'],
+            'accuracy': review.get('accuracy'),
+            'fluency': stats['cafp_scores']['fluency'],
+            'pronunciation': review.get('pronunciation')
+        },
+        'fillers': stats['fillers'],
+        'grammar_corrections': review.get('grammar_corrections', []),
+        'vocabulary': {**stats['vocabulary'], 'suggested_words': review.get('suggested_words', [])},
+        'overall_feedback': review.get('overall_feedback', ''),
+        'improvement_tips': review.get('improvement_tips', []),
+        'metrics': stats['metrics']
+    }
+
+
+def fallback_analysis(stats):
+    """Bedrock 실패 시 로컬 수치만으로 만든 분석 (accuracy / pronunciation은 추정치로 표시)"""
+    estimate = round((stats['cafp_scores']['complexity'] + stats['cafp_scores']['fluency']) / 2)
+    analysis = merge_analysis(stats, {
+        'accuracy': estimate,
+        'pronunciation': estimate,
+        'overall_feedback': '대화를 잘 하셨습니다! 계속 연습하시면 더 좋아질 거예요.',
+        'improvement_tips': ['더 다양한 어휘를 사용해보세요', '문장을 조금 더 길게 만들어보세요', '필러 단어 사용을 줄여보세요']
+    })
+    analysis['estimated'] = ['accuracy', 'pronunciation']
+    return analysis
+
+
+def invoke_claude_json(prompt, max_tokens):
+    """Bedrock에 단일 프롬프트를 보내고 응답 텍스트에서 JSON 객체 추출 (없으면 ValueError)"""
+    response = get_client('bedrock').invoke_model(
+        modelId=CLAUDE_MODEL,
+        contentType='application/json',
+        accept='application/json',
+        body=json.dumps({
+            'anthropic_version': 'bedrock-2023-05-31',
+            'max_tokens': max_tokens,
+            'messages': [{'role': 'user', 'content': prompt}]
+        })
+    )
+
+    result = json.loads(response['body'].read())
+    json_match = re.search(r'\{[\s\S]*\}', result['content'][0]['text'])
+    if not json_match:
+        raise ValueError("No JSON found in response")
+    return json.loads(json_match.group())
+
+
+def handle_analyze(body):
+    """대화 분석: 필러/어휘/복잡도/유창성은 로컬 엔진, 문법 교정과 피드백은 Bedrock
+
+    messages 대신 deviceId + sessionId를 보내면 통화 중 저장된 턴 분석을 합쳐서 반환 (증분 모드).
+    """
+    messages = body.get('messages', [])
+
+    if not messages and body.get('sessionId'):
+        return handle_incremental_analyze(body)
+    if not messages:
+        return error_response('No messages to analyze')
+
+    # deviceId + sessionId가 함께 오고 본인 세션이면 결과를 저장하고, 같은 대화의 재요청은 저장본 반환
+    device_id, session_id = body.get('deviceId'), body.get('sessionId')
+    digest = None
+    if device_id and session_id:
+        try:
+            session_meta = find_session_meta(session_id)
+            if session_meta and session_meta.get('deviceId') == device_id:
+                digest = conversation_hash(messages)
+                stored = load_stored_analysis(device_id, session_id)
+                if is_reusable_analysis(stored, digest):
+                    return success_response(stored_analysis_response(stored))
+        except Exception as e:
+            print(f"Stored analysis lookup error: {str(e)}")
+
+    conversation_text = '\n'.join(
+        f"{m.get('role', m.get('speaker', 'user'))}: {m.get('content', m.get('en', ''))}"
+        for m in messages if m.get('role', m.get('speaker')) in ['user', 'assistant']
+    )
+
+    with span('text_analytics'):
+        stats = text_analytics.analyze_turns(user_turns(messages))
+
+    try:
+        prompt_stats = json.dumps({**stats['cafp_scores'], 'fillers': stats['fillers']['count'],
+                                   'words': stats['vocabulary']['total_words']})
+        review = invoke_claude_json(ANALYSIS_PROMPT.format(conversation=conversation_text, stats=prompt_stats),
+                                    ANALYSIS_MAX_TOKENS)
+        result = {'analysis': merge_analysis(stats, review), 'success': True}
+
+    except Exception as e:
+        print(f"Analysis error: {str(e)}")
+        result = {'analysis': fallback_analysis(stats), 'success': True, 'fallback': True}
+
+    if digest:
+        store_analysis(device_id, session_id, digest, result['analysis'], result.get('fallback', False))
+        result['conversationHash'] = digest
+    return success_response(result)
+
+
+# ============================================
+# 증분 분석: 사용자 턴이 저장될 때마다 분석해 두고 종료 시 합치기만 함
+# ============================================
+
+TURN_ANALYSIS_PREFIX = 'ANALYSIS#TURN#'
+
+
+def analyze_user_turn(device_id, session_id, message_id, content, turn_number=0):
+    """사용자 발화 한 턴을 분석해 TURN_ANALYSIS 아이템으로 저장하고 반환
+
+    Bedrock 검토가 실패해도 로컬 수치는 저장하고 reviewed=False로 남겨 종료 시 다시 시도한다.
+    """
+    stats = text_analytics.analyze_turns([content])
+    try:
+        review = invoke_claude_json(TURN_ANALYSIS_PROMPT.format(utterance=content), TURN_ANALYSIS_MAX_TOKENS)
+    except Exception as e:
+        print(f"Turn analysis error: {str(e)}")
+        review = None
+
+    item = {
+        'PK': f'DEVICE#{device_id}',
+        'SK': f'SESSION#{session_id}#{TURN_ANALYSIS_PREFIX}{message_id}',
+        'GSI1PK': f'SESSION#{session_id}',
+        'GSI1SK': f'{TURN_ANALYSIS_PREFIX}{message_id}',
+        'type': 'TURN_ANALYSIS',
+        'deviceId': device_id,
+        'sessionId': session_id,
+        'messageId': message_id,
+        'turnNumber': turn_number,
+        'words': stats['vocabulary']['total_words'],
+        'fillers': stats['fillers']['words'],
+        'reviewed': review is not None,
+        'createdAt': get_now(),
+        'ttl': get_ttl()
+    }
+    if review is not None:
+        item.update({
+            'accuracy': int(review.get('accuracy') or 0),
+            'pronunciation': int(review.get('pronunciation') or 0),
+            'grammarCorrections': review.get('grammar_corrections', [])
+        })
+    get_table().put_item(Item=item)
+    return item
+
+
+def schedule_turn_analysis(device_id, session_id, message_id, message):
+    """user 메시지면 턴 분석을 응답 경로 밖에서 실행"""
+    if message.get('role', 'user') == 'user' and message.get('content'):
+        run_in_background(analyze_user_turn, device_id, session_id, message_id,
+                          message['content'], message.get('turnNumber', 0))
+
+
+def weighted_score(turns, field):
+    """단어 수 가중 평균 점수 (검토된 턴이 없으면 None)"""
+    total_words = sum(int(t['words']) for t in turns)
+    if not turns or not total_words:
+        return None
+    return round(sum(int(t[field]) * int(t['words']) for t in turns) / total_words)
+
+
+def load_session_items(session_id):
+    """GSI1으로 세션의 모든 아이템(분석 포함)을 전체 속성으로 조회"""
+    table = get_table()
+    query_params = {
+        'IndexName': 'GSI1',
+        'KeyConditionExpression': 'GSI1PK = :pk',
+        'ExpressionAttributeValues': {':pk': f'SESSION#{session_id}'}
+    }
+    items = []
+    while True:
+        response = table.query(**query_params)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        query_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def merge_session_analysis(device_id, session_id, items):
+    """세션 아이템(load_session_items)의 메시지와 턴 분석으로 최종 분석 생성
+
+    분석이 없거나 Bedrock 검토가 실패했던 턴은 이 시점에 병렬로 분석한다.
+    수치 필드는 전체 사용자 발화로 로컬 엔진을 다시 돌려 정확히 계산 (수 ms).
+    사용자 메시지가 없으면 ValueError.
+    """
+    user_messages = [item for item in items if item.get('type') == 'MESSAGE' and item.get('role') == 'user']
+    if not user_messages:
+        raise ValueError('No messages to analyze')
+    analyses = {item['messageId']: item for item in items if item.get('type') == 'TURN_ANALYSIS'}
+
+    missing = [m for m in user_messages if not analyses.get(m['GSI1SK'], {}).get('reviewed')]
+    if missing:
+        with ContextThreadPoolExecutor(max_workers=ANALYSIS_WORKERS) as executor:
+            for item in executor.map(lambda m: analyze_user_turn(device_id, session_id, m['GSI1SK'], m.get('content', ''),
+                                                                 m.get('turnNumber', 0)), missing):
+                analyses[item['messageId']] = item
+
+    with span('text_analytics'):
+        stats = text_analytics.analyze_turns([m.get('content', '') for m in user_messages])
+
+    turns = [analyses[m['GSI1SK']] for m in user_messages if m['GSI1SK'] in analyses]
+    reviewed = [t for t in turns if t.get('reviewed')]
+    corrections, seen = [], set()
+    for correction in (c for t in reviewed for c in t.get('grammarCorrections', [])):
+        if correction.get('original') not in seen and len(corrections) < MAX_MERGED_CORRECTIONS:
+            seen.add(correction.get('original'))
+            corrections.append(correction)
+    review = {
+        'accuracy': weighted_score(reviewed, 'accuracy'),
+        'pronunciation': weighted_score(reviewed, 'pronunciation'),
+        'grammar_corrections': corrections
+    }
+
+    try:
+        feedback = invoke_claude_json(SESSION_FEEDBACK_PROMPT.format(
+            stats=json.dumps({**stats['cafp_scores'], 'accuracy': review['accuracy'], 'fillers': stats['fillers']['count'],
+                              'words': stats['vocabulary']['total_words']}),
+            corrections=json.dumps([c.get('corrected') for c in corrections], ensure_ascii=False),
+            sample=json.dumps([m.get('content', '') for m in user_messages[-5:]], ensure_ascii=False)
+        ), SESSION_FEEDBACK_MAX_TOKENS)
+    except Exception as e:
+        print(f"Session feedback error: {str(e)}")
+        feedback = None
+
+    if review['accuracy'] is None or feedback is None:
+        analysis = fallback_analysis(stats)
+        if review['accuracy'] is not None:
+            analysis['cafp_scores'].update(accuracy=review['accuracy'], pronunciation=review['pronunciation'])
+            analysis['estimated'] = []
+        analysis['grammar_corrections'] = corrections
+    else:
+        analysis = merge_analysis(stats, {**feedback, **review})
+
+    analysis['incremental'] = {'turns': len(user_messages), 'analyzedAtEnd': len(missing)}
+    return analysis, feedback is None
+
+
+def handle_incremental_analyze(body):
+    """증분 모드 analyze: 통화 중 저장된 턴 분석을 합쳐 최종 결과 반환 (같은 대화면 저장된 결과 재사용)"""
+    validation_error = validate_required(body, 'deviceId', 'sessionId')
+    if validation_error:
+        return validation_error
+
+    device_id, session_id = body.get('deviceId'), body.get('sessionId')
+    try:
+        items = load_session_items(session_id)
+        if not is_session_owner(device_id, session_id, items):
+            return error_response('Access denied', 403)
+
+        digest = conversation_hash(item for item in items if item.get('type') == 'MESSAGE')
+        stored = next((item for item in items if item.get('type') == 'SESSION_ANALYSIS'), None)
+        if is_reusable_analysis(stored, digest):
+            return success_response(stored_analysis_response(stored))
+
+        try:
+            analysis, is_fallback = merge_session_analysis(device_id, session_id, items)
+        except ValueError as e:
+            return error_response(str(e))
+        store_analysis(device_id, session_id, digest, analysis, is_fallback)
+    except Exception as e:
+        print(f"Incremental analysis error: {str(e)}")
+        return error_response(str(e), 500)
+
+    result = {'analysis': analysis, 'success': True, 'conversationHash': digest}
+    if is_fallback:
+        result['fallback'] = True
+    return success_response(result)
+
+
+# ============================================
+# 분석 결과 저장: 세션당 ANALYSIS 아이템, 정규화한 대화 해시로 중복 분석 방지
+# ============================================
+
+def conversation_hash(messages):
+    """role + 정규화한 내용을 순서대로 이은 대화의 SHA-256"""
+    digest = hashlib.sha256()
+    for m in messages:
+        role = m.get('role', m.get('speaker'))
+        if role in ('user', 'assistant'):
+            digest.update(f"{role}\n{normalize_text(m.get('content', m.get('en', '')))}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def is_reusable_analysis(stored, digest):
+    """저장된 분석이 같은 대화에 대한 정상(fallback 아님) 결과인지"""
+    return bool(stored) and stored.get('conversationHash') == digest and not stored.get('fallback')
+
+
+def stored_analysis_response(item):
+    return {
+        'analysis': serialization.Fragment(item['analysisJson']),
+        'success': True,
+        'cached': True,
+        'conversationHash': item.get('conversationHash'),
+        'analyzedAt': item.get('createdAt')
+    }
+
+
+def load_stored_analysis(device_id, session_id):
+    return get_table().get_item(Key={'PK': f'DEVICE#{device_id}', 'SK': f'SESSION#{session_id}#ANALYSIS'}).get('Item')
+
+
+def store_analysis(device_id, session_id, digest, analysis, is_fallback=False):
+    """세션 분석 결과 저장 (분석 결과는 float가 섞여 있어 JSON 문자열로 보관). 실패는 로그만 남김"""
+    try:
+        get_table().put_item(Item={
+            'PK': f'DEVICE#{device_id}',
+            'SK': f'SESSION#{session_id}#ANALYSIS',
+            'GSI1PK': f'SESSION#{session_id}',
+            'GSI1SK': 'ANALYSIS',
+            'type': 'SESSION_ANALYSIS',
+            'deviceId': device_id,
+            'sessionId': session_id,
+            'conversationHash': digest,
+            'analysisJson': json.dumps(analysis, ensure_ascii=False),
+            'fallback': is_fallback,
+            'createdAt': get_now(),
+            'ttl': get_ttl()
+        })
+    except Exception as e:
+        print(f"Store analysis error: {str(e)}")
+
+
+def handle_get_analysis(body):
+    """저장된 분석 결과를 세션 정보/메시지와 함께 GSI1 조회 한 번으로 반환
+
+    stale=true면 분석 이후 메시지가 바뀐 것 (analyze를 다시 호출하면 갱신).
+    """
+    validation_error = validate_required(body, 'deviceId', 'sessionId')
+    if validation_error:
+        return validation_error
+
+    device_id, session_id = body.get('deviceId'), body.get('sessionId')
+    try:
+        items = load_session_items(session_id)
+        if not items:
+            return error_response('Session not found', 404)
+        if not is_session_owner(device_id, session_id, items):
+            return error_response('Access denied', 403)
 
+        session_meta = next((session_meta_view(item) for item in items if item.get('type') == 'SESSION_META'), None)
+        message_items = [item for item in items if item.get('type') == 'MESSAGE']
+        stored = next((item for item in items if item.get('type') == 'SESSION_ANALYSIS'), None)
+
+        result = {'session': session_meta, 'messages': [message_view(item) for item in message_items], 'analysis': None}
+        if stored:
+            result.update(stored_analysis_response(stored))
+            result['stale'] = stored.get('conversationHash') != conversation_hash(message_items)
+            result['fallback'] = bool(stored.get('fallback'))
+            del result['cached']
+        return success_response(result)
     except Exception as e:
-        print(f"Error: {str(e)}")
+        print(f"Get analysis error: {str(e)}")
         return error_response(str(e), 500)
 
 
 # ============================================
-# 대화/분석 핸들러
+# 비동기 분석 작업: analyze_async로 제출, 워커가 실행, get_analysis_job으로 폴링
 # ============================================
 
-def handle_chat(body):
-    """AI 대화 처리 (Bedrock Claude Haiku)"""
-    messages = body.get('messages', [])
-    settings = body.get('settings', {})
-
-    accent_map = {'us': 'American English', 'uk': 'British English', 'au': 'Australian English', 'in': 'Indian English'}
-    level_map = {'beginner': 'Beginner (use simple words and short sentences)', 'intermediate': 'Intermediate (normal conversation level)', 'advanced': 'Advanced (use complex vocabulary and idioms)'}
-    topic_map = {'business': 'Business and workplace situations', 'daily': 'Daily life and casual conversation', 'travel': 'Travel and tourism', 'interview': 'Job interviews and professional settings'}
-
-    system = SYSTEM_PROMPT.format(
-        accent=accent_map.get(settings.get('accent', 'us'), 'American English'),
-        level=level_map.get(settings.get('level', 'intermediate'), 'Intermediate'),
-        topic=topic_map.get(settings.get('topic', 'business'), 'Business')
-    )
-
-    claude_messages = [{'role': m.get('role', 'user'), 'content': m.get('content', '')} for m in messages]
-    if not claude_messages:
-        claude_messages = [{'role': 'user', 'content': "Hello, let's start our English practice session."}]
+_analysis_job_executor = None
+_analysis_job_lock = threading.Lock()
 
-    response = bedrock.invoke_model(
-        modelId=CLAUDE_MODEL,
-        contentType='application/json',
-        accept='application/json',
-        body=json.dumps({
-            'anthropic_version': 'bedrock-2023-05-31',
-            'max_tokens': 300,
-            'system': system,
-            'messages': claude_messages
-        })
-    )
 
-    result = json.loads(response['body'].read())
-    return success_response({'message': result['content'][0]['text'], 'role': 'assistant'})
+def get_analysis_job_executor():
+    """워커 Lambda가 없을 때(로컬 개발/벤치마크) 작업을 실행하는 프로세스 내 대기열"""
+    global _analysis_job_executor
+    with _analysis_job_lock:
+        if _analysis_job_executor is None:
+            _analysis_job_executor = ThreadPoolExecutor(max_workers=ANALYSIS_JOB_LOCAL_WORKERS, thread_name_prefix='analysis-job')
+    return _analysis_job_executor
 
 
-def handle_stt(body):
-    """음성→텍스트 변환 (AWS Transcribe)"""
-    audio_base64 = body.get('audio', '')
-    language = body.get('language', 'en-US')
+def job_key(job_id):
+    return {'PK': f'JOB#{job_id}', 'SK': 'JOB'}
 
-    if not audio_base64:
-        return error_response('No audio data provided')
 
-    try:
-        audio_data = base64.b64decode(audio_base64)
-        job_name = f"stt-{int(time.time() * 1000)}"
-        s3_key = f"audio/{job_name}.webm"
+def job_stale_before():
+    """이 시각(get_now 형식) 전에 시작된 running 작업은 워커가 시간 초과/중단된 것으로 봄"""
+    return (datetime.fromisoformat(get_now()) - timedelta(seconds=ANALYSIS_JOB_LEASE_SECONDS)).isoformat()
 
-        s3.put_object(Bucket=S3_BUCKET, Key=s3_key, Body=audio_data, ContentType='audio/webm')
 
-        transcribe.start_transcription_job(
-            TranscriptionJobName=job_name,
-            Media={'MediaFileUri': f's3://{S3_BUCKET}/{s3_key}'},
-            MediaFormat='webm',
-            LanguageCode=language,
-            Settings={'ShowSpeakerLabels': False, 'ChannelIdentification': False}
+def dispatch_analysis_job(job_id):
+    """워커 Lambda를 비동기(Event) 호출하거나, 워커가 없으면 로컬 실행기에 제출"""
+    if ANALYSIS_WORKER_FUNCTION:
+        get_client('lambda').invoke(
+            FunctionName=ANALYSIS_WORKER_FUNCTION,
+            InvocationType='Event',
+            Payload=json.dumps({'analysisJob': job_id}).encode('utf-8')
         )
+    else:
+        get_analysis_job_executor().submit(run_analysis_job, job_id)
 
-        for _ in range(30):
-            status = transcribe.get_transcription_job(TranscriptionJobName=job_name)
-            job_status = status['TranscriptionJob']['TranscriptionJobStatus']
 
-            if job_status == 'COMPLETED':
-                transcript_uri = status['TranscriptionJob']['Transcript']['TranscriptFileUri']
-                with urllib.request.urlopen(transcript_uri) as response:
-                    transcript_data = json.loads(response.read().decode())
+def run_analysis_job(job_id):
+    """작업 하나 실행: queued → running 전환에 성공한 워커만 실행 (비동기 호출 재시도로 인한 중복 방지)
 
-                transcript_text = transcript_data['results']['transcripts'][0]['transcript']
-                s3.delete_object(Bucket=S3_BUCKET, Key=s3_key)
-                transcribe.delete_transcription_job(TranscriptionJobName=job_name)
+    running인 채로 ANALYSIS_JOB_LEASE_SECONDS가 지난 작업(워커 시간 초과/중단)은 재시도 호출이 다시 가져간다.
+    """
+    table = get_table()
+    try:
+        job = table.update_item(
+            Key=job_key(job_id),
+            UpdateExpression='SET #st = :running, startedAt = :now',
+            ConditionExpression='#st = :queued OR (#st = :running AND startedAt < :stale)',
+            ExpressionAttributeNames={'#st': 'status'},
+            ExpressionAttributeValues={':running': 'running', ':queued': 'queued', ':now': get_now(),
+                                       ':stale': job_stale_before()},
+            ReturnValues='ALL_NEW'
+        )['Attributes']
+    except Exception as e:
+        if 'ConditionalCheckFailed' in str(e):
+            return
+        raise
 
-                return success_response({'transcript': transcript_text, 'success': True})
-            elif job_status == 'FAILED':
-                raise Exception('Transcription failed')
+    try:
+        response = handle_analyze(json.loads(job['request']))
+        status = 'completed' if response['statusCode'] == 200 else 'failed'
+        result = response['body']
+    except Exception as e:
+        print(f"Analysis job error: {str(e)}")
+        status, result = 'failed', json.dumps({'error': str(e)})
+
+    table.update_item(
+        Key=job_key(job_id),
+        UpdateExpression='SET #st = :status, resultJson = :result, finishedAt = :now',
+        ExpressionAttributeNames={'#st': 'status'},
+        ExpressionAttributeValues={':status': status, ':result': result, ':now': get_now()}
+    )
 
-            time.sleep(1)
 
-        raise Exception('Transcription timeout')
+def handle_analysis_job_event(event, context):
+    """워커로 직접 호출된 이벤트({'analysisJob': id}) 처리"""
+    metrics = RequestMetrics()
+    token = current_metrics.set(metrics)
+    try:
+        run_analysis_job(event['analysisJob'])
+    finally:
+        current_metrics.reset(token)
+    emit_metrics(metrics, 'analysis_job', 200, context)
+    return {'jobId': event['analysisJob']}
 
-    except Exception as e:
-        print(f"STT error: {str(e)}")
-        return error_response(str(e), 500)
 
+def handle_analyze_async(body):
+    """analyze 요청을 작업으로 등록하고 jobId를 바로 반환 (202). 본문은 analyze와 동일"""
+    validation_error = validate_required(body, 'deviceId')
+    if validation_error:
+        return validation_error
+    if not body.get('messages') and not body.get('sessionId'):
+        return error_response('messages or sessionId is required')
 
-def handle_tts(body):
-    """텍스트→음성 변환 (Amazon Polly)"""
-    text = body.get('text', '')
-    settings = body.get('settings', {})
-    accent = settings.get('accent', 'us')
-    gender = settings.get('gender', 'female')
-
-    voice_map = {
-        ('us', 'female'): ('Joanna', 'neural'), ('us', 'male'): ('Matthew', 'neural'),
-        ('uk', 'female'): ('Amy', 'neural'), ('uk', 'male'): ('Brian', 'neural'),
-        ('au', 'female'): ('Nicole', 'standard'), ('au', 'male'): ('Russell', 'standard'),
-        ('in', 'female'): ('Aditi', 'standard'), ('in', 'male'): ('Aditi', 'standard'),
-    }
-    voice_id, engine = voice_map.get((accent, gender), ('Joanna', 'neural'))
+    request = json.dumps({k: v for k, v in body.items() if k != 'action'}, ensure_ascii=False)
+    if len(request.encode('utf-8')) > MAX_ANALYSIS_JOB_REQUEST_BYTES:
+        return error_response('Conversation is too large for an analysis job; send sessionId instead of messages', 413)
 
+    job_id = uuid.uuid4().hex
+    now = get_now()
     try:
-        response = polly.synthesize_speech(Text=text, OutputFormat='mp3', VoiceId=voice_id, Engine=engine)
-        audio_base64 = base64.b64encode(response['AudioStream'].read()).decode('utf-8')
-        return success_response({'audio': audio_base64, 'contentType': 'audio/mpeg', 'voice': voice_id, 'engine': engine})
+        get_table().put_item(Item={
+            **job_key(job_id),
+            'type': 'ANALYSIS_JOB',
+            'jobId': job_id,
+            'deviceId': body['deviceId'],
+            'sessionId': body.get('sessionId'),
+            'status': 'queued',
+            'request': request,
+            'createdAt': now,
+            'ttl': get_ttl(ANALYSIS_JOB_TTL_DAYS)
+        })
+        dispatch_analysis_job(job_id)
     except Exception as e:
-        print(f"TTS error: {str(e)}")
+        print(f"Analyze async error: {str(e)}")
         return error_response(str(e), 500)
 
+    return make_response(202, {'jobId': job_id, 'status': 'queued', 'createdAt': now})
 
-def handle_translate(body):
-    """영어→한국어 번역 (Amazon Translate)"""
-    text = body.get('text', '')
-    source_lang = body.get('sourceLang', 'en')
-    target_lang = body.get('targetLang', 'ko')
 
-    if not text:
-        return error_response('No text to translate')
+def handle_get_analysis_job(body):
+    """작업 상태 조회. completed면 result에 analyze 응답 본문, failed면 error
+
+    running인 채로 ANALYSIS_JOB_LEASE_SECONDS가 지난 작업은 failed로 보고한다 (재시도가 다시 가져가면 running으로 돌아감).
+    """
+    validation_error = validate_required(body, 'deviceId', 'jobId')
+    if validation_error:
+        return validation_error
 
     try:
-        response = translate_client.translate_text(
-            Text=text,
-            SourceLanguageCode=source_lang,
-            TargetLanguageCode=target_lang
-        )
-        return success_response({
-            'translation': response['TranslatedText'],
-            'sourceLang': source_lang,
-            'targetLang': target_lang,
-            'success': True
-        })
+        job = get_table().get_item(Key=job_key(body['jobId'])).get('Item')
+        if not job:
+            return error_response('Job not found', 404)
+        if job.get('deviceId') != body['deviceId']:
+            return error_response('Access denied', 403)
+
+        if job.get('status') == 'running' and job.get('startedAt', '') < job_stale_before():
+            job = {**job, 'status': 'failed', 'resultJson': json.dumps({'error': 'Analysis worker timed out'})}
+
+        result = {key: job.get(key) for key in ('jobId', 'status', 'sessionId', 'createdAt', 'startedAt', 'finishedAt')}
+        if job.get('status') == 'completed':
+            result['result'] = serialization.Fragment(job['resultJson'])
+        elif job.get('status') == 'failed':
+            result['error'] = json.loads(job.get('resultJson') or '{}').get('error', 'Analysis failed')
+        return success_response(result)
     except Exception as e:
-        print(f"Translate error: {str(e)}")
+        print(f"Get analysis job error: {str(e)}")
         return error_response(str(e), 500)
 
 
-def handle_analyze(body):
-    """대화 분석 (AI 기반 CAFP 점수, 문법, 필러 분석)"""
-    messages = body.get('messages', [])
+# ============================================
+# 사용자 설정 핸들러
+# ============================================
 
-    if not messages:
-        return error_response('No messages to analyze')
+settings_cache = LRUCache(max_items=SETTINGS_CACHE_MAX_ITEMS)
 
-    conversation_text = '\n'.join(
-        f"{m.get('role', m.get('speaker', 'user'))}: {m.get('content', m.get('en', ''))}"
-        for m in messages if m.get('role', m.get('speaker')) in ['user', 'assistant']
-    )
 
-    user_text = ' '.join(
-        m.get('content', m.get('en', '')) for m in messages if m.get('role', m.get('speaker')) == 'user'
-    ).lower()
+def settings_key(device_id):
+    return {'PK': f'DEVICE#{device_id}', 'SK': 'SETTINGS'}
+
 
-    filler_words = ['um', 'uh', 'like', 'you know', 'basically', 'actually', 'literally', 'i mean', 'so', 'well', 'kind of', 'sort of']
-    found_fillers = [f for filler in filler_words for f in [filler] * len(re.findall(r'\b' + filler + r'\b', user_text))]
+def settings_etag(version):
+    return f'"{version}"'
 
+
+def parse_settings_version(body):
+    """요청의 version(숫자) 또는 etag('"3"' 형식)를 정수로. 없으면 None, 형식이 잘못되면 ValueError"""
+    value = body.get('version', body.get('etag'))
+    if value is None:
+        return None
     try:
-        response = bedrock.invoke_model(
-            modelId=CLAUDE_MODEL,
-            contentType='application/json',
-            accept='application/json',
-            body=json.dumps({
-                'anthropic_version': 'bedrock-2023-05-31',
-                'max_tokens': 1500,
-                'messages': [{'role': 'user', 'content': ANALYSIS_PROMPT.format(conversation=conversation_text)}]
-            })
-        )
+        return int(str(value).strip().removeprefix('W/').strip('"'))
+    except ValueError:
+        raise ValueError('version must be an integer or an ETag')
 
-        result = json.loads(response['body'].read())
-        json_match = re.search(r'\{[\s\S]*\}', result['content'][0]['text'])
-        if json_match:
-            return success_response({'analysis': json.loads(json_match.group()), 'success': True})
-        raise ValueError("No JSON found in response")
 
-    except Exception as e:
-        print(f"Analysis error: {str(e)}")
-        word_count = len(user_text.split())
-        return success_response({
-            'analysis': {
-                'cafp_scores': {'complexity': 70, 'accuracy': 75, 'fluency': 72, 'pronunciation': 78},
-                'fillers': {'count': len(found_fillers), 'words': found_fillers, 'percentage': round(len(found_fillers) / max(word_count, 1) * 100, 1)},
-                'grammar_corrections': [],
-                'vocabulary': {'total_words': word_count, 'unique_words': len(set(user_text.split())), 'advanced_words': [], 'suggested_words': []},
-                'overall_feedback': '대화를 잘 하셨습니다! 계속 연습하시면 더 좋아질 거예요.',
-                'improvement_tips': ['더 다양한 어휘를 사용해보세요', '문장을 조금 더 길게 만들어보세요', '필러 단어 사용을 줄여보세요']
-            },
-            'success': True,
-            'fallback': True
-        })
+def cache_settings(device_id, item):
+    """설정 아이템(없으면 None)을 TTL과 함께 캐시"""
+    settings_cache.set(device_id, (item, time.monotonic() + SETTINGS_CACHE_TTL_SECONDS))
 
 
-# ============================================
-# 사용자 설정 핸들러
-# ============================================
+def load_settings(device_id, min_version=None):
+    """설정 아이템 조회 (컨테이너 캐시 우선). 캐시가 만료됐거나 min_version보다 오래됐으면 강한 일관성 읽기"""
+    cached = settings_cache.get(device_id)
+    if cached is not None:
+        item, expires_at = cached
+        fresh = min_version is None or (item is not None and int(item.get('version', 0)) >= min_version)
+        if time.monotonic() < expires_at and fresh:
+            return item
+    item = get_table().get_item(Key=settings_key(device_id), ConsistentRead=min_version is not None).get('Item')
+    cache_settings(device_id, item)
+    return item
+
+
+def settings_response(item):
+    """설정 아이템 → 200 응답 (ETag 헤더 = version)"""
+    version = int(item.get('version', 0))
+    response = success_response({'success': True, 'settings': item.get('settings', {}), 'version': version,
+                                 'updatedAt': item.get('updatedAt'), 'createdAt': item.get('createdAt')})
+    response['headers'] = {**response['headers'], 'ETag': settings_etag(version)}
+    return response
+
 
 def handle_save_settings(body):
-    """사용자 맞춤설정 저장"""
+    """사용자 맞춤설정 저장 (version 조건부 갱신, 저장 결과로 컨테이너 캐시 갱신)
+
+    version(또는 etag)을 보내면 저장된 version과 같을 때만 덮어쓰고, 다르면 409와 현재 설정을 반환.
+    첫 저장은 version 0. 생략하면 조건 없이 저장 (이전 클라이언트 호환). createdAt은 처음 값을 유지.
+    """
     validation_error = validate_required(body, 'deviceId')
     if validation_error:
         return validation_error
 
     device_id = body.get('deviceId')
     settings = body.get('settings', {})
-
+    try:
+        expected = parse_settings_version(body)
+    except ValueError as e:
+        return error_response(str(e))
+
+    update_params = {
+        'Key': settings_key(device_id),
+        'UpdateExpression': ('SET #type = :type, deviceId = :deviceId, #settings = :settings, updatedAt = :now, '
+                             'createdAt = if_not_exists(createdAt, :now), #ttl = :ttl, '
+                             '#version = if_not_exists(#version, :zero) + :one'),
+        'ExpressionAttributeNames': {'#type': 'type', '#settings': 'settings', '#ttl': 'ttl', '#version': 'version'},
+        'ReturnValues': 'ALL_NEW'
+    }
     try:
         now = get_now()
-        get_table().put_item(Item={
-            'PK': f'DEVICE#{device_id}',
-            'SK': 'SETTINGS',
-            'type': 'USER_SETTINGS',
-            'deviceId': device_id,
-            'settings': settings,
-            'updatedAt': now,
-            'createdAt': now,
-            'ttl': get_ttl()
-        })
-        return success_response({'success': True, 'settings': settings, 'updatedAt': now})
+        values = {':type': 'USER_SETTINGS', ':deviceId': device_id, ':settings': settings, ':now': now,
+                  ':ttl': get_ttl(), ':zero': 0, ':one': 1}
+        if expected is not None:
+            if expected == 0:
+                update_params['ConditionExpression'] = 'attribute_not_exists(#version)'
+            else:
+                update_params['ConditionExpression'] = '#version = :expected'
+                values[':expected'] = expected
+        update_params['ExpressionAttributeValues'] = values
+
+        try:
+            item = get_table().update_item(**update_params)['Attributes']
+        except Exception as e:
+            if 'ConditionalCheckFailed' not in str(e):
+                raise
+            current = get_table().get_item(Key=settings_key(device_id), ConsistentRead=True).get('Item')
+            cache_settings(device_id, current)
+            current_version = int(current.get('version', 0)) if current else 0
+            response = make_response(409, {'error': 'Settings were changed by another request', 'version': current_version,
+                                           'settings': current.get('settings') if current else None})
+            response['headers'] = {**response['headers'], 'ETag': settings_etag(current_version)}
+            return response
+
+        cache_settings(device_id, item)
+        version = int(item['version'])
+        response = success_response({'success': True, 'settings': settings, 'version': version, 'updatedAt': now})
+        response['headers'] = {**response['headers'], 'ETag': settings_etag(version)}
+        return response
     except Exception as e:
         print(f"Save settings error: {str(e)}")
         return error_response(str(e), 500)
 
 
 def handle_get_settings(body):
-    """사용자 맞춤설정 조회"""
+    """사용자 맞춤설정 조회 (컨테이너 캐시 우선)
+
+    version(또는 etag)이 현재 version과 같으면 본문 없이 304를 반환한다.
+    """
     validation_error = validate_required(body, 'deviceId')
     if validation_error:
         return validation_error
 
     device_id = body.get('deviceId')
-
     try:
-        response = get_table().get_item(Key={'PK': f'DEVICE#{device_id}', 'SK': 'SETTINGS'})
-        item = response.get('Item')
+        known = parse_settings_version(body)
+    except ValueError as e:
+        return error_response(str(e))
 
-        if item:
-            return success_response({'success': True, 'settings': item.get('settings', {}), 'updatedAt': item.get('updatedAt')})
-        return success_response({'success': True, 'settings': None, 'message': 'No settings found for this device'})
+    try:
+        item = load_settings(device_id, known)
+        if not item:
+            return success_response({'success': True, 'settings': None, 'message': 'No settings found for this device'})
+        if known is not None and int(item.get('version', 0)) == known:
+            return {'statusCode': 304, 'headers': {**CORS_HEADERS, 'ETag': settings_etag(known)}, 'body': ''}
+        return settings_response(item)
     except Exception as e:
         print(f"Get settings error: {str(e)}")
         return error_response(str(e), 500)
@@ -431,6 +2631,16 @@ def handle_get_settings(body):
 # 세션 관리 핸들러
 # ============================================
 
+# 세션 목록 희소 인덱스: SESSION_META 아이템에만 GSI2 키를 넣어 메시지를 읽지 않고 목록 조회
+SESSION_LIST_FIELDS = ('sessionId', 'tutorName', 'topic', 'accent', 'level', 'startedAt', 'endedAt',
+                       'duration', 'turnCount', 'wordCount', 'status')
+
+
+def session_index_keys(device_id, started_at, session_id):
+    """세션 목록용 GSI2 키 (기기별 파티션, startedAt 정렬)"""
+    return {'GSI2PK': f'DEVICE#{device_id}', 'GSI2SK': f'{started_at}#{session_id}'}
+
+
 def handle_start_session(body):
     """새 대화 세션 시작"""
     validation_error = validate_required(body, 'deviceId', 'sessionId')
@@ -448,6 +2658,7 @@ def handle_start_session(body):
             'SK': f'SESSION#{now}#{session_id}#META',
             'GSI1PK': f'SESSION#{session_id}',
             'GSI1SK': 'META',
+            **session_index_keys(device_id, now, session_id),
             'type': 'SESSION_META',
             'deviceId': device_id,
             'sessionId': session_id,
@@ -472,8 +2683,77 @@ def handle_start_session(body):
         return error_response(str(e), 500)
 
 
+session_meta_cache = LRUCache(max_items=1000)
+
+
+def find_session_meta(session_id):
+    """세션 META 아이템의 키와 deviceId 조회 (GSI1, 컨테이너 캐시). 없으면 None"""
+    meta = session_meta_cache.get(session_id)
+    if meta:
+        return meta
+
+    response = get_table().query(
+        IndexName='GSI1',
+        KeyConditionExpression='GSI1PK = :pk AND GSI1SK = :sk',
+        ExpressionAttributeValues={':pk': f'SESSION#{session_id}', ':sk': 'META'},
+        ProjectionExpression='PK, SK, deviceId'
+    )
+    items = response.get('Items', [])
+    if not items:
+        return None
+
+    meta = {'PK': items[0]['PK'], 'SK': items[0]['SK'], 'deviceId': items[0].get('deviceId')}
+    session_meta_cache.set(session_id, meta)
+    return meta
+
+
+def is_session_owner(device_id, session_id, items=()):
+    """세션 META의 deviceId로 소유 기기 확인 (items에 META가 없으면 find_session_meta로 조회)
+
+    다른 기기가 같은 sessionId로 메시지를 써도 소유 기기의 접근은 막히지 않는다.
+    META가 없는 세션(start_session 이전 데이터)은 items의 deviceId가 모두 같을 때만 소유로 본다.
+    """
+    meta = next((item for item in items if item.get('type') == 'SESSION_META' or item.get('GSI1SK') == 'META'), None)
+    if meta is None:
+        meta = find_session_meta(session_id)
+    if meta is not None:
+        return meta.get('deviceId') == device_id
+    return all(item.get('deviceId') in (None, device_id) for item in items)
+
+
+def add_session_stats(meta, turns, words):
+    """SESSION_META의 turnCount / wordCount를 원자적 ADD로 증가시키고 새 값 반환
+
+    META가 이미 삭제됐으면(다른 컨테이너의 캐시가 오래된 경우) 아이템을 새로 만들지 않고 None 반환.
+    """
+    try:
+        response = get_table().update_item(
+            Key={'PK': meta['PK'], 'SK': meta['SK']},
+            UpdateExpression='ADD turnCount :turns, wordCount :words',
+            ConditionExpression='attribute_exists(PK)',
+            ExpressionAttributeValues={':turns': turns, ':words': words},
+            ReturnValues='UPDATED_NEW'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        session_meta_cache.delete_where(lambda key, value: value is meta)
+        return None
+    attributes = response.get('Attributes', {})
+    return {'turnCount': int(attributes.get('turnCount', 0)), 'wordCount': int(attributes.get('wordCount', 0))}
+
+
+def count_user_stats(messages):
+    """메시지 목록에서 (사용자 턴 수, 사용자 단어 수) 계산"""
+    user_messages = [m for m in messages if m.get('role', 'user') == 'user']
+    return len(user_messages), sum(len(str(m.get('content', '')).split()) for m in user_messages)
+
+
 def handle_end_session(body):
-    """세션 종료 및 통계 업데이트 (GSI1로 세션 조회)"""
+    """세션 종료 및 통계 업데이트 (GSI1로 세션 조회)
+
+    turnCount / wordCount를 보내지 않으면 save_messages(updateStats)로 서버에서 누적한 값을 유지.
+    """
     validation_error = validate_required(body, 'deviceId', 'sessionId')
     if validation_error:
         return validation_error
@@ -481,41 +2761,72 @@ def handle_end_session(body):
     device_id, session_id = body.get('deviceId'), body.get('sessionId')
 
     try:
-        table = get_table()
         now = get_now()
-
-        response = table.query(
-            IndexName='GSI1',
-            KeyConditionExpression='GSI1PK = :pk AND GSI1SK = :sk',
-            ExpressionAttributeValues={':pk': f'SESSION#{session_id}', ':sk': 'META'}
-        )
-
-        items = response.get('Items', [])
-        if not items:
+        session_meta = find_session_meta(session_id)
+        if not session_meta:
             return error_response('Session not found', 404)
-
-        session_item = items[0]
-        if session_item.get('deviceId') != device_id:
+        if session_meta.get('deviceId') != device_id:
             return error_response('Access denied', 403)
 
-        table.update_item(
-            Key={'PK': session_item['PK'], 'SK': session_item['SK']},
-            UpdateExpression='SET endedAt = :endedAt, #dur = :duration, turnCount = :turnCount, wordCount = :wordCount, #st = :status',
-            ExpressionAttributeNames={'#dur': 'duration', '#st': 'status'},
-            ExpressionAttributeValues={
-                ':endedAt': now,
-                ':duration': body.get('duration', 0),
-                ':turnCount': body.get('turnCount', 0),
-                ':wordCount': body.get('wordCount', 0),
-                ':status': 'completed'
-            }
-        )
+        update_expression = 'SET endedAt = :endedAt, #dur = :duration, #st = :status'
+        values = {':endedAt': now, ':duration': body.get('duration', 0), ':status': 'completed'}
+        for field in ('turnCount', 'wordCount'):
+            if body.get(field) is not None:
+                update_expression += f', {field} = :{field}'
+                values[f':{field}'] = body.get(field)
+
+        try:
+            get_table().update_item(
+                Key={'PK': session_meta['PK'], 'SK': session_meta['SK']},
+                UpdateExpression=update_expression,
+                ConditionExpression='attribute_exists(PK)',  # 삭제된 세션의 META를 되살리지 않음
+                ExpressionAttributeNames={'#dur': 'duration', '#st': 'status'},
+                ExpressionAttributeValues=values
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            session_meta_cache.delete(session_id)
+            return error_response('Session not found', 404)
         return success_response({'success': True, 'endedAt': now})
     except Exception as e:
         print(f"End session error: {str(e)}")
         return error_response(str(e), 500)
 
 
+def new_message_id(now, seq=0):
+    """정렬 가능하고 충돌하지 않는 메시지 ID (시각 + 배치 내 순번 + 난수)"""
+    return f'MSG#{now}#{seq:04d}{uuid.uuid4().hex[:6]}'
+
+
+def build_message_item(device_id, session_id, message, now, message_id):
+    """MESSAGE 아이템 생성"""
+    return {
+        'PK': f'DEVICE#{device_id}',
+        'SK': f'SESSION#{session_id}#{message_id}',
+        'GSI1PK': f'SESSION#{session_id}',
+        'GSI1SK': message_id,
+        'type': 'MESSAGE',
+        'deviceId': device_id,
+        'sessionId': session_id,
+        'role': message.get('role', 'user'),
+        'content': message.get('content', ''),
+        'translation': message.get('translation'),
+        'turnNumber': message.get('turnNumber', 0),
+        'timestamp': now,
+        'createdAt': now,
+        'ttl': get_ttl()
+    }
+
+
+def put_message(device_id, session_id, message):
+    """MESSAGE 아이템 저장 후 message_id 반환"""
+    now = get_now()
+    message_id = new_message_id(now)
+    get_table().put_item(Item=build_message_item(device_id, session_id, message, now, message_id))
+    return message_id
+
+
 def handle_save_message(body):
     """대화 메시지 저장"""
     validation_error = validate_required(body, 'deviceId', 'sessionId', 'message')
@@ -526,181 +2837,347 @@ def handle_save_message(body):
     message = body.get('message', {})
 
     try:
-        now = get_now()
-        message_id = f'MSG#{now}'
-
-        get_table().put_item(Item={
-            'PK': f'DEVICE#{device_id}',
-            'SK': f'SESSION#{session_id}#{message_id}',
-            'GSI1PK': f'SESSION#{session_id}',
-            'GSI1SK': message_id,
-            'type': 'MESSAGE',
-            'deviceId': device_id,
-            'sessionId': session_id,
-            'role': message.get('role', 'user'),
-            'content': message.get('content', ''),
-            'translation': message.get('translation'),
-            'turnNumber': message.get('turnNumber', 0),
-            'timestamp': now,
-            'createdAt': now,
-            'ttl': get_ttl()
-        })
+        message_id = put_message(device_id, session_id, message)
+        if body.get('analyze'):
+            schedule_turn_analysis(device_id, session_id, message_id, message)
         return success_response({'success': True, 'messageId': message_id})
     except Exception as e:
         print(f"Save message error: {str(e)}")
         return error_response(str(e), 500)
 
 
-def handle_get_sessions(body):
-    """사용자의 세션 목록 조회 (날짜순 정렬, 페이지네이션 지원)"""
-    validation_error = validate_required(body, 'deviceId')
+def handle_save_messages(body):
+    """한 세션의 메시지 여러 개를 batch_writer로 일괄 저장
+
+    updateStats=true면 같은 요청에서 SESSION_META의 turnCount(사용자 메시지 수) /
+    wordCount(사용자 단어 수)를 원자적 ADD로 누적한다.
+    """
+    validation_error = validate_required(body, 'deviceId', 'sessionId', 'messages')
     if validation_error:
         return validation_error
 
-    device_id = body.get('deviceId')
-    limit = body.get('limit', 10)
-    last_key = body.get('lastKey')
+    device_id, session_id = body.get('deviceId'), body.get('sessionId')
+    messages = body.get('messages')
+    if not isinstance(messages, list):
+        return error_response('messages must be a list')
+    if len(messages) > MAX_SAVE_BATCH:
+        return error_response(f'messages can contain at most {MAX_SAVE_BATCH} items')
 
     try:
-        table = get_table()
-        sessions = []
-        current_key = last_key
-        max_iterations = 10  # Safety limit to prevent infinite loops
-
-        # Loop until we have enough sessions or no more data
-        for _ in range(max_iterations):
-            query_params = {
-                'KeyConditionExpression': 'PK = :pk AND begins_with(SK, :sk_prefix)',
-                'FilterExpression': '#type = :type_meta',
-                'ExpressionAttributeNames': {'#type': 'type'},
-                'ExpressionAttributeValues': {
-                    ':pk': f'DEVICE#{device_id}',
-                    ':sk_prefix': 'SESSION#',
-                    ':type_meta': 'SESSION_META'
-                },
-                'Limit': 100,  # Fetch more items per query to find SESSION_META items
-                'ScanIndexForward': False
-            }
+        session_meta = None
+        if body.get('updateStats'):
+            session_meta = find_session_meta(session_id)
+            if not session_meta:
+                return error_response('Session not found', 404)
+            if session_meta.get('deviceId') != device_id:
+                return error_response('Access denied', 403)
 
-            if current_key:
-                query_params['ExclusiveStartKey'] = current_key
+        now = get_now()
+        message_ids = [new_message_id(now, seq) for seq in range(len(messages))]
+        with get_table().batch_writer() as batch:
+            for message, message_id in zip(messages, message_ids):
+                batch.put_item(Item=build_message_item(device_id, session_id, message, now, message_id))
+
+        if body.get('analyze'):
+            for message, message_id in zip(messages, message_ids):
+                schedule_turn_analysis(device_id, session_id, message_id, message)
+
+        result = {'success': True, 'messageIds': message_ids, 'savedCount': len(message_ids)}
+        if session_meta:
+            stats = add_session_stats(session_meta, *count_user_stats(messages))
+            if stats is not None:
+                result['stats'] = stats
+        return success_response(result)
+    except Exception as e:
+        print(f"Save messages error: {str(e)}")
+        return error_response(str(e), 500)
 
-            response = table.query(**query_params)
 
-            for item in response.get('Items', []):
-                if item.get('type') == 'SESSION_META':
-                    sessions.append({
-                        'sessionId': item.get('sessionId'),
-                        'tutorName': item.get('tutorName'),
-                        'topic': item.get('topic', 'daily'),
-                        'accent': item.get('accent', 'us'),
-                        'level': item.get('level', 'intermediate'),
-                        'startedAt': item.get('startedAt'),
-                        'endedAt': item.get('endedAt'),
-                        'duration': int(item.get('duration', 0)),
-                        'turnCount': int(item.get('turnCount', 0)),
-                        'wordCount': int(item.get('wordCount', 0)),
-                        'status': item.get('status')
-                    })
-                    if len(sessions) >= limit:
-                        break
-
-            current_key = response.get('LastEvaluatedKey')
-
-            # Stop if we have enough sessions or no more data
-            if len(sessions) >= limit or not current_key:
-                break
+def handle_get_sessions(body):
+    """사용자의 세션 목록 조회 (GSI2 희소 인덱스, 최신순, 페이지네이션 지원)"""
+    validation_error = validate_required(body, 'deviceId')
+    if validation_error:
+        return validation_error
 
-        # Sort by startedAt descending (newest first)
-        sessions.sort(key=lambda x: x.get('startedAt', ''), reverse=True)
-        sessions = sessions[:limit]  # Trim to requested limit
+    device_id = body.get('deviceId')
+    limit = int(body.get('limit', 10))
+    last_key = body.get('lastKey')
 
+    try:
+        query_params = {
+            'IndexName': 'GSI2',
+            'KeyConditionExpression': 'GSI2PK = :pk',
+            'ExpressionAttributeValues': {':pk': f'DEVICE#{device_id}'},
+            'ProjectionExpression': ', '.join(f'#{f}' for f in SESSION_LIST_FIELDS),
+            'ExpressionAttributeNames': {f'#{f}': f for f in SESSION_LIST_FIELDS},
+            'Limit': limit,
+            'ScanIndexForward': False
+        }
+        # 이전(메인 테이블 기준) lastKey는 GSI2에서 쓸 수 없으므로 무시
+        if last_key and 'GSI2SK' in last_key:
+            query_params['ExclusiveStartKey'] = last_key
+
+        response = get_table().query(**query_params)
+
+        sessions = [{
+            'sessionId': item.get('sessionId'),
+            'tutorName': item.get('tutorName'),
+            'topic': item.get('topic', 'daily'),
+            'accent': item.get('accent', 'us'),
+            'level': item.get('level', 'intermediate'),
+            'startedAt': item.get('startedAt'),
+            'endedAt': item.get('endedAt'),
+            'duration': int(item.get('duration', 0)),
+            'turnCount': int(item.get('turnCount', 0)),
+            'wordCount': int(item.get('wordCount', 0)),
+            'status': item.get('status')
+        } for item in response.get('Items', [])]
+
+        current_key = response.get('LastEvaluatedKey')
         return success_response({'sessions': sessions, 'lastKey': current_key, 'hasMore': current_key is not None})
     except Exception as e:
         print(f"Get sessions error: {str(e)}")
         return error_response(str(e), 500)
 
 
+SESSION_DETAIL_FIELDS = ('type', 'deviceId', 'sessionId', 'tutorName', 'startedAt', 'endedAt', 'duration',
+                         'turnCount', 'wordCount', 'status', 'role', 'content', 'translation', 'timestamp', 'turnNumber')
+MAX_DETAIL_PAGE_SIZE = 200
+
+
+def encode_cursor(last_key):
+    """LastEvaluatedKey → 불투명 커서 문자열"""
+    if not last_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_key, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """불투명 커서 → ExclusiveStartKey (형식이 잘못되면 ValueError)"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(key, dict):
+        raise ValueError('Invalid cursor')
+    return key
+
+
+def query_session_items(session_id, page_size=None, cursor=None):
+    """GSI1으로 세션 아이템을 키 순서(META → 메시지 시간순)로 조회
+
+    page_size가 없으면 모든 페이지를 따라가 전부 반환. (items, next_cursor) 반환.
+    """
+    query_params = {
+        'IndexName': 'GSI1',
+        'KeyConditionExpression': 'GSI1PK = :pk AND GSI1SK >= :meta',  # ANALYSIS# 아이템(< META) 제외
+        'ExpressionAttributeValues': {':pk': f'SESSION#{session_id}', ':meta': 'META'},
+        'ProjectionExpression': ', '.join(f'#{f}' for f in SESSION_DETAIL_FIELDS),
+        'ExpressionAttributeNames': {f'#{f}': f for f in SESSION_DETAIL_FIELDS},
+        'ScanIndexForward': True
+    }
+    if page_size:
+        query_params['Limit'] = page_size
+    if cursor:
+        start_key = decode_cursor(cursor)
+        if start_key.get('GSI1PK') != f'SESSION#{session_id}':
+            raise ValueError('Invalid cursor')
+        query_params['ExclusiveStartKey'] = start_key
+
+    table, items = get_table(), []
+    while True:
+        response = table.query(**query_params)
+        items.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key or page_size:
+            return items, encode_cursor(last_key)
+        query_params['ExclusiveStartKey'] = last_key
+
+
+def session_meta_view(item):
+    """SESSION_META 아이템 → 응답용 세션 정보"""
+    return {
+        'sessionId': item.get('sessionId'),
+        'tutorName': item.get('tutorName'),
+        'startedAt': item.get('startedAt'),
+        'endedAt': item.get('endedAt'),
+        'duration': int(item.get('duration', 0)),
+        'turnCount': int(item.get('turnCount', 0)),
+        'wordCount': int(item.get('wordCount', 0)),
+        'status': item.get('status')
+    }
+
+
+def message_view(item):
+    """MESSAGE 아이템 → 응답용 메시지"""
+    return {
+        'role': item.get('role'),
+        'content': item.get('content'),
+        'translation': item.get('translation'),
+        'timestamp': item.get('timestamp'),
+        'turnNumber': int(item.get('turnNumber', 0))
+    }
+
+
 def handle_get_session_detail(body):
-    """특정 세션의 상세 정보 조회"""
+    """특정 세션의 상세 정보 조회
+
+    pageSize를 주면 cursor 기반 페이지 단위로 반환 (nextCursor가 null이면 마지막 페이지).
+    메시지는 저장 순서(GSI1SK = 시간순 = 턴 순서)로 반환되며, sortByTurn=true면 turnNumber로 정렬.
+    sortByTurn은 페이지 하나만 정렬할 수 있어 pageSize와 함께 쓰면 400.
+    """
     validation_error = validate_required(body, 'deviceId', 'sessionId')
     if validation_error:
         return validation_error
 
-    session_id = body.get('sessionId')
+    device_id, session_id = body.get('deviceId'), body.get('sessionId')
+    page_size = body.get('pageSize')
+    if page_size is not None:
+        try:
+            page_size = max(1, min(int(page_size), MAX_DETAIL_PAGE_SIZE))
+        except (TypeError, ValueError):
+            return error_response('pageSize must be an integer')
+        if body.get('sortByTurn'):
+            return error_response('sortByTurn cannot be combined with pageSize')
 
     try:
-        response = get_table().query(
-            IndexName='GSI1',
-            KeyConditionExpression='GSI1PK = :pk',
-            ExpressionAttributeValues={':pk': f'SESSION#{session_id}'},
-            ScanIndexForward=True
-        )
+        try:
+            items, next_cursor = query_session_items(session_id, page_size, body.get('cursor'))
+        except ValueError as e:
+            return error_response(str(e))
+
+        if not is_session_owner(device_id, session_id, items):
+            return error_response('Access denied', 403)
 
         session_meta, messages = None, []
-        for item in response.get('Items', []):
+        for item in items:
             if item.get('type') == 'SESSION_META':
-                session_meta = {
-                    'sessionId': item.get('sessionId'),
-                    'tutorName': item.get('tutorName'),
-                    'startedAt': item.get('startedAt'),
-                    'endedAt': item.get('endedAt'),
-                    'duration': int(item.get('duration', 0)),
-                    'turnCount': int(item.get('turnCount', 0)),
-                    'wordCount': int(item.get('wordCount', 0)),
-                    'status': item.get('status')
-                }
+                session_meta = session_meta_view(item)
             elif item.get('type') == 'MESSAGE':
-                messages.append({
-                    'role': item.get('role'),
-                    'content': item.get('content'),
-                    'translation': item.get('translation'),
-                    'timestamp': item.get('timestamp'),
-                    'turnNumber': int(item.get('turnNumber', 0))
-                })
+                messages.append(message_view(item))
+
+        if body.get('sortByTurn'):
+            messages.sort(key=lambda x: x.get('turnNumber', 0))
 
-        messages.sort(key=lambda x: x.get('turnNumber', 0))
-        return success_response({'session': session_meta, 'messages': messages})
+        result = {'session': session_meta, 'messages': messages}
+        if page_size:
+            result.update({'nextCursor': next_cursor, 'hasMore': next_cursor is not None})
+        return success_response(result)
     except Exception as e:
         print(f"Get session detail error: {str(e)}")
         return error_response(str(e), 500)
 
 
+def batch_delete_keys(keys):
+    """키 최대 25개를 BatchWriteItem으로 삭제. UnprocessedItems는 지수 백오프(지터)로 재시도"""
+    client = get_client('dynamodb').meta.client
+    requests = [{'DeleteRequest': {'Key': key}} for key in keys]
+    delay = 0.05
+
+    for _ in range(DELETE_MAX_RETRIES + 1):
+        response = client.batch_write_item(RequestItems={DYNAMODB_TABLE: requests})
+        requests = response.get('UnprocessedItems', {}).get(DYNAMODB_TABLE, [])
+        if not requests:
+            return len(keys)
+        time.sleep(delay * (0.5 + random.random()))
+        delay = min(delay * 2, 1.0)
+
+    raise Exception(f'{len(requests)} items left unprocessed after {DELETE_MAX_RETRIES} retries')
+
+
+def delete_query_results(query_params, owner_pk=None, deadline=None):
+    """쿼리 결과를 모든 페이지에 걸쳐 병렬 삭제
+
+    페이지를 읽는 동안 이전 페이지 삭제가 워커에서 진행된다. owner_pk가 있으면 PK가 다른 아이템은
+    건너뛴다. deadline(monotonic)을 넘기면 남은 페이지는 두고 멈춘다.
+    (deleted, skipped, finished) 반환. 삭제된 아이템은 다시 조회되지 않으므로 재호출하면 이어서 진행.
+    """
+    table = get_table()
+    query_params = {**query_params, 'ProjectionExpression': 'PK, SK'}
+    futures, skipped, finished = [], 0, False
+
+    with ContextThreadPoolExecutor(max_workers=DELETE_WORKERS) as executor:
+        while True:
+            response = table.query(**query_params)
+            keys = []
+            for item in response.get('Items', []):
+                if owner_pk and item['PK'] != owner_pk:
+                    skipped += 1
+                    continue
+                keys.append({'PK': item['PK'], 'SK': item['SK']})
+            for i in range(0, len(keys), DELETE_BATCH_SIZE):
+                futures.append(executor.submit(batch_delete_keys, keys[i:i + DELETE_BATCH_SIZE]))
+
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                finished = True
+                break
+            if deadline and time.monotonic() >= deadline:
+                break
+            query_params['ExclusiveStartKey'] = last_key
+
+        deleted = sum(future.result() for future in futures)
+    return deleted, skipped, finished
+
+
 def handle_delete_session(body):
-    """세션 삭제 (GSI1으로 조회 + deviceId 검증)"""
+    """세션 삭제 (GSI1 전체 페이지 조회 + 병렬 삭제, 요청 기기의 아이템만 삭제)"""
     validation_error = validate_required(body, 'deviceId', 'sessionId')
     if validation_error:
         return validation_error
 
     device_id, session_id = body.get('deviceId'), body.get('sessionId')
+    session_meta_cache.delete(session_id)
 
     try:
-        table = get_table()
+        # GSI1으로 해당 세션의 모든 아이템 조회 (META + MESSAGEs), PK로 소유 기기 검증
+        deleted, skipped, _ = delete_query_results({
+            'IndexName': 'GSI1',
+            'KeyConditionExpression': 'GSI1PK = :pk',
+            'ExpressionAttributeValues': {':pk': f'SESSION#{session_id}'}
+        }, owner_pk=f'DEVICE#{device_id}')
+
+        if not deleted:
+            # 다른 사용자 세션 삭제 방지
+            return error_response('Access denied', 403) if skipped else error_response('Session not found', 404)
+
+        return success_response({'success': True, 'deletedCount': deleted})
+    except Exception as e:
+        print(f"Delete session error: {str(e)}")
+        return error_response(str(e), 500)
 
-        # GSI1으로 해당 세션의 모든 아이템 조회 (META + MESSAGEs)
-        response = table.query(
-            IndexName='GSI1',
-            KeyConditionExpression='GSI1PK = :pk',
-            ExpressionAttributeValues={':pk': f'SESSION#{session_id}'}
-        )
 
-        items = response.get('Items', [])
-        if not items:
-            return error_response('Session not found', 404)
+def handle_delete_device_data(body):
+    """기기의 모든 데이터(SESSION / MESSAGE / SETTINGS 등) 삭제
 
-        # deviceId 검증 (다른 사용자 세션 삭제 방지)
-        meta_item = next((item for item in items if item.get('type') == 'SESSION_META'), None)
-        if meta_item and meta_item.get('deviceId') != device_id:
-            return error_response('Access denied', 403)
+    maxSeconds(기본/최대 DEVICE_DELETE_MAX_SECONDS) 안에서 가능한 만큼 지우고 진행 상황을 반환.
+    done이 false면 같은 요청을 다시 보내 이어서 삭제한다.
+    """
+    validation_error = validate_required(body, 'deviceId')
+    if validation_error:
+        return validation_error
 
-        # 모든 관련 아이템 삭제
-        with table.batch_writer() as batch:
-            for item in items:
-                batch.delete_item(Key={'PK': item['PK'], 'SK': item['SK']})
+    device_id = body.get('deviceId')
+    settings_cache.delete(device_id)
+    session_meta_cache.delete_where(lambda session_id, meta: meta.get('deviceId') == device_id)
+    max_seconds = min(float(body.get('maxSeconds', DEVICE_DELETE_MAX_SECONDS)), DEVICE_DELETE_MAX_SECONDS)
+    started = time.monotonic()
+
+    try:
+        deleted, _, finished = delete_query_results({
+            'KeyConditionExpression': 'PK = :pk',
+            'ExpressionAttributeValues': {':pk': f'DEVICE#{device_id}'}
+        }, deadline=started + max_seconds)
 
-        return success_response({'success': True, 'deletedCount': len(items)})
+        print(f"Delete device data: device={device_id} deleted={deleted} done={finished}")
+        return success_response({
+            'success': True,
+            'deletedCount': deleted,
+            'done': finished,
+            'elapsedMs': round((time.monotonic() - started) * 1000)
+        })
     except Exception as e:
-        print(f"Delete session error: {str(e)}")
+        print(f"Delete device data error: {str(e)}")
         return error_response(str(e), 500)
 
 
@@ -708,107 +3185,55 @@ def handle_delete_session(body):
 # Transcribe Streaming 핸들러
 # ============================================
 
+def get_transcribe_presigner():
+    """Transcribe Streaming용 SigV4 서명기 (컨테이너 재사용: 자격증명 / 서명 키 캐시)"""
+    global _transcribe_presigner
+    if _transcribe_presigner is None:
+        with _clients_lock:
+            if _transcribe_presigner is None:
+                credentials = sigv4.CredentialCache(lambda: get_boto_session().get_credentials())
+                _transcribe_presigner = sigv4.Presigner(credentials, AWS_REGION)
+    return _transcribe_presigner
+
+
 def handle_get_transcribe_url(body):
-    """AWS Transcribe Streaming용 Presigned WebSocket URL 생성"""
+    """AWS Transcribe Streaming용 Presigned WebSocket URL 생성
+
+    count > 1이면 재연결용 URL을 한 번에 여러 개 발급 (각각 다른 session-id, 같은 만료 시각).
+    """
     language = body.get('language', 'en-US')
     sample_rate = body.get('sampleRate', 16000)
 
     try:
-        # AWS 자격증명 가져오기 (Lambda 환경에서 자동 제공)
-        session = boto3.Session()
-        credentials = session.get_credentials()
-        access_key = credentials.access_key
-        secret_key = credentials.secret_key
-        session_token = credentials.token  # Lambda는 임시 자격증명 사용
-
-        region = 'us-east-1'
-        service = 'transcribe'
-        host = f'transcribestreaming.{region}.amazonaws.com'
-        endpoint = f'{host}:8443'
-
-        # 현재 시간 (UTC)
-        t = datetime.utcnow()
-        amz_date = t.strftime('%Y%m%dT%H%M%SZ')
-        date_stamp = t.strftime('%Y%m%d')
-
-        # Credential scope
-        credential_scope = f'{date_stamp}/{region}/{service}/aws4_request'
-        algorithm = 'AWS4-HMAC-SHA256'
-
-        # 모든 쿼리 파라미터 (알파벳 순서 - X-Amz-* 포함)
-        # Presigned URL에서는 서명 파라미터도 canonical querystring에 포함
-        all_params = {
-            'X-Amz-Algorithm': algorithm,
-            'X-Amz-Credential': f'{access_key}/{credential_scope}',
-            'X-Amz-Date': amz_date,
-            'X-Amz-Expires': '300',
-            'X-Amz-SignedHeaders': 'host',
-            'language-code': language,
-            'media-encoding': 'pcm',
-            'sample-rate': str(sample_rate),
-        }
-
-        # Security Token 추가 (Lambda 임시 자격증명)
-        if session_token:
-            all_params['X-Amz-Security-Token'] = session_token
-
-        # Canonical Query String (알파벳 순서, 서명 제외)
-        canonical_querystring = '&'.join([
-            f'{quote(k, safe="")}={quote(str(v), safe="")}'
-            for k, v in sorted(all_params.items())
-        ])
-
-        # Canonical Headers
-        canonical_headers = f'host:{endpoint}\n'
-        signed_headers = 'host'
-
-        # Payload Hash (빈 문자열의 SHA256)
-        payload_hash = hashlib.sha256(b'').hexdigest()
-
-        # Canonical Request
-        canonical_request = '\n'.join([
-            'GET',
-            '/stream-transcription-websocket',
-            canonical_querystring,
-            canonical_headers,
-            signed_headers,
-            payload_hash
-        ])
-
-        # String to Sign
-        string_to_sign = '\n'.join([
-            algorithm,
-            amz_date,
-            credential_scope,
-            hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
-        ])
-
-        # Signing Key 생성
-        def sign(key, msg):
-            return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
-
-        k_date = sign(('AWS4' + secret_key).encode('utf-8'), date_stamp)
-        k_region = sign(k_date, region)
-        k_service = sign(k_region, service)
-        k_signing = sign(k_service, 'aws4_request')
-
-        # Signature 계산
-        signature = hmac.new(k_signing, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
-
-        # 최종 URL 생성 (서명 추가)
-        signed_url = (
-            f'wss://{endpoint}/stream-transcription-websocket'
-            f'?{canonical_querystring}'
-            f'&X-Amz-Signature={signature}'
-        )
-
-        return success_response({
-            'url': signed_url,
-            'region': region,
+        count = min(max(int(body.get('count', 1)), 1), TRANSCRIBE_MAX_URLS)
+        presigner = get_transcribe_presigner()
+
+        def stream_params(index):
+            params = {
+                'language-code': language,
+                'media-encoding': 'pcm',
+                'sample-rate': str(sample_rate),
+            }
+            if count > 1:
+                params['session-id'] = str(uuid.uuid4())
+            return params
+
+        with span('transcribe.presign'):
+            urls = presigner.presign_many(
+                count, 'transcribe', TRANSCRIBE_STREAMING_ENDPOINT, '/stream-transcription-websocket',
+                stream_params, expires=TRANSCRIBE_URL_EXPIRES, scheme='wss'
+            )
+
+        response = {
+            'url': urls[0],
+            'region': AWS_REGION,
             'language': language,
             'sampleRate': sample_rate,
-            'expiresIn': 300
-        })
+            'expiresIn': TRANSCRIBE_URL_EXPIRES
+        }
+        if count > 1:
+            response['urls'] = urls
+        return success_response(response)
 
     except Exception as e:
         print(f"Get transcribe URL error: {str(e)}")
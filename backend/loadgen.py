@@ -0,0 +1,243 @@
+"""
+로컬 서버(local_server.py) / 배포된 API 부하 생성기
+
+가상 사용자 N명이 각자 keep-alive 연결 하나로 실제 통화 흐름을 반복한다:
+    start_session → 첫 인사(chat) → 턴 × K (chat + tts + save_message, 또는 turn 한 번) → end_session → analyze
+액션별 처리량 / p50·p95·p99 / 오류 수와 완료한 통화 수를 출력한다.
+
+사용법:
+    python local_server.py --workers 32 &
+    python loadgen.py --users 50 --duration 60
+    python loadgen.py --users 20 --flow turn --turns 8 --think-ms 800
+    python loadgen.py --serve --users 100 --latency-scale 0.2   # 서버를 같은 프로세스에서 띄움
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark import USER_LINES, percentile  # noqa: E402
+
+SETTINGS = [
+    {'accent': 'us', 'gender': 'female', 'level': 'intermediate', 'topic': 'business'},
+    {'accent': 'uk', 'gender': 'male', 'level': 'beginner', 'topic': 'daily'},
+    {'accent': 'au', 'gender': 'female', 'level': 'advanced', 'topic': 'travel'},
+]
+
+
+class HTTPConnection:
+    """asyncio keep-alive HTTP/1.1 클라이언트 연결 (POST JSON 전용, 끊기면 다시 연결)"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80)
+        self.ssl = parts.scheme == 'https'
+        self.path = parts.path or '/'
+        self.reader = self.writer = None
+
+    async def request(self, payload):
+        """payload를 POST하고 (상태 코드, 본문 bytes) 반환"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+        body = json.dumps(payload).encode('utf-8')
+        head = (f'POST {self.path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n')
+        try:
+            self.writer.write(head.encode('latin-1') + body)
+            await self.writer.drain()
+
+            status_line = await self.reader.readline()
+            if not status_line:
+                raise ConnectionError('Connection closed by server')
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await self.reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            data = await self.reader.readexactly(int(headers.get('content-length') or 0))
+            if headers.get('connection', '').lower() == 'close':
+                await self.close()
+            return status, data
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            raise
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+class Recorder:
+    """액션별 지연시간(ms)과 오류 수"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.calls_completed = 0
+        self.calls_failed = 0
+
+    async def call(self, connection, payload):
+        """요청 하나를 보내고 기록. 성공하면 JSON 본문(dict), 실패하면 None"""
+        action = payload['action']
+        started = time.perf_counter()
+        try:
+            status, data = await connection.request(payload)
+        except Exception:
+            status, data = 599, b''
+        self.latencies[action].append((time.perf_counter() - started) * 1000)
+        if status >= 400:
+            self.errors[action] += 1
+            return None
+        return json.loads(data) if data else {}
+
+    def report(self, elapsed):
+        rows = []
+        for action, samples in sorted(self.latencies.items()):
+            rows.append({
+                'action': action,
+                'requests': len(samples),
+                'errors': self.errors[action],
+                'throughput': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+                'p50': round(percentile(samples, 50), 2),
+                'p95': round(percentile(samples, 95), 2),
+                'p99': round(percentile(samples, 99), 2),
+            })
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {'elapsedSeconds': round(elapsed, 1), 'requests': total,
+                'throughput': round(total / elapsed, 1) if elapsed else 0.0,
+                'callsCompleted': self.calls_completed, 'callsFailed': self.calls_failed, 'actions': rows}
+
+
+async def think(think_ms):
+    if think_ms:
+        await asyncio.sleep(think_ms * random.uniform(0.5, 1.5) / 1000)
+
+
+async def run_call(connection, recorder, device_id, flow, turns, think_ms):
+    """가상 사용자의 통화 한 번. 필수 단계(start_session / 첫 chat)가 실패하면 False"""
+    session_id = f'load-{uuid.uuid4().hex[:12]}'
+    settings = random.choice(SETTINGS)
+    base = {'deviceId': device_id, 'sessionId': session_id}
+
+    if await recorder.call(connection, {'action': 'start_session', **base, 'settings': settings}) is None:
+        return False
+    greeting = await recorder.call(connection, {'action': 'chat', 'messages': [], 'settings': settings})
+    if greeting is None:
+        return False
+    await recorder.call(connection, {'action': 'tts', 'text': greeting.get('message', ''), 'settings': settings})
+
+    for turn in range(1, turns + 1):
+        await think(think_ms)
+        user_line = random.choice(USER_LINES)
+        use_turn = flow == 'turn' or (flow == 'mixed' and random.random() < 0.5)
+        if use_turn:
+            await recorder.call(connection, {'action': 'turn', **base, 'message': user_line, 'settings': settings,
+                                             'turnNumber': turn, 'analyze': True, 'delivery': 'url'})
+        else:
+            await recorder.call(connection, {'action': 'save_message', **base, 'analyze': True,
+                                             'message': {'role': 'user', 'content': user_line, 'turnNumber': turn}})
+            reply = await recorder.call(connection, {'action': 'chat', **base, 'message': user_line, 'settings': settings})
+            text = (reply or {}).get('message', '')
+            if text:
+                await recorder.call(connection, {'action': 'tts', 'text': text, 'settings': settings, 'delivery': 'url'})
+                await recorder.call(connection, {'action': 'save_message', **base,
+                                                 'message': {'role': 'assistant', 'content': text, 'turnNumber': turn}})
+
+    await recorder.call(connection, {'action': 'end_session', **base, 'duration': turns * 20})
+    await recorder.call(connection, {'action': 'analyze', **base})
+    return True
+
+
+async def virtual_user(index, args, recorder, stop_at):
+    await asyncio.sleep(args.ramp_up * index / max(args.users, 1))
+    connection = HTTPConnection(args.url)
+    device_id = f'load-device-{index:04d}-{uuid.uuid4().hex[:6]}'
+    calls = 0
+    try:
+        while time.monotonic() < stop_at and (not args.calls or calls < args.calls):
+            ok = await run_call(connection, recorder, device_id, args.flow, args.turns, args.think_ms)
+            if ok:
+                recorder.calls_completed += 1
+            else:
+                recorder.calls_failed += 1
+            calls += 1
+    finally:
+        await connection.close()
+
+
+async def run(args):
+    server = None
+    if args.serve:
+        import local_server
+        lf, _ = local_server.load_lambda(args.latency_scale, args.seed)
+        local = local_server.LocalServer(lf, args.workers)
+        server = await local.start('127.0.0.1', 0)
+        args.url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/prod/chat"
+
+    recorder = Recorder()
+    started = time.monotonic()
+    stop_at = started + args.duration if args.duration else float('inf')
+    try:
+        await asyncio.gather(*(virtual_user(i, args, recorder, stop_at) for i in range(args.users)))
+    finally:
+        if server is not None:
+            server.close()
+    return recorder.report(time.monotonic() - started)
+
+
+def print_report(report):
+    header = f"{'action':<16} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for r in report['actions']:
+        print(f"{r['action']:<16} {r['requests']:>7} {r['errors']:>5} {r['throughput']:>8.1f} "
+              f"{r['p50']:>9.2f} {r['p95']:>9.2f} {r['p99']:>9.2f}")
+    print(f"\n{report['requests']} requests in {report['elapsedSeconds']} s ({report['throughput']} req/s), "
+          f"calls completed {report['callsCompleted']}, failed {report['callsFailed']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load generator simulating concurrent practice calls')
+    parser.add_argument('--url', default='http://127.0.0.1:8787/prod/chat')
+    parser.add_argument('--users', type=int, default=10, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run (0 = until --calls done)')
+    parser.add_argument('--calls', type=int, default=0, help='calls per user (0 = unlimited within --duration)')
+    parser.add_argument('--turns', type=int, default=5, help='user turns per call')
+    parser.add_argument('--flow', choices=['classic', 'turn', 'mixed'], default='mixed',
+                        help='classic = chat + tts + save_message per turn, turn = single turn action')
+    parser.add_argument('--think-ms', type=float, default=0, help='mean pause between turns')
+    parser.add_argument('--ramp-up', type=float, default=0, help='seconds over which users start')
+    parser.add_argument('--serve', action='store_true', help='start local_server in this process')
+    parser.add_argument('--workers', type=int, default=16, help='worker threads for --serve')
+    parser.add_argument('--latency-scale', type=float, default=1.0, help='AWS latency multiplier for --serve')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--json', metavar='PATH', help='write results as JSON')
+    args = parser.parse_args(argv)
+    if not args.duration and not args.calls:
+        parser.error('--duration 0 needs --calls')
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'users': args.users, 'flow': args.flow, 'turns': args.turns, **report}, f, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+lambda_handler 로컬 개발 서버
+
+API Gateway(REST, 프록시 통합) 이벤트 형식으로 HTTP 요청을 바꿔 lambda_handler를 호출하는 asyncio 서버.
+AWS 서비스는 fake_aws 대역을 쓰므로 배포 없이 앱/부하 생성기(loadgen.py)를 붙여 볼 수 있다.
+
+- 연결 처리는 이벤트 루프 하나, lambda_handler 실행은 워커 스레드 풀 (--workers = 동시 실행 수)
+- 모든 워커가 한 모듈(= 웜 컨테이너 하나)의 캐시와 락을 공유하므로 락 경합이 그대로 드러난다
+- 응답마다 X-Queue-Ms(워커를 기다린 시간) 헤더, GET /__stats로 액션별 지연시간과 대기열 통계
+
+사용법:
+    python local_server.py                              # 127.0.0.1:8787, 기본 지연시간
+    python local_server.py --workers 32 --latency-scale 0.5
+    python local_server.py --port 9000 --emf            # EMF 메트릭 로그도 출력
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark import percentile  # noqa: E402
+from fake_aws import FakeAWS  # noqa: E402
+
+MAX_BODY_BYTES = 6 * 1024 * 1024  # Lambda 동기 호출 페이로드 제한
+STATS_WINDOW = 10000
+STATS_PATH = '/__stats'
+
+
+class ServerStats:
+    """액션별 핸들러 지연시간 / 워커 대기시간 / 동시 처리 수 (스레드 안전)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.handler_ms = defaultdict(lambda: deque(maxlen=STATS_WINDOW))
+        self.queue_ms = deque(maxlen=STATS_WINDOW)
+
+    def begin(self):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def end(self, action, status_code, queue_ms, handler_ms):
+        with self.lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.errors += status_code >= 500
+            self.queue_ms.append(queue_ms)
+            self.handler_ms[action].append(handler_ms)
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            actions = {action: list(samples) for action, samples in self.handler_ms.items()}
+            queue = list(self.queue_ms)
+            result = {'requests': self.requests, 'errors': self.errors, 'inFlight': self.in_flight,
+                      'maxInFlight': self.max_in_flight, 'uptimeSeconds': round(elapsed, 1),
+                      'throughput': round(self.requests / elapsed, 1) if elapsed else 0.0}
+        result['queueMs'] = {'p50': round(percentile(queue, 50), 2), 'p99': round(percentile(queue, 99), 2)}
+        result['actions'] = {action: {'count': len(samples), 'p50': round(percentile(samples, 50), 2),
+                                      'p95': round(percentile(samples, 95), 2), 'p99': round(percentile(samples, 99), 2)}
+                             for action, samples in sorted(actions.items())}
+        return result
+
+
+def build_event(method, path, headers, body):
+    """HTTP 요청 → API Gateway 프록시 이벤트 (바이너리 미디어 타입 */* 설정처럼 본문은 항상 base64)"""
+    is_binary = bool(body)
+    return {
+        'httpMethod': method,
+        'path': path.split('?', 1)[0],
+        'headers': headers,
+        'queryStringParameters': None,
+        'body': base64.b64encode(body).decode('ascii') if is_binary else body.decode('utf-8'),
+        'isBase64Encoded': is_binary,
+        'requestContext': {'stage': 'local', 'httpMethod': method, 'requestTimeEpoch': int(time.time() * 1000)},
+    }
+
+
+def event_action(event):
+    """통계용 액션 이름 (lambda_handler와 같은 기본값)"""
+    if event['httpMethod'] == 'OPTIONS':
+        return 'OPTIONS'
+    body = event['body'] or '{}'
+    try:
+        if event['isBase64Encoded']:
+            body = base64.b64decode(body)
+        return json.loads(body).get('action', 'chat')
+    except (ValueError, AttributeError):
+        return 'invalid'
+
+
+class LocalServer:
+    """asyncio HTTP/1.1 서버 (keep-alive, Content-Length 본문만 지원)"""
+
+    def __init__(self, lf, workers=16):
+        self.lf = lf
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='lambda')
+        self.stats = ServerStats()
+
+    def invoke(self, event, enqueued):
+        """워커 스레드에서 lambda_handler 실행. (응답, 대기 ms, 핸들러 ms) 반환"""
+        started = time.perf_counter()
+        try:
+            response = self.lf.lambda_handler(event, None)
+        except Exception as e:  # lambda_handler 밖으로 나온 예외 = Lambda 런타임 오류
+            response = {'statusCode': 502, 'headers': {'Content-Type': 'application/json'},
+                        'body': json.dumps({'message': f'Internal server error: {e}'})}
+        return response, (started - enqueued) * 1000, (time.perf_counter() - started) * 1000
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.write_response(writer, 400, {}, b'Bad request line', keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version != 'HTTP/1.0'
+                if 'chunked' in headers.get('transfer-encoding', '').lower():
+                    await self.write_response(writer, 411, {}, b'Content-Length required', keep_alive=False)
+                    break
+                length = int(headers.get('content-length') or 0)
+                if length > MAX_BODY_BYTES:
+                    await self.write_response(writer, 413, {}, b'Request too large', keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                if method == 'GET' and path == STATS_PATH:
+                    payload = json.dumps(self.stats.snapshot(), indent=2).encode('utf-8')
+                    await self.write_response(writer, 200, {'Content-Type': 'application/json'}, payload, keep_alive)
+                else:
+                    await self.dispatch(writer, method, path, headers, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, writer, method, path, headers, body, keep_alive):
+        event = build_event(method, path, headers, body)
+        action = event_action(event)
+        self.stats.begin()
+        response, queue_ms, handler_ms = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.invoke, event, time.perf_counter())
+        status_code = response.get('statusCode', 200)
+        self.stats.end(action, status_code, queue_ms, handler_ms)
+
+        payload = response.get('body') or ''
+        payload = base64.b64decode(payload) if response.get('isBase64Encoded') else payload.encode('utf-8')
+        response_headers = {'Content-Type': 'application/json', **(response.get('headers') or {}),
+                            'X-Queue-Ms': f'{queue_ms:.1f}'}
+        await self.write_response(writer, status_code, response_headers, payload, keep_alive)
+
+    async def write_response(self, writer, status_code, headers, payload, keep_alive):
+        try:
+            reason = HTTPStatus(status_code).phrase
+        except ValueError:
+            reason = ''
+        lines = [f'HTTP/1.1 {status_code} {reason}']
+        lines += [f'{name}: {value}' for name, value in headers.items() if name.lower() not in ('content-length', 'connection')]
+        lines += [f'Content-Length: {len(payload)}', f"Connection: {'keep-alive' if keep_alive else 'close'}", '', '']
+        writer.write('\r\n'.join(lines).encode('latin-1') + payload)
+        await writer.drain()
+
+    async def start(self, host, port):
+        return await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+
+
+def load_lambda(latency_scale=1.0, seed=None, emf=False):
+    """대역 AWS를 설치한 lambda_function 모듈 반환 (analyze_async 워커는 프로세스 내 실행기)"""
+    import lambda_function
+    aws = FakeAWS(scale=latency_scale, seed=seed).install(lambda_function)
+    aws.lambda_client.handler = lambda_function.lambda_handler
+    if not emf:
+        lambda_function.emit_metrics = lambda *args, **kwargs: None
+    return lambda_function, aws
+
+
+async def serve(args):
+    lf, _ = load_lambda(args.latency_scale, args.seed, args.emf)
+    server = LocalServer(lf, args.workers)
+    tcp_server = await server.start(args.host, args.port)
+    print(f'Serving lambda_handler on http://{args.host}:{args.port} '
+          f'({args.workers} workers, latency scale {args.latency_scale}); stats at {STATS_PATH}')
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local HTTP server for lambda_function.lambda_handler')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--workers', type=int, default=16, help='concurrent lambda_handler executions (threads)')
+    parser.add_argument('--latency-scale', type=float, default=1.0, help='multiplier for injected AWS latencies (0 = none)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--emf', action='store_true', help='print EMF metric lines for every request')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+세션 목록 인덱스(GSI2) 백필 스크립트
+
+GSI2 도입 전에 만들어진 SESSION_META 아이템에 GSI2PK / GSI2SK를 채워 넣는다.
+이미 키가 있는 아이템은 건너뛰므로 여러 번 실행해도 안전하다.
+
+사용법:
+    python migrate_session_index.py --dry-run     # 대상 개수만 확인
+    python migrate_session_index.py               # 백필 실행
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lambda_function import get_table, session_index_keys  # noqa: E402
+
+
+def find_unindexed_sessions(table, page_size=500):
+    """GSI2 키가 없는 SESSION_META 아이템을 페이지 단위로 yield"""
+    scan_params = {
+        'FilterExpression': '#type = :meta AND attribute_not_exists(GSI2PK)',
+        'ExpressionAttributeNames': {'#type': 'type'},
+        'ExpressionAttributeValues': {':meta': 'SESSION_META'},
+        'ProjectionExpression': 'PK, SK, deviceId, sessionId, startedAt',
+        'Limit': page_size,
+    }
+    while True:
+        response = table.scan(**scan_params)
+        yield response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def backfill_item(table, item):
+    """아이템 하나에 GSI2 키 설정 (동시에 다른 곳에서 채웠으면 건너뜀)"""
+    keys = session_index_keys(item['deviceId'], item['startedAt'], item['sessionId'])
+    try:
+        table.update_item(
+            Key={'PK': item['PK'], 'SK': item['SK']},
+            UpdateExpression='SET GSI2PK = :pk, GSI2SK = :sk',
+            ConditionExpression='attribute_exists(PK) AND attribute_not_exists(GSI2PK)',
+            ExpressionAttributeValues={':pk': keys['GSI2PK'], ':sk': keys['GSI2SK']}
+        )
+        return True
+    except Exception as e:
+        if 'ConditionalCheckFailed' in str(e):
+            return False
+        raise
+
+
+def migrate(table=None, dry_run=False, workers=8, page_size=500):
+    """백필 실행 후 (대상 수, 갱신 수) 반환"""
+    table = table or get_table()
+    found = updated = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for page in find_unindexed_sessions(table, page_size):
+            items = [item for item in page if item.get('deviceId') and item.get('sessionId') and item.get('startedAt')]
+            found += len(items)
+            if not dry_run and items:
+                updated += sum(executor.map(lambda item: backfill_item(table, item), items))
+            if items:
+                print(f"page: {len(items)} sessions without index (total found={found}, updated={updated})")
+    return found, updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backfill GSI2 session-list keys on existing SESSION_META items')
+    parser.add_argument('--dry-run', action='store_true', help='count items without updating')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--page-size', type=int, default=500)
+    args = parser.parse_args(argv)
+
+    found, updated = migrate(dry_run=args.dry_run, workers=args.workers, page_size=args.page_size)
+    print(f"Done. sessions without index: {found}, updated: {updated}{' (dry run)' if args.dry_run else ''}")
+
+
+if __name__ == '__main__':
+    main()
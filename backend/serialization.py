@@ -0,0 +1,131 @@
+"""
+API 응답 JSON 직렬화 / 압축
+
+make_response가 쓰는 직렬화 계층.
+- DynamoDB 값 변환: Decimal → int/float, set → list (boto3가 숫자를 Decimal로 돌려줌)
+- orjson이 설치되어 있으면 사용하고, 없거나 처리할 수 없는 값이면 표준 json으로 대체
+- Fragment: 이미 직렬화된 JSON 문자열(저장된 분석 결과 등)을 다시 파싱하지 않고 그대로 끼워 넣음
+- Accept-Encoding 협상 후 gzip / br 압축 (br은 brotli 모듈이 있을 때만)
+"""
+
+import gzip
+import json
+import re
+import uuid
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # 선택 의존성: 없으면 표준 json
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # 선택 의존성: 없으면 gzip만
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+class Fragment:
+    """이미 직렬화된 JSON 텍스트. dumps 결과에 그대로 삽입된다 (유효한 JSON이어야 함)"""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text.decode('utf-8') if isinstance(text, bytes) else text
+
+    def __repr__(self):
+        return f'Fragment({self.text[:40]!r})'
+
+
+def convert_value(obj):
+    """json이 모르는 DynamoDB 값 변환 (Fragment 외). 처리할 수 없으면 TypeError"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        try:
+            return sorted(obj)
+        except TypeError:
+            return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dumps(obj):
+    """obj를 compact JSON 문자열로 직렬화 (비ASCII 문자는 UTF-8 그대로)
+
+    Fragment는 고유한 자리표시 문자열로 직렬화한 뒤 원래 텍스트로 바꿔 넣는다.
+    """
+    fragments = []
+    token = None
+
+    def default(value):
+        nonlocal token
+        if isinstance(value, Fragment):
+            if token is None:
+                token = uuid.uuid4().hex
+            fragments.append(value.text)
+            return f'\x00{token}:{len(fragments) - 1}\x00'
+        return convert_value(value)
+
+    text = None
+    if orjson is not None:
+        try:
+            text = orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:  # 64비트를 넘는 정수 등 → 표준 json으로 다시
+            fragments.clear()
+    if text is None:
+        text = json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':'))
+
+    if fragments:
+        pattern = re.compile(r'"\\u0000' + token + r':(\d+)\\u0000"')
+        text = pattern.sub(lambda match: fragments[int(match.group(1))], text)
+    return text
+
+
+def parse_accept_encoding(header):
+    """Accept-Encoding 헤더 → {코딩: q값}"""
+    encodings = {}
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+
+def negotiate_encoding(header):
+    """지원하는 압축 중 클라이언트가 허용한 것 (br > gzip, q값 우선). 없으면 None"""
+    accepted = parse_accept_encoding(header)
+    supported = (['br'] if brotli is not None else []) + ['gzip']
+    best, best_q = None, 0.0
+    for encoding in supported:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data, encoding):
+    """bytes를 encoding(gzip | br)으로 압축"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+if __name__ == '__main__':
+    sample = {'n': Decimal('3'), 'f': Decimal('0.5'), 's': {'b', 'a'}, 'ko': '안녕', 'raw': Fragment('{"x":[1,2]}')}
+    assert json.loads(dumps(sample)) == {'n': 3, 'f': 0.5, 's': ['a', 'b'], 'ko': '안녕', 'raw': {'x': [1, 2]}}
+    assert negotiate_encoding('gzip, deflate, br;q=0') == 'gzip'
+    assert negotiate_encoding('identity') is None
+    assert gzip.decompress(compress(b'x' * 100, 'gzip')) == b'x' * 100
+    print(f"OK (backend: {'orjson' if orjson else 'json'}, br: {'yes' if brotli else 'no'})")
@@ -1,10 +1,47 @@
 #!/bin/bash
 # DynamoDB 테이블 생성 스크립트
 # eng-learning-conversations 테이블 생성
+#
+# 기존 테이블에 세션 목록 인덱스(GSI2)만 추가하려면:
+#   ./setup_dynamodb.sh --add-session-index
+#   python migrate_session_index.py        # 기존 SESSION_META 아이템 백필
 
 TABLE_NAME="eng-learning-conversations"
 REGION="us-east-1"
 
+# GSI2: 세션 목록용 희소 인덱스 (SESSION_META 아이템에만 GSI2PK/GSI2SK 존재)
+GSI2_DEFINITION="{
+    \"IndexName\": \"GSI2\",
+    \"KeySchema\": [
+        {\"AttributeName\": \"GSI2PK\", \"KeyType\": \"HASH\"},
+        {\"AttributeName\": \"GSI2SK\", \"KeyType\": \"RANGE\"}
+    ],
+    \"Projection\": {
+        \"ProjectionType\": \"INCLUDE\",
+        \"NonKeyAttributes\": [\"sessionId\", \"tutorName\", \"topic\", \"accent\", \"level\", \"startedAt\", \"endedAt\", \"duration\", \"turnCount\", \"wordCount\", \"status\"]
+    },
+    \"ProvisionedThroughput\": {
+        \"ReadCapacityUnits\": 5,
+        \"WriteCapacityUnits\": 5
+    }
+}"
+
+if [ "$1" == "--add-session-index" ]; then
+    echo "Adding GSI2 (session index) to existing table: $TABLE_NAME"
+    aws dynamodb update-table \
+        --table-name $TABLE_NAME \
+        --attribute-definitions \
+            AttributeName=GSI2PK,AttributeType=S \
+            AttributeName=GSI2SK,AttributeType=S \
+        --global-secondary-index-updates "[{\"Create\": $GSI2_DEFINITION}]" \
+        --region $REGION
+
+    echo "GSI2 is being created. Check status with:"
+    echo "  aws dynamodb describe-table --table-name $TABLE_NAME --region $REGION --query 'Table.GlobalSecondaryIndexes[].IndexStatus'"
+    echo "Then backfill existing sessions: python migrate_session_index.py"
+    exit 0
+fi
+
 echo "Creating DynamoDB table: $TABLE_NAME"
 
 aws dynamodb create-table \
@@ -14,6 +51,8 @@ aws dynamodb create-table \
         AttributeName=SK,AttributeType=S \
         AttributeName=GSI1PK,AttributeType=S \
         AttributeName=GSI1SK,AttributeType=S \
+        AttributeName=GSI2PK,AttributeType=S \
+        AttributeName=GSI2SK,AttributeType=S \
     --key-schema \
         AttributeName=PK,KeyType=HASH \
         AttributeName=SK,KeyType=RANGE \
@@ -30,7 +69,8 @@ aws dynamodb create-table \
                     \"ReadCapacityUnits\": 5,
                     \"WriteCapacityUnits\": 5
                 }
-            }
+            },
+            $GSI2_DEFINITION
         ]" \
     --provisioned-throughput \
         ReadCapacityUnits=5,WriteCapacityUnits=5 \
@@ -49,6 +89,8 @@ echo "Done! Table $TABLE_NAME created successfully."
 echo ""
 echo "Table Schema:"
 echo "  PK: DEVICE#{deviceId}"
-echo "  SK: SESSION#{sessionId}, MESSAGE#{timestamp}, SETTINGS, ANALYSIS"
-echo "  GSI1: For session listing (sorted by date)"
+echo "  SK: SETTINGS, SESSION#{startedAt}#{sessionId}#META, SESSION#{sessionId}#MSG#..., SESSION#{sessionId}#ANALYSIS"
+echo "  PK: TRANSLATION#{hash}  SK: TRANSLATION (translation cache, 30-day TTL)"
+echo "  GSI1: SESSION#{sessionId} → META + messages + summary + analyses of one session"
+echo "  GSI2: DEVICE#{deviceId} / {startedAt}#{sessionId} → session list (sparse, META only)"
 echo "  TTL: 90 days auto-delete"
@@ -0,0 +1,227 @@
+"""
+학습자 발화 로컬 분석 엔진 (필러, 어휘 다양도, 고급 어휘)
+
+외부 의존성 없이 표준 라이브러리만 사용하며, 긴 통화 기록도 수 ms 안에 처리한다.
+- PhraseMatcher: 필러 단어/구를 하나의 정규식으로 한 번에 매칭
+- tokenize / type_token_ratio / moving_average_ttr: 토큰화와 어휘 다양도 지표
+- WordFrequencyIndex: 번들된 common_words.txt 빈도 순위로 고급 어휘 판별
+- analyze_turns: 위 지표를 모아 analyze 응답의 수치 필드(fillers, vocabulary, complexity, fluency) 생성
+"""
+
+import os
+import re
+from collections import Counter
+
+FILLER_PHRASES = ('um', 'uh', 'like', 'you know', 'basically', 'actually', 'literally', 'i mean',
+                  'so', 'well', 'kind of', 'sort of')
+
+COMMON_WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'common_words.txt')
+
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)*")
+WORD_PATTERN = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)*")
+SENTENCE_END = re.compile(r'[.!?]+|\n')  # 턴 경계도 문장 경계로 취급
+
+MATTR_WINDOW = 50
+MIN_ADVANCED_LENGTH = 5
+
+# 빈도 목록은 기본형만 담으므로 자주 쓰는 불규칙 활용형은 기본형으로 매핑
+IRREGULAR_FORMS = {
+    'am': 'be', 'is': 'be', 'are': 'be', 'was': 'be', 'were': 'be', 'been': 'be', 'being': 'be',
+    'has': 'have', 'had': 'have', 'does': 'do', 'did': 'do', 'done': 'do', 'went': 'go', 'gone': 'go',
+    'got': 'get', 'gotten': 'get', 'said': 'say', 'made': 'make', 'took': 'take', 'taken': 'take',
+    'came': 'come', 'saw': 'see', 'seen': 'see', 'knew': 'know', 'known': 'know', 'thought': 'think',
+    'told': 'tell', 'found': 'find', 'gave': 'give', 'given': 'give', 'left': 'leave', 'felt': 'feel',
+    'kept': 'keep', 'began': 'begin', 'begun': 'begin', 'brought': 'bring', 'bought': 'buy',
+    'wrote': 'write', 'written': 'write', 'sat': 'sit', 'stood': 'stand', 'lost': 'lose', 'paid': 'pay',
+    'met': 'meet', 'ran': 'run', 'heard': 'hear', 'meant': 'mean', 'ate': 'eat', 'eaten': 'eat',
+    'drove': 'drive', 'driven': 'drive', 'flew': 'fly', 'flown': 'fly', 'slept': 'sleep', 'spent': 'spend',
+    'taught': 'teach', 'understood': 'understand', 'won': 'win', 'chose': 'choose', 'chosen': 'choose',
+    'fell': 'fall', 'fallen': 'fall', 'grew': 'grow', 'grown': 'grow', 'built': 'build', 'sent': 'send',
+    'caught': 'catch', 'held': 'hold', 'led': 'lead', 'spoke': 'speak', 'spoken': 'speak', 'broke': 'break',
+    'broken': 'break', 'wore': 'wear', 'worn': 'wear', 'sang': 'sing', 'sung': 'sing', 'swam': 'swim',
+    'drank': 'drink', 'drunk': 'drink', 'forgot': 'forget', 'forgotten': 'forget', 'became': 'become',
+    'children': 'child', 'men': 'man', 'women': 'woman', 'feet': 'foot', 'teeth': 'tooth',
+    'better': 'good', 'best': 'good', 'worse': 'bad', 'worst': 'bad',
+}
+
+
+class PhraseMatcher:
+    """여러 단어/구를 미리 컴파일한 단일 정규식으로 한 번에 찾는 매처
+
+    긴 구를 먼저 시도하므로 'you know'가 'know'보다, 'kind of'가 'kind'보다 우선한다.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = tuple(phrases)
+        alternatives = '|'.join(re.escape(p).replace(r'\ ', r'\s+') for p in sorted(self.phrases, key=len, reverse=True))
+        self.pattern = re.compile(rf"\b(?:{alternatives})\b", re.IGNORECASE)
+
+    def findall(self, text):
+        """등장 순서대로 매칭된 구 리스트 (공백은 한 칸으로 정규화, 소문자)"""
+        return [' '.join(m.group().lower().split()) for m in self.pattern.finditer(text)]
+
+    def count(self, text):
+        return Counter(self.findall(text))
+
+
+FILLER_MATCHER = PhraseMatcher(FILLER_PHRASES)
+
+
+def tokenize(text):
+    """소문자 단어 토큰 리스트 (축약형 don't, I'm 등은 한 토큰)"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def type_token_ratio(tokens):
+    """서로 다른 단어 수 / 전체 단어 수"""
+    return len(set(tokens)) / len(tokens) if tokens else 0.0
+
+
+def moving_average_ttr(tokens, window=MATTR_WINDOW):
+    """MATTR: 고정 길이 창을 한 칸씩 밀며 구한 TTR의 평균 (길이에 덜 민감한 다양도 지표)
+
+    창을 옮길 때 들어오고 나가는 토큰만 갱신하므로 O(n).
+    """
+    if len(tokens) <= window:
+        return type_token_ratio(tokens)
+
+    counts = dict(Counter(tokens[:window]))
+    distinct_sum = len(counts)
+    for i in range(window, len(tokens)):
+        outgoing, incoming = tokens[i - window], tokens[i]
+        if counts[outgoing] == 1:
+            del counts[outgoing]
+        else:
+            counts[outgoing] -= 1
+        counts[incoming] = counts.get(incoming, 0) + 1
+        distinct_sum += len(counts)
+    return distinct_sum / window / (len(tokens) - window + 1)
+
+
+def base_forms(word):
+    """빈도 목록 조회용 기본형 후보 (원형 → 축약 제거 → 불규칙 → 접미사 제거 순)"""
+    word = word.split("'")[0]
+    yield word
+    if word in IRREGULAR_FORMS:
+        yield IRREGULAR_FORMS[word]
+    for suffix, replacement in (('ies', 'y'), ('ied', 'y'), ('ier', 'y'), ('iest', 'y'), ('ily', 'y'),
+                                ('ing', ''), ('ing', 'e'), ('ed', ''), ('ed', 'e'), ('es', ''), ('s', ''),
+                                ('er', ''), ('er', 'e'), ('est', ''), ('ly', ''), ('ment', ''), ('ness', '')):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            stem = word[:-len(suffix)] + replacement
+            yield stem
+            if not replacement and len(stem) > 2 and stem[-1] == stem[-2]:
+                yield stem[:-1]  # running → run, stopped → stop
+
+
+class WordFrequencyIndex:
+    """단어 → 빈도 순위(1부터) 조회. 목록에 없는 단어는 None"""
+
+    def __init__(self, words):
+        self.ranks = {}
+        for word in words:
+            self.ranks.setdefault(word, len(self.ranks) + 1)
+
+    @classmethod
+    def load(cls, path=COMMON_WORDS_PATH):
+        with open(path, encoding='utf-8') as f:
+            return cls(line.strip().lower() for line in f if line.strip() and not line.startswith('#'))
+
+    def rank(self, word):
+        for form in base_forms(word.lower()):
+            if form in self.ranks:
+                return self.ranks[form]
+        return None
+
+    def is_advanced(self, word, max_rank=None):
+        """빈도 목록 밖(또는 max_rank보다 드문) 단어면 True. 짧은 단어는 제외"""
+        if len(word) < MIN_ADVANCED_LENGTH:
+            return False
+        rank = self.rank(word)
+        return rank is None or (max_rank is not None and rank > max_rank)
+
+    def __len__(self):
+        return len(self.ranks)
+
+
+_frequency_index = None
+
+
+def get_frequency_index():
+    """번들된 빈도 목록 인덱스 (처음 사용할 때 한 번 로드)"""
+    global _frequency_index
+    if _frequency_index is None:
+        _frequency_index = WordFrequencyIndex.load()
+    return _frequency_index
+
+
+def advanced_words(text, index=None):
+    """고급 어휘 후보 (등장 순서, 중복 제거)
+
+    문장 중간의 대문자 단어는 고유명사, 아포스트로피가 있는 단어는 축약형으로 보고 제외.
+    """
+    index = index or get_frequency_index()
+    found, checked = [], set()
+    for sentence in SENTENCE_END.split(text):
+        for position, match in enumerate(WORD_PATTERN.finditer(sentence)):
+            word = match.group()
+            if position > 0 and word[0].isupper() and word != 'I':
+                continue
+            lowered = word.lower()
+            if lowered in checked or "'" in lowered:
+                continue
+            checked.add(lowered)
+            if index.is_advanced(lowered):
+                found.append(lowered)
+    return found
+
+
+def scale(value, low, high):
+    """value를 [low, high] 구간에서 0~1로 정규화"""
+    return min(1.0, max(0.0, (value - low) / (high - low)))
+
+
+def analyze_turns(turns):
+    """사용자 발화 리스트 → analyze 응답의 수치 필드
+
+    complexity: 어휘 다양도(MATTR), 문장 길이, 고급 어휘 비율
+    fluency: 턴당 단어 수, 필러 비율
+    두 점수 모두 30~100 범위 (짧은 대화도 0점이 되지 않도록 하한을 둠).
+    """
+    text = '\n'.join(t for t in turns if t)
+    tokens = tokenize(text)
+    fillers = FILLER_MATCHER.findall(text)
+    advanced = advanced_words(text)
+
+    word_count = len(tokens)
+    sentence_count = max(1, sum(1 for s in SENTENCE_END.split(text) if s.strip()))
+    turn_count = max(1, sum(1 for t in turns if t and t.strip()))
+    mattr = moving_average_ttr(tokens)
+    filler_percentage = round(len(fillers) / word_count * 100, 1) if word_count else 0.0
+    words_per_sentence = word_count / sentence_count
+    words_per_turn = word_count / turn_count
+    advanced_ratio = len(advanced) / word_count if word_count else 0.0
+
+    complexity = 0.4 * scale(mattr, 0.4, 0.85) + 0.35 * scale(words_per_sentence, 4, 18) + 0.25 * scale(advanced_ratio, 0, 0.08)
+    fluency = 0.55 * scale(words_per_turn, 3, 20) + 0.45 * (1 - scale(filler_percentage, 0, 12))
+
+    return {
+        'cafp_scores': {
+            'complexity': round(30 + 70 * complexity) if word_count else 0,
+            'fluency': round(30 + 70 * fluency) if word_count else 0,
+        },
+        'fillers': {'count': len(fillers), 'words': fillers, 'percentage': filler_percentage},
+        'vocabulary': {
+            'total_words': word_count,
+            'unique_words': len(set(tokens)),
+            'advanced_words': advanced,
+        },
+        'metrics': {
+            'typeTokenRatio': round(type_token_ratio(tokens), 3),
+            'mattr': round(mattr, 3),
+            'sentences': sentence_count,
+            'wordsPerSentence': round(words_per_sentence, 1),
+            'wordsPerTurn': round(words_per_turn, 1),
+            'fillerCounts': dict(Counter(fillers)),
+        },
+    }